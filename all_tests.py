@@ -23,13 +23,53 @@ from unittest import TestLoader, TextTestRunner, TestSuite
 
 from tests.test_gw2Db import TestGw2Db
 from tests.test_gw2Endpoint import TestGw2Endpoint
+from tests.test_metrics import TestMetrics
+from tests.test_tracing import TestTracing
+from tests.test_memprof import TestMemoryProfiler
+from tests.test_serving import TestServing
+from tests.test_sidecar import TestSidecar
+from tests.test_pragmas import TestPragmas
+from tests.test_readonly import TestReadonly
+from tests.test_registry import TestRegistry
+from tests.test_schema import TestSchema
+from tests.test_instances import TestInstances
+from tests.test_locales import TestLocales
+from tests.test_fulltext import TestFulltext
+from tests.test_prefix import TestPrefix
+from tests.test_crafting import TestCrafting
+from tests.test_reverse import TestReverse
+from tests.test_prerequisites import TestPrerequisites
+from tests.test_holdings import TestHoldings
+from tests.test_accounts import TestAccounts
+from tests.test_diffs import TestDiffs
+from tests.test_synth import TestSynthesizer
 
 if __name__ == "__main__":
 
     loader = TestLoader()
     suite = TestSuite((
         loader.loadTestsFromTestCase(TestGw2Endpoint),
-        loader.loadTestsFromTestCase(TestGw2Db)
+        loader.loadTestsFromTestCase(TestGw2Db),
+        loader.loadTestsFromTestCase(TestMetrics),
+        loader.loadTestsFromTestCase(TestTracing),
+        loader.loadTestsFromTestCase(TestMemoryProfiler),
+        loader.loadTestsFromTestCase(TestServing),
+        loader.loadTestsFromTestCase(TestSidecar),
+        loader.loadTestsFromTestCase(TestPragmas),
+        loader.loadTestsFromTestCase(TestReadonly),
+        loader.loadTestsFromTestCase(TestRegistry),
+        loader.loadTestsFromTestCase(TestSchema),
+        loader.loadTestsFromTestCase(TestInstances),
+        loader.loadTestsFromTestCase(TestLocales),
+        loader.loadTestsFromTestCase(TestFulltext),
+        loader.loadTestsFromTestCase(TestPrefix),
+        loader.loadTestsFromTestCase(TestCrafting),
+        loader.loadTestsFromTestCase(TestReverse),
+        loader.loadTestsFromTestCase(TestPrerequisites),
+        loader.loadTestsFromTestCase(TestHoldings),
+        loader.loadTestsFromTestCase(TestAccounts),
+        loader.loadTestsFromTestCase(TestDiffs),
+        loader.loadTestsFromTestCase(TestSynthesizer)
     ))
 
     runner = TextTestRunner(verbosity = 2)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Performance benchmarks
+
+This package measures the ``gw2db`` upgrade pipeline over a recorded (or generated) WebAPI corpus, without network.
+It's not part of the distributed package.
+"""
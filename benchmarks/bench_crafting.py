@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Crafting benchmark
+
+Measures, over a synthetic db (see ``benchmarks.synth``, 12k recipes at full scale):
+    - the recipes graph build time (``gw2db.crafting.CraftingGraph``)
+    - the raw materials bill of every crafted item
+    - ``CraftingGraph.costs``: buy or craft choice of all the items, with new random prices at each run
+
+Results are compared to a stored baseline, as done by ``benchmarks.bench_upgrade``.
+
+Usage:
+    python -m benchmarks.bench_crafting [--synthetic 1] [--repeat 20] [--save] [--baseline file]
+"""
+
+# std imports
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# package imports
+from gw2db import Gw2Db, Gw2Item, Gw2Recipe
+from gw2db.crafting import CraftingGraph
+
+from benchmarks.bench_upgrade import compare
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+# default baseline file
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_crafting.json')
+
+
+def run(scale, repeat=20, seed=0):
+    """Run the crafting benchmarks
+
+    :param scale: size of the synthetic corpus, see ``benchmarks.synth``
+    :param repeat: number of costs computations
+    :param seed: seed of the random prices
+    :return: a dictionnary of results - key=result name, value=measure
+    """
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        db = Gw2Db(lang='en')
+        db.http = CorpusHttp(Synthesizer(scale, keys=0).make())
+        if db.upgrade(True) <= 0:
+            raise RuntimeError('upgrade over the synthetic corpus failed')
+        items = [x[0] for x in db.session.query(Gw2Item.id).all()]
+        crafted = [x[0] for x in db.session.query(Gw2Recipe.output_item_id).distinct().all()]
+
+        graph = CraftingGraph(db)
+        st = time.perf_counter()
+        graph.recipe_of(0)
+        results = {'crafting.recipes': len(crafted), 'crafting.build.seconds': time.perf_counter() - st}
+
+        st = time.perf_counter()
+        for item_id in crafted:
+            graph.bill(item_id, 10)
+        results['crafting.bills.seconds'] = time.perf_counter() - st
+
+        rnd = random.Random(seed)
+        times = list()
+        for i in range(0, repeat):
+            prices = {x: float(rnd.randint(1, 100000)) for x in items if rnd.random() < 0.8}
+            st = time.perf_counter()
+            graph.costs(prices)
+            times.append(time.perf_counter() - st)
+        results['crafting.costs.median.seconds'] = statistics.median(times)
+        results['crafting.costs.max.seconds'] = max(times)
+
+        graph.close()
+        Gw2Db._instances.pop(os.path.abspath('gw2.db'))._close_db()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gw2db crafting benchmark')
+    parser.add_argument('--synthetic', type=float, default=1., metavar='SCALE',
+                        help='synthetic corpus size, SCALE times the live WebAPI size - see benchmarks.synth')
+    parser.add_argument('--repeat', type=int, default=20, help='number of costs computations')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline results file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative degradation')
+    args = parser.parse_args(argv)
+
+    results = run(args.synthetic, args.repeat)
+
+    baseline = dict()
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    for name, old, new, change, regression in compare(results, baseline, args.tolerance):
+        regressions += 1 if regression else 0
+        print('%-40s %10s %10.4f %8s %s' % (name, '-' if old is None else '%.4f' % old, new,
+                                            '' if change is None else '%+.1f%%' % (change * 100),
+                                            'REGRESSION' if regression else ''))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
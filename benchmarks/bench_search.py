@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Search benchmark
+
+Measures, over a synthetic db upgraded with the full-text index (see ``gw2db.fulltext``):
+    - the index build time
+    - ``Gw2Db.search`` latencies of texts being typed: prefixes of item names, from 1 character to the whole name
+    - the same for the in-memory prefix index (``gw2db.prefix``), and its build time
+
+Results are compared to a stored baseline, as done by ``benchmarks.bench_upgrade``.
+
+Usage:
+    python -m benchmarks.bench_search [--synthetic 0.1] [--queries 200] [--save] [--baseline file]
+"""
+
+# std imports
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# package imports
+from gw2db import Gw2Db, Gw2Item
+from gw2db.fulltext import build_index
+from gw2db.prefix import PrefixIndex
+
+from benchmarks.bench_upgrade import compare
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+# default baseline file
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_search.json')
+
+
+def run(scale, queries=200, limit=10, seed=0):
+    """Run the search benchmarks
+
+    :param scale: size of the synthetic corpus, see ``benchmarks.synth``
+    :param queries: number of searched texts
+    :param limit: maximum number of rows by search
+    :param seed: seed of the searched texts choice
+    :return: a dictionnary of results - key=result name, value=measure
+    """
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        db = Gw2Db(lang='en', fulltext=True)
+        db.http = CorpusHttp(Synthesizer(scale, keys=0).make())
+        if db.upgrade(True) <= 0:
+            raise RuntimeError('upgrade over the synthetic corpus failed')
+
+        st = time.perf_counter()
+        rows = build_index(db.session, 'en')['en']
+        db.session.commit()
+        results = {'search.index.rows': rows, 'search.index.seconds': time.perf_counter() - st}
+
+        rnd = random.Random(seed)
+        names = [x[0] for x in db.session.query(Gw2Item.name).filter(Gw2Item.name != None).all()]
+        texts = list()
+        for i in range(0, queries):
+            name = rnd.choice(names)
+            texts.append(name[:rnd.randint(1, len(name))])
+
+        def measure(name, fn):
+            times = list()
+            found = 0
+            for text in texts:
+                st = time.perf_counter()
+                found += len(fn(text))
+                times.append(time.perf_counter() - st)
+            times.sort()
+            results.update({
+                '%s.found' % name: found,
+                '%s.median.seconds' % name: statistics.median(times),
+                '%s.p95.seconds' % name: times[int(len(times) * 0.95) - 1],
+                '%s.max.seconds' % name: times[-1],
+            })
+
+        def search(text):
+            found = db.search(text, limit=limit)
+            db.session.expunge_all()
+            return found
+        measure('search', search)
+
+        index = PrefixIndex(db)
+        st = time.perf_counter()
+        index.complete('a')
+        results['prefix.build.seconds'] = time.perf_counter() - st
+        measure('prefix', lambda x: index.complete(x, limit))
+        Gw2Db._instances.pop(os.path.abspath('gw2.db'))._close_db()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gw2db search benchmark')
+    parser.add_argument('--synthetic', type=float, default=0.1, metavar='SCALE',
+                        help='synthetic corpus size, SCALE times the live WebAPI size - see benchmarks.synth')
+    parser.add_argument('--queries', type=int, default=200, help='number of searched texts')
+    parser.add_argument('--limit', type=int, default=10, help='maximum number of rows by search')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline results file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative degradation')
+    args = parser.parse_args(argv)
+
+    results = run(args.synthetic, args.queries, args.limit)
+
+    baseline = dict()
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    for name, old, new, change, regression in compare(results, baseline, args.tolerance):
+        regressions += 1 if regression else 0
+        print('%-40s %10s %10.4f %8s %s' % (name, '-' if old is None else '%.4f' % old, new,
+                                            '' if change is None else '%+.1f%%' % (change * 100),
+                                            'REGRESSION' if regression else ''))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Startup benchmark
+
+Measures, in new interpreters, the startup of a short-lived tool which queries one table:
+    - ``import gw2db`` time
+    - ``Gw2Db()`` time (tables mapping and creation, db connection)
+    - first query time
+
+Each measure is made with all the tables imported (default), then with the lazy loading mode and only the family of
+the queried table, see ``gw2db.registry``. Results are compared to a stored baseline, as done by
+``benchmarks.bench_upgrade``.
+
+Usage:
+    python -m benchmarks.bench_startup [--family items.skins] [--repeat 5] [--save] [--baseline file]
+"""
+
+# std imports
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# package imports
+from gw2db import registry
+
+from benchmarks.bench_upgrade import compare
+
+# default baseline file
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_startup.json')
+
+# run by a new interpreter: argv = family, class name - prints the measures as JSON
+SCRIPT = """
+import json, sys, time
+st = time.perf_counter()
+import gw2db
+t_import = time.perf_counter()
+if gw2db.registry.LAZY:
+    db = gw2db.Gw2Db(families=[sys.argv[1]])
+else:
+    db = gw2db.Gw2Db()
+t_init = time.perf_counter()
+db.session.query(getattr(gw2db, sys.argv[2])).first()
+t_query = time.perf_counter()
+print(json.dumps({'import': t_import - st, 'init': t_init - t_import, 'first_query': t_query - t_init,
+                  'total': t_query - st}))
+"""
+
+
+def bench_start(family, lazy, cwd):
+    """Measure a startup in a new interpreter
+
+    :param family: the family of the queried table
+    :param lazy: if True, use the lazy loading mode
+    :param cwd: the directory holding the db file
+    :return: a dictionnary of times in seconds - key=stage (import, init, first_query, total)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(registry.__file__)))
+    env = dict(os.environ, GW2DB_LAZY='1' if lazy else '0', PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', SCRIPT, family,
+                                   registry.FAMILIES[family][0]], env=env, cwd=cwd, stderr=subprocess.PIPE)
+    return json.loads(out.decode('utf-8').splitlines()[-1])
+
+
+def run(family, repeat=5):
+    """Run the startup benchmarks
+
+    :param family: the family of the queried table
+    :param repeat: number of startups of each mode, the median is kept
+    :return: a dictionnary of results - key=result name, value=measure
+    """
+    tmp = tempfile.mkdtemp()
+    try:
+        # creating the db first, so all the runs open an existing file
+        bench_start(family, False, tmp)
+
+        results = dict()
+        for mode, lazy in (('eager', False), ('lazy', True)):
+            runs = [bench_start(family, lazy, tmp) for i in range(0, repeat)]
+            for stage in runs[0]:
+                results['startup.%s.%s.seconds' % (mode, stage)] = statistics.median(x[stage] for x in runs)
+        return results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gw2db startup benchmark')
+    parser.add_argument('--family', default='items.skins', choices=sorted(registry.FAMILIES),
+                        help='family of the queried table, see gw2db.registry')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline results file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative degradation')
+    parser.add_argument('--repeat', type=int, default=5, help='startups of each mode, the median is kept')
+    args = parser.parse_args(argv)
+
+    if len(registry.FAMILIES[args.family]) == 0:
+        parser.error('the family %s has no public table' % args.family)
+    results = run(args.family, args.repeat)
+
+    baseline = dict()
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    for name, old, new, change, regression in compare(results, baseline, args.tolerance):
+        regressions += 1 if regression else 0
+        print('%-40s %10s %10.4f %8s %s' % (name, '-' if old is None else '%.4f' % old, new,
+                                            '' if change is None else '%+.1f%%' % (change * 100),
+                                            'REGRESSION' if regression else ''))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
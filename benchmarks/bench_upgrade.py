@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Upgrade pipeline benchmark
+
+Measures, over a corpus:
+    - mapping rows per second for each table family (items with subtypes, skills with facts, achievements with bits
+      and rewards, characters with equipment and inventory)
+    - insert rows per second of these families into an empty db
+    - end-to-end upgrade time, and its peak traced memory / RSS
+
+Results are compared to a stored baseline, a result worse than the baseline by more than the tolerance being a
+regression.
+
+Usage:
+    python -m benchmarks.bench_upgrade --corpus corpus.json.gz [--save] [--baseline file] [--tolerance 0.1]
+    python -m benchmarks.bench_upgrade --synthetic 10 [--depth 3] ...
+"""
+
+# std imports
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# ORM imports
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# package imports
+from gw2db import Gw2Db, Gw2Item, Gw2Skill, Gw2Achievement, Gw2Character
+from gw2db.common import Base, EPType, Gw2Endpoint, Param
+from gw2db.memprof import peak_rss
+
+from benchmarks.corpus import Corpus, CorpusHttp
+from benchmarks.synth import Synthesizer
+
+# table families measured by the mapping / insert benchmarks
+FAMILIES = [
+    ('items', Gw2Item),
+    ('skills', Gw2Skill),
+    ('achievements', Gw2Achievement),
+    ('characters', Gw2Character),
+]
+
+# default baseline file
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def bench_mapping(corpus, table, repeat=3):
+    """Measure the mapping of all the corpus objects of an endpoint
+
+    :param corpus: the ``Corpus`` to read objects from
+    :param table: the endpoint table class
+    :param repeat: number of runs, the best one is kept
+    :return: (number of rows produced, best time in seconds, mapped datas - key=table class, value=list of rows)
+    """
+    info = table.__table__.info
+    if info['ep_type'] & EPType.auth:
+        # as done by Gw2Endpoint._read, objects get the access token they are read with
+        objects = list()
+        for key in corpus.keys:
+            value = corpus.get(info['endpoint'], access_token=key) or list()
+            for o in (value if type(value) is list else [value]):
+                objects.append(dict(o, api_key=key))
+    else:
+        objects = corpus.find(info['endpoint'])
+    best, rows, mapped = None, 0, dict()
+    for i in range(0, repeat):
+        ep = Gw2Endpoint(table, corpus.lang, [])
+        _objects = copy.deepcopy(objects)
+        mapped = dict()
+        st = time.perf_counter()
+        for o in _objects:
+            for (k, v) in ep._mapping(o, table):
+                mapped.setdefault(k, list()).append(v)
+        dt = time.perf_counter() - st
+        best = dt if best is None else min(best, dt)
+        rows = sum(len(v) for v in mapped.values())
+    return rows, best, mapped
+
+
+def bench_insert(mapped):
+    """Measure the insertion of mapped datas into an empty db file
+
+    :param mapped: mapped datas - key=table class, value=list of rows
+    :return: (number of rows inserted, time in seconds)
+    """
+    tmp = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(tmp, 'bench.db'))
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)(autoflush=False)
+        rows = 0
+        st = time.perf_counter()
+        for k, v in mapped.items():
+            session.bulk_insert_mappings(k, v)
+            rows += len(v)
+        session.commit()
+        dt = time.perf_counter() - st
+        session.close()
+        engine.dispose()
+        return rows, dt
+    finally:
+        shutil.rmtree(tmp)
+
+
+def bench_upgrade(corpus):
+    """Measure a full upgrade over the corpus, memory profile enabled
+
+    :param corpus: the ``Corpus`` to answer WebAPI requests from
+    :return: a dictionnary of results
+    """
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        db = Gw2Db()
+        db.http = CorpusHttp(corpus)
+        db.memory_profile = True
+        db.session.add(Param(name='lang', value=corpus.lang))
+        db.session.add_all([Param(name='KEY_%s' % k, value=k) for k in corpus.keys])
+        db.session.commit()
+
+        st = time.perf_counter()
+        version = db.upgrade(True)
+        dt = time.perf_counter() - st
+        if version <= 0:
+            raise RuntimeError('upgrade over the corpus failed')
+
+        tot = db.last_metrics.totals()
+        return {
+            'upgrade.seconds': dt,
+            'upgrade.rows': tot['inserted'],
+            'upgrade.rows_per_s': tot['inserted'] / dt,
+            'upgrade.peak_traced_bytes': db.last_memory.peak.traced_peak,
+            'upgrade.peak_rss_bytes': peak_rss(),
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run(corpus, repeat=3):
+    """Run all the benchmarks
+
+    :param corpus: the ``Corpus`` to use
+    :param repeat: number of runs of the mapping benchmarks
+    :return: a dictionnary of results - key=result name, value=measure
+    """
+    results = dict()
+    all_mapped = dict()
+    for family, table in FAMILIES:
+        rows, dt, mapped = bench_mapping(corpus, table, repeat)
+        results['mapping.%s.rows' % family] = rows
+        if rows > 0:
+            results['mapping.%s.rows_per_s' % family] = rows / dt
+        for k, v in mapped.items():
+            all_mapped.setdefault(k, list()).extend(v)
+
+    rows, dt = bench_insert(all_mapped)
+    results['insert.rows'] = rows
+    if rows > 0:
+        results['insert.rows_per_s'] = rows / dt
+
+    results.update(bench_upgrade(corpus))
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Compare results to a baseline
+
+    Results named ``*rows_per_s`` are better when higher, ``*seconds`` / ``*bytes`` when lower, others are only
+    informative.
+
+    :param results: the new results
+    :param baseline: the baseline results
+    :param tolerance: allowed relative degradation
+    :return: a list of (name, baseline, result, relative change, is a regression)
+    """
+    report = list()
+    for name in sorted(results):
+        new = results[name]
+        old = baseline.get(name)
+        if old is None or not old or new is None:
+            report.append((name, old, new, None, False))
+            continue
+        change = (new - old) / old
+        if name.endswith('rows_per_s'):
+            regression = change < -tolerance
+        elif name.endswith('seconds') or name.endswith('bytes'):
+            regression = change > tolerance
+        else:
+            regression = False
+        report.append((name, old, new, change, regression))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gw2db upgrade pipeline benchmark')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--corpus', help='corpus file, see benchmarks.corpus')
+    source.add_argument('--synthetic', type=float, metavar='SCALE',
+                        help='generate the corpus, SCALE times the live WebAPI size - see benchmarks.synth')
+    parser.add_argument('--depth', type=int, default=3, help='maximum nesting depth of a synthetic corpus')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline results file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative degradation')
+    parser.add_argument('--repeat', type=int, default=3, help='mapping runs, the best one is kept')
+    args = parser.parse_args(argv)
+
+    if args.corpus is not None:
+        corpus = Corpus.load(args.corpus)
+    else:
+        corpus = Synthesizer(args.synthetic, args.depth).make()
+    results = run(corpus, args.repeat)
+
+    baseline = dict()
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    for name, old, new, change, regression in compare(results, baseline, args.tolerance):
+        regressions += 1 if regression else 0
+        print('%-34s %14s %14.1f %8s %s' % (name, '-' if old is None else '%.1f' % old, new,
+                                              '' if change is None else '%+.1f%%' % (change * 100),
+                                              'REGRESSION' if regression else ''))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""WebAPI corpus: record and replay
+
+A corpus stores the JSON answered by each WebAPI url, pages being concatenated. It's used as the ``http`` client
+of ``Gw2Db`` / ``Gw2Endpoint`` to run upgrades without network.
+
+Example:
+    >>> # record a corpus from the live WebAPI
+    >>> db = Gw2Db()
+    >>> db.http = RecordingHttp()
+    >>> db.upgrade(True)
+    >>> db.http.corpus.save('corpus.json.gz')
+    >>>
+    >>> # replay it
+    >>> db.http = CorpusHttp(Corpus.load('corpus.json.gz'))
+"""
+
+# std imports
+import gzip
+import json
+import time
+
+# threading imports
+from threading import Lock
+
+# web imports
+import requests
+from requests import HTTPError
+
+# package imports
+from gw2db.common import addr_v2
+
+
+class Corpus:
+    """WebAPI answers, by url
+
+    Urls are stored as their path relative to ``addr_v2`` followed by their sorted query, paging arguments excepted:
+    ``items?lang=en``, ``tokeninfo?access_token=key0``, ``guild/ABC?access_token=key0``...
+
+    Attributes:
+        Corpus.build: the WebAPI build id answered by ``v2/build``
+        Corpus.lang: the language of the localized endpoints
+        Corpus.keys: the access tokens used in the corpus urls
+        Corpus.payloads: the JSON answers, by url
+    """
+    def __init__(self, build=1, lang='en', keys=None, payloads=None):
+        self.build = build
+        self.lang = lang
+        self.keys = keys if keys is not None else list()
+        self.payloads = payloads if payloads is not None else dict()
+
+    @staticmethod
+    def make_key(path, params=None):
+        """Make the storage key of an url
+
+        :param path: url path, relative to ``addr_v2``
+        :param params: url arguments
+        :return: the storage key
+        """
+        args = sorted((k, str(v)) for k, v in (params or {}).items() if k not in ('page', 'page_size'))
+        if len(args) == 0:
+            return path
+        return path + '?' + '&'.join('%s=%s' % x for x in args)
+
+    def set(self, path, value, **params):
+        """Store the answer of an url
+
+        :param path: url path, relative to ``addr_v2``
+        :param value: the JSON answer, all pages concatenated
+        :param params: url arguments
+        """
+        self.payloads[self.make_key(path, params)] = value
+
+    def get(self, path, **params):
+        """Give the answer of an url
+
+        :param path: url path, relative to ``addr_v2``
+        :param params: url arguments
+        :return: the JSON answer, None if the url is unknown
+        """
+        return self.payloads.get(self.make_key(path, params))
+
+    def find(self, path):
+        """Give all the answers of an url path, whatever its arguments
+
+        :param path: url path, relative to ``addr_v2``
+        :return: a list of JSON objects - list answers are concatenated
+        """
+        found = list()
+        for k, v in self.payloads.items():
+            if k.split('?')[0] == path:
+                if type(v) is list:
+                    found.extend(v)
+                else:
+                    found.append(v)
+        return found
+
+    def count(self):
+        """Give the number of stored objects
+
+        :return: the sum of list answers lengths, single answers counting for one
+        """
+        return sum(len(v) if type(v) is list else 1 for v in self.payloads.values())
+
+    @staticmethod
+    def load(path):
+        """Load a corpus file
+
+        :param path: the JSON file, gzipped if its name ends with ``.gz``
+        :return: the loaded ``Corpus``
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            d = json.load(f)
+        return Corpus(d['build'], d['lang'], d['keys'], d['payloads'])
+
+    def save(self, path):
+        """Write the corpus into a file
+
+        :param path: the JSON file, gzipped if its name ends with ``.gz``
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            json.dump(dict(build=self.build, lang=self.lang, keys=self.keys, payloads=self.payloads), f)
+
+
+class CorpusResponse:
+    """``requests.Response``-like answer of a ``CorpusHttp``"""
+
+    def __init__(self, url, status, value=None, total=None):
+        self.url = url
+        self.status_code = status
+        self.content = json.dumps(value).encode('utf-8') if value is not None else b''
+        self.headers = {'x-result-total': str(total)} if total is not None else dict()
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError('%d error for url: %s' % (self.status_code, self.url), response=self)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class CorpusHttp:
+    """HTTP client which answers from a corpus
+
+    Paged requests get their slice of the stored list, other requests get the whole answer and, for lists, the
+    ``x-result-total`` header. Unknown urls answer a 404 error.
+
+    Attributes:
+        CorpusHttp.errors: HTTP status answered instead of the stored answer, by url (see ``Corpus.make_key``) - to
+                           simulate revoked tokens, rate limiting...
+    """
+    def __init__(self, corpus, latency=0.):
+        """Initialize the client
+
+        :param corpus: the ``Corpus`` to answer from
+        :param latency: time waited before each answer (seconds), to simulate the network
+        """
+        self.corpus = corpus
+        self.latency = latency
+        self.requests = 0
+        self.errors = dict()
+        self._lock = Lock()
+
+    def get(self, url, params=None, stream=False, timeout=None):
+        """Answer a request, see ``requests.get``"""
+        with self._lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        path = url[len(addr_v2):] if url.startswith(addr_v2) else url
+        params = params or dict()
+        if path == 'build':
+            return CorpusResponse(url, 200, dict(id=self.corpus.build))
+
+        status = self.errors.get(Corpus.make_key(path, params))
+        if status is not None:
+            return CorpusResponse(url, status, dict(text='forced error'))
+        value = self.corpus.get(path, **params)
+        if value is None:
+            return CorpusResponse(url, 404, dict(text='no such endpoint'))
+        if type(value) is not list:
+            return CorpusResponse(url, 200, value)
+        if 'page' in params:
+            size = int(params.get('page_size', 50))
+            start = int(params['page']) * size
+            return CorpusResponse(url, 200, value[start:start + size], len(value))
+        return CorpusResponse(url, 200, value, len(value))
+
+
+class RecordingHttp:
+    """HTTP client which forwards requests to the WebAPI and records the answers
+
+    Access tokens are replaced by ``key0``, ``key1``... in the recorded urls, so a corpus never contains a real token.
+    """
+    def __init__(self, http=requests):
+        """Initialize the client
+
+        :param http: the HTTP client to forward requests to
+        """
+        self.corpus = Corpus()
+        self._http = http
+        self._lock = Lock()
+        self._pages = dict()
+        self._tokens = dict()
+
+    def get(self, url, params=None, stream=False, timeout=None):
+        """Forward a request, then record its answer, see ``requests.get``"""
+        ans = self._http.get(url, params=params, timeout=timeout)
+        if ans.status_code >= 400 or ('page' not in (params or {}) and 'x-result-total' in ans.headers):
+            # errors and size requests are not recorded
+            return ans
+
+        path = url[len(addr_v2):] if url.startswith(addr_v2) else url
+        args = dict(params or {})
+        with self._lock:
+            if 'access_token' in args:
+                token = args['access_token']
+                if token not in self._tokens:
+                    self._tokens[token] = 'key%d' % len(self._tokens)
+                    self.corpus.keys.append(self._tokens[token])
+                args['access_token'] = self._tokens[token]
+            if 'lang' in args:
+                self.corpus.lang = args['lang']
+
+            value = ans.json()
+            if path == 'build':
+                self.corpus.build = value['id']
+            elif 'page' in args:
+                pages = self._pages.setdefault(Corpus.make_key(path, args), dict())
+                pages[int(args['page'])] = value
+                self.corpus.set(path, [x for p in sorted(pages) for x in pages[p]], **args)
+            else:
+                self.corpus.set(path, value, **args)
+        return ans
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Synthetic WebAPI corpus
+
+This module generates a ``Corpus`` from the table declarations: it walks ``Gw2Db.__endpoints__`` and the ``col_json``
+/ ``rel_json`` informations of each table and subtable, polymorphic subtypes included (items, facts, achievement bits
+and rewards...), and builds the JSON the WebAPI would answer.
+
+The JSON shape expected by a ``rel_json`` function (list of ids, list of objects, object of objects...) is found by
+calling the function on small probes. The few shapes which can't be probed are listed in ``SHAPES``, and the WebAPI
+fields read by ``from_parent`` / ``to_child`` but not mapped are added by ``EXTRAS``.
+
+Foreign keys take their values from the generated objects of the referenced table when it's an endpoint, so a
+generated corpus gives a consistent database (recipes made of existing items, characters wearing existing skins...).
+
+Usage:
+    python -m benchmarks.synth --scale 10 --out corpus10.json.gz
+"""
+
+# std imports
+import argparse
+import random
+import sys
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# ORM imports
+from sqlalchemy import Boolean, DateTime, Float, Integer
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import configure_mappers
+
+# package imports
+from gw2db import Gw2Db, registry
+from gw2db.common import EPType, col_json, rel_json
+
+from benchmarks.corpus import Corpus
+
+# Objects count of each endpoint in the live WebAPI (2017), a scale of 1 generates these counts
+SIZES = {
+    'achievements': 4800,
+    'achievements/categories': 250,
+    'achievements/groups': 13,
+    'backstory/answers': 500,
+    'backstory/questions': 60,
+    'colors': 580,
+    'currencies': 60,
+    'emblem/backgrounds': 30,
+    'emblem/foregrounds': 220,
+    'finishers': 90,
+    'guild/upgrades': 700,
+    'items': 60000,
+    'itemstats': 800,
+    'legends': 6,
+    'masteries': 70,
+    'materials': 9,
+    'minis': 550,
+    'outfits': 50,
+    'pets': 60,
+    'professions': 9,
+    'recipes': 12000,
+    'skills': 5600,
+    'skins': 7500,
+    'specializations': 72,
+    'stories': 120,
+    'stories/seasons': 8,
+    'titles': 560,
+    'traits': 1200,
+    'worlds': 51,
+    # by access token
+    'account/achievements': 1500,
+    'account/bank': 300,
+    'account/dyes': 250,
+    'account/finishers': 40,
+    'account/inventory': 64,
+    'account/masteries': 50,
+    'account/materials': 350,
+    'account/minis': 200,
+    'account/outfits': 20,
+    'account/recipes': 800,
+    'account/skins': 1500,
+    'account/titles': 100,
+    'account/wallet': 30,
+}
+
+# JSON shapes which can't be found by probing the ``rel_json`` function - key=(table name, relationship name):
+#   - bags: list of bags, each one holding its objects in an ``inventory`` list
+#   - attributes: object with an ``id`` and its other values in an ``attributes`` object
+#   - infix: object with its single key values in an ``attributes`` list of {attribute, modifier}
+SHAPES = {
+    ('Gw2ArmorItem', 'infix_upgrade'): 'infix',
+    ('Gw2BackItem', 'infix_upgrade'): 'infix',
+    ('Gw2TrinketItem', 'infix_upgrade'): 'infix',
+    ('Gw2UpgradeItem', 'infix_upgrade'): 'infix',
+    ('Gw2WeaponItem', 'infix_upgrade'): 'infix',
+    ('Gw2Character', 'inventory'): 'bags',
+    ('_Gw2CharacterEquipment', 'stats'): 'attributes',
+    ('_Gw2CharacterInventory', 'stats'): 'attributes',
+}
+
+
+def _token_extras(synth, obj, ctx):
+    obj['permissions'] = sorted(synth.rights)
+
+
+def _account_extras(synth, obj, ctx):
+    obj['guilds'] = list(ctx['guilds'])
+    obj['guild_leader'] = list(ctx['guilds'][:1])
+
+
+# WebAPI fields which are not mapped but read by endpoints hooks - key=table name, value=function(synth, obj, ctx)
+EXTRAS = {
+    'Gw2Token': _token_extras,
+    'Gw2Account': _account_extras,
+}
+
+_SYLLABLES = ['ka', 'lo', 'ri', 'an', 'the', 'mor', 'dal', 'syl', 'va', 'ren', 'tor', 'ash', 'ir', 'bel', 'gar',
+              'zu', 'nes', 'ol', 'qua', 'fen', 'del', 'ya', 'rok', 'mi', 'tha', 'sen', 'ur', 'gol', 'wyn', 'ca']
+
+# default mapping functions, used as is by undecorated col_json / rel_json
+_IDENTITY = (col_json.__defaults__[-1], rel_json.__defaults__[-1])
+
+# sentinel values used to probe rel_json functions
+_SCALAR = 982451653
+_KEY = '_k_'
+
+
+class _Probe(dict):
+    """Parent JSON object given to probed functions, any missing key is worth 0"""
+    def __missing__(self, key):
+        return 0
+
+
+class Synthesizer:
+    """Synthetic corpus generator
+
+    Example:
+        >>> corpus = Synthesizer(scale=10, depth=3).make()
+        >>> corpus.save('corpus10.json.gz')
+
+    Attributes:
+        Synthesizer.scale: factor applied to ``SIZES``, 1 for the live WebAPI size
+        Synthesizer.depth: maximum nesting depth of subobjects, 0 for flat objects
+        Synthesizer.fanout: average length of subobjects lists
+        Synthesizer.keys: number of access tokens
+        Synthesizer.characters: number of characters by access token
+        Synthesizer.lang: the language of localized endpoints
+        Synthesizer.rights: all the rights needed by the endpoints, given to each access token
+    """
+    def __init__(self, scale=1., depth=3, fanout=3, keys=1, characters=6, lang='en', seed=0):
+        self.scale = scale
+        self.depth = depth
+        self.fanout = fanout
+        self.keys = keys
+        self.characters = characters
+        self.lang = lang
+        self.rights = set()
+
+        self._rnd = random.Random(seed)
+        self._pools = defaultdict(list)
+        self._counters = defaultdict(int)
+        self._shapes = dict()
+        self._col_shapes = dict()
+        self._fixed = dict()
+
+    def size(self, endpoint):
+        """Give the number of objects to generate for an endpoint
+
+        :param endpoint: the endpoint name
+        :return: the scaled size, at least 1
+        """
+        return max(1, int(round(SIZES.get(endpoint, 10) * self.scale)))
+
+    def make(self):
+        """Generate the corpus
+
+        :return: the generated ``Corpus``
+        """
+        # all the tables, even in lazy loading mode
+        registry.load()
+        configure_mappers()
+        tables = sorted(Gw2Db.__endpoints__, key=lambda x: x.__name__)
+        std = [x for x in tables if (x.__table__.info['ep_type'] & EPType.auth) == 0]
+        auth = {x.__name__: x for x in tables if (x.__table__.info['ep_type'] & EPType.auth) != 0}
+        for x in tables:
+            self.rights.update(x.__table__.info['rights'])
+
+        corpus = Corpus(lang=self.lang, keys=['key%d' % i for i in range(0, self.keys)])
+
+        # ids first, so foreign keys find all their targets whatever the generation order
+        for table in std:
+            self._reserve(table, self.size(table.__table__.info['endpoint']))
+
+        for table in std:
+            info = table.__table__.info
+            objs = [self._object(table, self.depth, fixed=self._fixed[table][i])
+                    for i in range(0, len(self._fixed[table]))]
+            if info['locale']:
+                corpus.set(info['endpoint'], objs, lang=self.lang)
+            else:
+                corpus.set(info['endpoint'], objs)
+
+        for key in corpus.keys:
+            self._account(corpus, auth, key)
+        return corpus
+
+    def _account(self, corpus, auth, key):
+        """Generate the answers of the endpoints which need an access token
+
+        :param corpus: the ``Corpus`` to fill
+        :param auth: the endpoints tables which need an access token, by name
+        :param key: the access token
+        """
+        self._pools[('gw2_auth_token', 'api_key')].append(key)
+        guilds = ['%08X-%s' % (self._rnd.getrandbits(32), key) for i in range(0, self._rnd.randint(1, 5))]
+        ctx = dict(key=key, guilds=guilds)
+
+        for name, table in sorted(auth.items()):
+            info = table.__table__.info
+            endpoint = info['endpoint']
+            if info['ep_type'] & EPType.param:
+                for gid in guilds:
+                    corpus.set(endpoint % gid, self._object(table, self.depth, fixed=dict(id=gid), ctx=ctx),
+                               access_token=key)
+            elif info['ep_type'] & EPType.single and endpoint not in SIZES:
+                corpus.set(endpoint, self._object(table, self.depth, ctx=ctx), access_token=key)
+            else:
+                n = self.characters if endpoint == 'characters' else self.size(endpoint)
+                corpus.set(endpoint, self._objects(table, n, self.depth, ctx=ctx), access_token=key)
+
+    def _reserve(self, table, n):
+        """Choose the ids and subtypes of the objects of an endpoint
+
+        :param table: the endpoint table class
+        :param n: number of objects
+        """
+        pks = [x for x in table.__table__.primary_key if x.key not in ('pkid', 'api_key')]
+        self._fixed[table] = list()
+        for i in range(0, n):
+            fixed = dict()
+            sub = self._subtype(table)
+            if sub is not table:
+                fixed[table.__mapper_args__['polymorphic_on'].key] = sub.__mapper_args__['polymorphic_identity']
+            for col in pks:
+                fixed[col.key] = self._unique(table, col)
+                for t in {table, sub}:
+                    self._pools[(t.__tablename__, col.key)].append(fixed[col.key])
+            self._fixed[table].append(fixed)
+
+    def _subtype(self, table):
+        """Choose a polymorphic subtype of a table
+
+        :param table: the table class
+        :return: a subclass of ``table``, or ``table`` itself
+        """
+        subc = table.__subclasses__()
+        if len(subc) == 0:
+            return table
+        if 'polymorphic_identity' in table.__mapper_args__:
+            subc.append(table)
+        return self._rnd.choice(subc)
+
+    def _objects(self, table, n, depth, injected=(), ctx=None):
+        """Generate a list of objects, their primary keys being unique in the list
+
+        :param table: the table class
+        :param n: number of objects
+        :param depth: remaining nesting depth
+        :param injected: keys added by the ``rel_json`` function, not generated
+        :param ctx: the access token context
+        :return: a list of JSON objects
+        """
+        used = defaultdict(set)
+        objs = [self._object(table, depth, injected, used=used, ctx=ctx) for i in range(0, n)]
+        objs = [x for x in objs if x is not None]
+
+        # unlocks endpoints answer a list of ids
+        cols = [x.key for x in table.__table__.columns if x.key not in ('pkid', 'api_key')]
+        if cols == ['id'] and len(injected) == 0:
+            return [x['id'] for x in objs]
+        return objs
+
+    def _object(self, table, depth, injected=(), fixed=None, used=None, ctx=None):
+        """Generate a JSON object
+
+        :param table: the table class
+        :param depth: remaining nesting depth
+        :param injected: keys added by the ``rel_json`` function, not generated
+        :param fixed: values already chosen (ids, subtype)
+        :param used: values already used in the list by primary key columns - None if not in a list
+        :param ctx: the access token context
+        :return: the JSON object, None if unique values are missing
+        """
+        obj = dict(fixed or {})
+        _table = table
+        subc = table.__subclasses__()
+        if len(subc) > 0:
+            switch = table.__mapper_args__['polymorphic_on'].key
+            if switch not in obj:
+                _table = self._subtype(table)
+                obj[switch] = _table.__mapper_args__['polymorphic_identity']
+            else:
+                _table = next((x for x in subc if x.__mapper_args__['polymorphic_identity'] == obj[switch]), table)
+
+        done = set(obj.keys()).union(injected).union(('pkid',))
+        if ctx is not None and table.__table__.info.get('endpoint'):
+            done.add('api_key')
+        tables = [table] if _table is table else [table, _table]
+        pks = {x.key for t in tables for x in t.__table__.primary_key}
+
+        for t in tables:
+            for col in t.__table__.columns:
+                if col.key in done:
+                    continue
+                done.add(col.key)
+                if col.primary_key and col.default is not None:
+                    continue
+                if col.nullable and not col.primary_key and self._rnd.random() < 0.2:
+                    continue
+                if not self._column(t, col, obj, used if col.key in pks else None):
+                    if col.primary_key:
+                        return None
+
+        if depth > 0:
+            for t in tables:
+                for rel in inspect(t).relationships:
+                    if 'map' in rel.info and rel.parent.class_ is t:
+                        self._relation(t, rel, obj, depth - 1, ctx)
+
+        if table.__name__ in EXTRAS and ctx is not None:
+            EXTRAS[table.__name__](self, obj, ctx)
+        return obj
+
+    def _column(self, table, col, obj, used=None):
+        """Generate the JSON value of a column
+
+        :param table: the table class
+        :param col: the column
+        :param obj: the JSON object to fill
+        :param used: values already used in the list for this column - None if it doesn't need to be unique
+        :return: False if the value is skipped
+        """
+        path = col.info.get('keys', [col.key])
+        parent = obj
+        for k in path[:-1]:
+            parent = parent.setdefault(k, dict())
+        if path[-1] in parent:
+            # value shared with another column (rgb lists...)
+            return True
+
+        shape = self._col_shape(table, col)
+        if shape is None:
+            return False
+
+        if shape == 'list':
+            parent[path[-1]] = [self._value(table, col) for i in range(0, 3)]
+            return True
+
+        value = self._value(table, col)
+        if used is not None:
+            for i in range(0, 10):
+                if value not in used[col.key]:
+                    break
+                value = self._value(table, col)
+            else:
+                return False
+            used[col.key].add(value)
+        parent[path[-1]] = value
+        return True
+
+    def _col_shape(self, table, col):
+        """Find the JSON shape of a column value, by probing its ``col_json`` function
+
+        :param table: the table class
+        :param col: the column
+        :return: 'scalar', 'list' or None if the value can't be generated
+        """
+        if col in self._col_shapes:
+            return self._col_shapes[col]
+
+        fn = col.info.get('fn', _IDENTITY[0])
+        shape = None
+        if not callable(fn):
+            shape = None
+        elif fn is _IDENTITY[0]:
+            shape = 'scalar'
+        else:
+            value = self._value(table, col)
+            for s, v in (('scalar', value), ('list', [value] * 3)):
+                try:
+                    fn(v, _Probe())
+                    shape = s
+                    break
+                except Exception:
+                    continue
+        self._col_shapes[col] = shape
+        return shape
+
+    def _relation(self, table, rel, obj, depth, ctx):
+        """Generate the JSON subobjects of a relationship
+
+        :param table: the table class
+        :param rel: the relationship
+        :param obj: the JSON object to fill
+        :param depth: remaining nesting depth
+        :param ctx: the access token context
+        """
+        shape, injected, key = self._rel_shape(table, rel)
+        if shape is None:
+            return
+        sub = rel.info['map']
+        n = self._rnd.randint(0, 2 * self.fanout)
+
+        if shape == 'scalars':
+            col = sub.__table__.columns[key]
+            used = set()
+            value = list()
+            for i in range(0, n):
+                v = self._value(sub, col)
+                if v not in used:
+                    used.add(v)
+                    value.append(v)
+        elif shape == 'list':
+            value = self._objects(sub, n, depth, injected, ctx)
+        elif shape == 'dict':
+            value = self._object(sub, depth, injected, ctx=ctx)
+        elif shape in ('dict_dicts', 'dict_lists'):
+            col = sub.__table__.columns[key]
+            value = dict()
+            for i in range(0, max(1, n // 2)):
+                k = self._value(sub, col)
+                if shape == 'dict_dicts':
+                    value[str(k)] = self._object(sub, depth, injected, ctx=ctx)
+                else:
+                    value[str(k)] = self._objects(sub, self._rnd.randint(1, 3), depth, injected, ctx)
+        elif shape == 'bags':
+            items = self._objects(sub, n * 4, depth, injected, ctx)
+            value = [dict(id=self._value(sub, sub.__table__.columns['id']), size=20, inventory=items[i:i + 20])
+                     for i in range(0, len(items), 20)]
+        elif shape == 'attributes':
+            value = self._object(sub, depth, injected, ctx=ctx)
+            if value is not None:
+                value = dict(id=value.pop('id', 0), attributes=value)
+        elif shape == 'infix':
+            value = self._object(sub, depth, injected, ctx=ctx)
+            if value is not None:
+                attrs = [x.info['keys'][0] for x in sub.__table__.columns
+                         if len(x.info.get('keys', [])) == 1 and x.info['keys'][0] in value]
+                value['attributes'] = [dict(attribute=k, modifier=value.pop(k)) for k in attrs]
+        else:
+            return
+
+        if value is None:
+            return
+        parent = obj
+        path = rel.info.get('keys', [rel.key])
+        for k in path[:-1]:
+            parent = parent.setdefault(k, dict())
+        parent[path[-1]] = value
+
+    def _rel_shape(self, table, rel):
+        """Find the JSON shape of a relationship subobjects, by probing its ``rel_json`` function
+
+        :param table: the table class
+        :param rel: the relationship
+        :return: (shape name, keys added by the function, key of the column set from the probe)
+        """
+        if rel in self._shapes:
+            return self._shapes[rel]
+
+        fn = rel.info['fn']
+        found = (None, (), None)
+        if (table.__name__, rel.key) in SHAPES:
+            shape = SHAPES[(table.__name__, rel.key)]
+            if shape == 'bags':
+                res = fn([dict(inventory=[dict()])], _Probe())
+            elif shape == 'infix':
+                res = fn(dict(attributes=[]), _Probe())
+            else:
+                res = fn(dict(id=_SCALAR), _Probe())
+            res = res[0] if type(res) is list else res
+            found = (shape, tuple(k for k in res if k != 'id' or shape == 'bags'), None)
+        elif fn is _IDENTITY[1]:
+            found = ('list' if rel.uselist else 'dict', (), None)
+        else:
+            probes = (('scalars', [_SCALAR]), ('list', [dict()]), ('dict_lists', {_KEY: [dict()]}),
+                      ('dict_dicts', {_KEY: dict()}), ('dict', dict()))
+            for shape, probe in probes:
+                try:
+                    res = fn(probe, _Probe())
+                except Exception:
+                    continue
+                if shape == 'dict':
+                    if type(res) is dict:
+                        found = (shape, tuple(res.keys()), None)
+                        break
+                    continue
+                if type(res) is not list or len(res) == 0 or type(res[0]) is not dict:
+                    continue
+                sentinel = _SCALAR if shape == 'scalars' else _KEY
+                key = next((k for k, v in res[0].items() if v == sentinel), None)
+                if shape in ('scalars', 'dict_lists', 'dict_dicts') and key is None:
+                    continue
+                found = (shape, tuple(res[0].keys()), key)
+                break
+        self._shapes[rel] = found
+        return found
+
+    def _unique(self, table, col):
+        """Generate a new unique value for a column
+
+        :param table: the table class
+        :param col: the column
+        :return: the value
+        """
+        self._counters[col] += 1
+        n = self._counters[col]
+        if isinstance(col.type, Integer):
+            return n
+        return '%s%d' % (self._word().capitalize(), n)
+
+    def _value(self, table, col):
+        """Generate a value for a column, regarding to its type and foreign keys
+
+        :param table: the table class
+        :param col: the column
+        :return: the JSON value
+        """
+        for fk in col.foreign_keys:
+            pool = self._pools.get((fk.column.table.name, fk.column.key))
+            if pool:
+                return self._rnd.choice(pool)
+
+        if col.unique:
+            return self._unique(table, col)
+        if isinstance(col.type, Boolean):
+            return self._rnd.random() < 0.5
+        if isinstance(col.type, Integer):
+            return self._rnd.randint(0, 1000)
+        if isinstance(col.type, Float):
+            return round(self._rnd.uniform(0, 100), 2)
+        if isinstance(col.type, DateTime):
+            d = datetime(2012, 8, 28) + timedelta(seconds=self._rnd.randint(0, 5 * 365 * 86400))
+            return d.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if col.key == 'icon':
+            return 'https://render.guildwars2.com/file/%032X/%d.png' % (self._rnd.getrandbits(128),
+                                                                         self._rnd.randint(1, 2000000))
+        if col.key in ('description', 'text', 'motd', 'requirement', 'lore'):
+            return ' '.join(self._word() for i in range(0, self._rnd.randint(5, 30))).capitalize() + '.'
+        if col.key == 'name':
+            return ' '.join(self._word().capitalize() for i in range(0, self._rnd.randint(1, 4)))
+        return self._word().capitalize()
+
+    def _word(self):
+        return ''.join(self._rnd.choice(_SYLLABLES) for i in range(0, self._rnd.randint(1, 3)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gw2db synthetic corpus generator')
+    parser.add_argument('--out', required=True, help='corpus file to write, gzipped if it ends with .gz')
+    parser.add_argument('--scale', type=float, default=1., help='size factor, 1 for the live WebAPI size')
+    parser.add_argument('--depth', type=int, default=3, help='maximum nesting depth of subobjects')
+    parser.add_argument('--fanout', type=int, default=3, help='average length of subobjects lists')
+    parser.add_argument('--keys', type=int, default=1, help='number of access tokens')
+    parser.add_argument('--characters', type=int, default=6, help='number of characters by access token')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args(argv)
+
+    corpus = Synthesizer(args.scale, args.depth, args.fanout, args.keys, args.characters, seed=args.seed).make()
+    corpus.save(args.out)
+    print('%d objects written into %s' % (corpus.count(), args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
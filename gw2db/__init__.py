@@ -17,21 +17,28 @@
 
 The gw2db package provides an ORM over SQLite mapper for GuildWars2 WebAPI.
 
-The entry point is ``Gw2Db``.
+The entry point is ``Gw2Db``. Tables can be loaded lazily, see ``gw2db.registry``.
 """
 
-from .auths import Gw2Account, Gw2Character, Gw2Guild, Gw2Token
+from gw2db import registry
 
-from .items import Gw2Dye, Gw2GuildUpgrade, Gw2Itemstat, Gw2Material, Gw2MiniPet, Gw2Recipe, Gw2Skin
-from .items import Gw2Item, Gw2ArmorItem, Gw2BackItem, Gw2BagItem, Gw2ConsumableItem, Gw2ContainerItem, \
-    Gw2CraftingMaterialItem, Gw2GatheringItem, Gw2GizmoItem, Gw2MiniatureItem, Gw2SalvageItem, Gw2TraitItem, \
-    Gw2TrinketItem, Gw2UpgradeItem, Gw2WeaponItem
+if registry.LAZY:
+    # tables are imported when they are used, see ``gw2db.registry``
+    __all__ = registry.public_names()
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .auths import Gw2Account, Gw2Character, Gw2Guild, Gw2Token
 
-from .miscs import Gw2Achievement, Gw2AchievementCategory, Gw2AchievementGroup, Gw2Currency, Gw2EmblemBackground, \
-    Gw2EmblemForeground, Gw2Finisher, Gw2Outfit, Gw2Title, Gw2World
+    from .items import Gw2Dye, Gw2GuildUpgrade, Gw2Itemstat, Gw2Material, Gw2MiniPet, Gw2Recipe, Gw2Skin
+    from .items import Gw2Item, Gw2ArmorItem, Gw2BackItem, Gw2BagItem, Gw2ConsumableItem, Gw2ContainerItem, \
+        Gw2CraftingMaterialItem, Gw2GatheringItem, Gw2GizmoItem, Gw2MiniatureItem, Gw2SalvageItem, Gw2TraitItem, \
+        Gw2TrinketItem, Gw2UpgradeItem, Gw2WeaponItem
 
-from .profs import Gw2Legend, Gw2Mastery, Gw2Pet, Gw2Profession, Gw2Skill, Gw2Specialization, Gw2Trait
+    from .miscs import Gw2Achievement, Gw2AchievementCategory, Gw2AchievementGroup, Gw2Currency, Gw2EmblemBackground, \
+        Gw2EmblemForeground, Gw2Finisher, Gw2Outfit, Gw2Title, Gw2World
 
-from .story import Gw2Story, Gw2Season, Gw2BackstoryQuestion, Gw2BackstoryAnswer
+    from .profs import Gw2Legend, Gw2Mastery, Gw2Pet, Gw2Profession, Gw2Skill, Gw2Specialization, Gw2Trait
 
-from .gw2db import Gw2Db, DbUpgradeStatus, EndpointUpgradeStatus
+    from .story import Gw2Story, Gw2Season, Gw2BackstoryQuestion, Gw2BackstoryAnswer
+
+    from .gw2db import Gw2Db, DbUpgradeStatus, EndpointUpgradeStatus
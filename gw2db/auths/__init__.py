@@ -38,7 +38,13 @@ Here is the list of accessible endpoints from this package:
     - v2/tokeninfo
 """
 
-from .accounts import Gw2Account
-from .characters import Gw2Character
-from .guilds import Gw2Guild
-from .token import Gw2Token
\ No newline at end of file
+from gw2db import registry
+
+if registry.LAZY:
+    # families are imported when their classes are used, see ``gw2db.registry``
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .accounts import Gw2Account
+    from .characters import Gw2Character
+    from .guilds import Gw2Guild
+    from .token import Gw2Token
@@ -131,7 +131,7 @@ class _Gw2AccountBank(Base):
     infusions = relationship("Gw2UpgradeItem",
                              secondary="gw2_auth_account_bank_infusion",
                              uselist=True,
-                             info=rel_json(_Gw2AccountBankUpgrade,
+                             info=rel_json(_Gw2AccountBankInfusion,
                                            fn=lambda j, pj: [dict(id=pj['pkid'], infusion_id=x) for x in j]))
 
 
@@ -284,3 +284,79 @@ class _Gw2AccountWallet(Base):
     value = Column(Integer, nullable=False)
 
     currency = relationship("Gw2Currency", uselist=False)
+
+
+class _Gw2AccountHolding(Base):
+    """Db table - the items owned by an account, all locations summed (see ``gw2db.holdings``)
+
+    It's computed from the bank, the vault, the shared inventory slots, and the characters inventories and equipments,
+    at the end of each refresh of the accounts datas.
+
+    Attributes:
+        _Gw2AccountHolding.api_key: the API key of the account
+        _Gw2AccountHolding.item_id: the item id
+        _Gw2AccountHolding.count: the owned count, all locations summed
+        _Gw2AccountHolding.bank: the count in the bank
+        _Gw2AccountHolding.materials: the count in the materials storage
+        _Gw2AccountHolding.shared: the count in the shared inventory slots
+        _Gw2AccountHolding.characters: the count in the characters inventories
+        _Gw2AccountHolding.equipped: the count equipped by the characters
+    """
+    __tablename__ = "gw2_auth_account_holding"
+
+    api_key = Column(String, ForeignKey("gw2_auth_account.api_key"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("gw2_item_item.id"), primary_key=True)
+    count = Column(Integer, nullable=False)
+    bank = Column(Integer, nullable=False)
+    materials = Column(Integer, nullable=False)
+    shared = Column(Integer, nullable=False)
+    characters = Column(Integer, nullable=False)
+    equipped = Column(Integer, nullable=False)
+
+    item = relationship("Gw2Item", uselist=False)
+
+
+class _Gw2AccountChange(Base):
+    """Db table - history of the counters of the accounts (see ``gw2db.diffs``), appended by each accounts refresh
+
+    Its rows are never deleted: the db upgrades keep them.
+
+    Attributes:
+        _Gw2AccountChange.id: a unused primary key - needed by SQLite
+        _Gw2AccountChange.api_key: the API key of the account
+        _Gw2AccountChange.checked: the refresh time (UTC)
+        _Gw2AccountChange.kind: the changed counter - 'wallet', 'materials' or 'level'
+        _Gw2AccountChange.ref: the currency id, item id or character name
+        _Gw2AccountChange.old: the previous value, None for a new character
+        _Gw2AccountChange.new: the new value
+    """
+    __tablename__ = "gw2_auth_account_change"
+
+    id = Column(Integer, primary_key=True)
+    api_key = Column(String, nullable=False, index=True)
+    checked = Column(DateTime, nullable=False)
+    kind = Column(String, nullable=False)
+    ref = Column(String, nullable=False)
+    old = Column(Integer, nullable=True)
+    new = Column(Integer, nullable=False)
+
+
+class _Gw2AccountUnlockChange(Base):
+    """Db table - history of the unlocks of the accounts (see ``gw2db.diffs``), appended by each accounts refresh
+
+    Its rows are never deleted: the db upgrades keep them.
+
+    Attributes:
+        _Gw2AccountUnlockChange.id: a unused primary key - needed by SQLite
+        _Gw2AccountUnlockChange.api_key: the API key of the account
+        _Gw2AccountUnlockChange.checked: the refresh time (UTC)
+        _Gw2AccountUnlockChange.kind: the unlock kind - 'skins', 'dyes', 'minis', 'titles' or 'recipes'
+        _Gw2AccountUnlockChange.unlock_id: the id of the new unlock
+    """
+    __tablename__ = "gw2_auth_account_unlock_change"
+
+    id = Column(Integer, primary_key=True)
+    api_key = Column(String, nullable=False, index=True)
+    checked = Column(DateTime, nullable=False)
+    kind = Column(String, nullable=False)
+    unlock_id = Column(Integer, nullable=False)
@@ -97,12 +97,12 @@ class _Gw2CharacterEquipment(Base):
                             secondary="gw2_auth_character_equipment_item_upgrade_rel",
                             uselist=True,
                             info=rel_json(_Gw2CharacterEquipmentUpgrade,
-                                          fn=lambda j, pj: [dict(eqp_id=pj['id'], upgrade_id=x) for x in j]))
+                                          fn=lambda j, pj: [dict(eqp_id=pj['pkid'], upgrade_id=x) for x in j]))
 
     stats = relationship("_Gw2CharacterEquipmentStat",
                          uselist=False,
                          info=rel_json(_Gw2CharacterEquipmentStat,
-                                       fn=lambda j, pj: dict(eqp_id=pj['id'], id=j['id'],
+                                       fn=lambda j, pj: dict(eqp_id=pj['pkid'], id=j['id'],
                                                              **(j['attributes'] if 'attributes' in j else {'aze': 'rty'}))))
 
 
@@ -144,6 +144,7 @@ class _Gw2CharacterInventory(Base):
     pkid = Column(Integer, primary_key=True)
     char_id = Column(Integer, ForeignKey("gw2_auth_character.name"), primary_key=True)
     id = Column(Integer, ForeignKey("gw2_item_item.id"), nullable=False)
+    count = Column(Integer, nullable=False, default=1)
     skin_id = Column(Integer, ForeignKey("gw2_item_skin.id"), nullable=True, info=col_json(keys='skin'))
     binding = Column(String, nullable=True)
     bound_to = Column(String, nullable=True)
@@ -89,4 +89,9 @@ class Gw2Guild(Base):
     def from_parent(_pjson):
         ids = [(x,) for x in _pjson['guild_leader']]
         ids .extend([(x,) for x in _pjson['guilds'] if x not in _pjson['guild_leader']])
-        return (ids, None)
\ No newline at end of file
+        return (ids, None)
+
+    @staticmethod
+    def share_key(params, _pjson):
+        # the members of a guild see the same datas, its leaders see them all
+        return (params, 0 if params[0] in _pjson['guild_leader'] else 1)
\ No newline at end of file
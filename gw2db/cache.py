@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""In-memory datas computed from a db
+
+Super class of the structures read from a db once then queried without db access (``gw2db.prefix``,
+``gw2db.crafting``...): they're built at the first use, and dropped after each successful upgrade of the db - or built
+again right away, for eager caches.
+"""
+
+# std imports
+from threading import Lock
+
+# package imports
+from gw2db.gw2db import DbUpgradeStatus
+
+
+class DbCache:
+    """Datas computed from a db, built by ``_build`` at the first use and dropped after each successful upgrade"""
+    def __init__(self, db, eager=False):
+        """Initialize the cache - it's built at the first use
+
+        :param db: the ``Gw2Db`` to read from
+        :param eager: if True, the datas are built again at the end of each successful upgrade, instead of at the
+                      next use
+        """
+        self._db = db
+        self._lock = Lock()
+        self._datas = None
+        self._eager = eager
+        db.running_status += self._on_status
+
+    def close(self):
+        """Stop following the db upgrades, and free the datas"""
+        self._db.running_status -= self._on_status
+        self.invalidate()
+
+    @property
+    def built(self):
+        """True if the datas are built"""
+        return self._datas is not None
+
+    def invalidate(self):
+        """Drop the datas, the next use builds them again
+
+        It's called after each successful upgrade of the db. Call it when the db file was upgraded by another
+        process, see ``Gw2Db.refresh``.
+        """
+        with self._lock:
+            self._datas = None
+
+    def _on_status(self, status, count):
+        if status == DbUpgradeStatus.success:
+            self.invalidate()
+            if self._eager:
+                try:
+                    self._get()
+                except Exception:
+                    # the upgrade is over anyway: the datas are built at the next use
+                    pass
+
+    def _get(self):
+        """Give the datas, built if needed
+
+        :return: the ``_build`` result
+        """
+        with self._lock:
+            if self._datas is None:
+                # not the reader of the current thread, which may still read the datas before an upgrade
+                with self._db.fresh_reader() as session:
+                    self._datas = self._build(session)
+            return self._datas
+
+    def _build(self, session):
+        """Read the db and compute the datas
+
+        :param session: a session reading the last datas, see ``Gw2Db.fresh_reader``
+        :return: the datas, anything but None
+        """
+        raise NotImplementedError()
@@ -20,6 +20,8 @@ This module provides elements used by the whole package, particularly JSON to db
 Attributes:
     addr_v2: base WebAPI url used to download datas.
 
+    LANGS: the languages of the WebAPI localized endpoints.
+
     Base: super class for all tables declarations. It didn't use the standard ``DeclarativeMeta`` class
         but an inherited one ``_JsonDeclarativeMeta`` which declare some JSON mapping abstract functions.
 
@@ -29,6 +31,7 @@ Attributes:
 import copy
 import math
 import json
+import time
 import traceback
 from abc import abstractmethod
 from enum import IntEnum, unique
@@ -39,7 +42,7 @@ from tzlocal import get_localzone
 from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import closing
-from threading import Event, Lock
+from threading import Condition, Event, Lock, local
 
 # web imports
 import requests
@@ -52,9 +55,16 @@ from sqlalchemy import Integer, String
 from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
 from sqlalchemy.inspection import inspect
 
+# package imports
+from gw2db.metrics import EndpointMetrics, PageMetrics
+from gw2db.tracing import Tracer
+
 # base WebAPI url
 addr_v2 = 'https://api.guildwars2.com/v2/'
 
+# WebAPI languages
+LANGS = ['en', 'fr', 'de', 'es']
+
 
 class _JsonDeclarativeMeta(DeclarativeMeta):
     """Super class for tables declaration
@@ -92,6 +102,18 @@ class _JsonDeclarativeMeta(DeclarativeMeta):
         """
         ch.set_params(key, _json)
 
+    @abstractmethod
+    def share_key(self, params, _pjson):
+        """For parametrized authenticated endpoints, tell if the datas of a request may be shared by several access
+        tokens: the requests of the same key, with the same url arguments, are sent once - with the access token of
+        the lowest rank, at once for rank 0 - and the answer is given to all of them
+
+        :param params: remplacement params for url, see ``from_parent``
+        :param _pjson: parent endpoint object
+        :return: None if the datas depend on the access token, else a tuple - (hashable key, rank)
+        """
+        return None
+
     @abstractmethod
     def after_build(self, mapped):
         """Do something after JSON to db mapping
@@ -210,36 +232,200 @@ def gw2_to_orm_date(strdate, pj):
     return d.replace(tzinfo=timezone.utc).astimezone(get_localzone())
 
 
+def translation_key(values):
+    """Make the row key stored in ``Gw2Translation.row``
+
+    :param values: the primary key values of the row, in the mapper order (see ``sqlalchemy.inspect(obj).identity``)
+    :return: the row key
+    """
+    return ','.join(str(x) for x in values)
+
+
+class _SharedRequest:
+    """A request of several access tokens, see ``_SharedRequests``"""
+    __slots__ = ('leader', 'leader_rank', 'text', 'rank', 'waiting')
+
+    def __init__(self):
+        self.leader = None  # the endpoint manager sending the request
+        self.leader_rank = None  # the rank of its access token
+        self.text = None  # the answer of the lowest rank received
+        self.rank = None  # the rank of the access token it was received with
+        self.waiting = list()  # (rank, endpoint manager, (url arguments, params, parent)) not queued yet
+
+
+class _SharedRequests:
+    """The requests of several access tokens answered with the same datas, see ``_JsonDeclarativeMeta.share_key``
+
+    A request is sent once, with the access token of the lowest rank: as soon as a rank 0 token asks for it, else
+    when the endpoint manager of one of its tokens gets all its parameters. The other tokens get its answer, those
+    asking for it later too - but an answer is only given to tokens of its rank or above: a rank 0 token asking once
+    a higher rank one was sent gets the answer of its own request. If it fails, it's sent again with the next token.
+    The managers of several trees may share their requests, see ``Gw2Endpoint.share_requests``.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._queued = Condition(self._lock)  # notified when requests are queued, or endpoint managers fail
+        self._requests = dict()
+        self._waiting = dict()  # key=endpoint manager, value=number of its requests not queued yet
+
+    def waiting(self, ep):
+        """Give the number of requests of an endpoint manager not queued yet - it mustn't end before them
+
+        :param ep: the ``Gw2Endpoint``
+        :return: the number of requests
+        """
+        with self._lock:
+            return self._waiting.get(ep, 0)
+
+    def wait(self, ep):
+        """Wait until the requests of an endpoint manager are all queued, or it fails
+
+        :param ep: the ``Gw2Endpoint``
+        :return: True if it had requests not queued yet
+        """
+        with self._queued:
+            if self._waiting.get(ep, 0) == 0:
+                return False
+            self._queued.wait_for(lambda: self._waiting.get(ep, 0) == 0 or ep._err.is_set())
+            return True
+
+    def add(self, key, rank, ep, request):
+        """Add the request of an access token
+
+        :param key: the shared request key
+        :param rank: the rank of the access token, see ``_JsonDeclarativeMeta.share_key``
+        :param ep: the ``Gw2Endpoint`` of the access token
+        :param request: (url arguments, params, parent JSON datas)
+        """
+        with self._lock:
+            shared = self._requests.setdefault(key, _SharedRequest())
+            if shared.text is not None and shared.rank <= rank:
+                self._give(ep, request, shared.text)
+                return
+            self._waiting[ep] = self._waiting.get(ep, 0) + 1
+            shared.waiting.append((rank, ep, request))
+            if shared.leader is None and rank == 0:
+                self._send(shared)
+
+    def answer(self, shared, ep, text):
+        """Give the answer of a request to the access tokens waiting for it - those of a lower rank than its sender
+        send it again
+
+        :param shared: the ``_SharedRequest``
+        :param ep: the ``Gw2Endpoint`` which sent it
+        :param text: the received bytes
+        """
+        with self._lock:
+            if shared.leader is not ep:
+                # sent again meanwhile, see abandon
+                return
+            if shared.text is None or shared.leader_rank < shared.rank:
+                shared.text, shared.rank = text, shared.leader_rank
+            shared.leader = None
+            waiting = list()
+            for (rank, wep, request) in shared.waiting:
+                if rank < shared.rank:
+                    waiting.append((rank, wep, request))
+                    continue
+                self._waiting[wep] -= 1
+                self._give(wep, request, shared.text)
+            shared.waiting = waiting
+            if len(waiting) > 0:
+                self._send(shared)
+
+    def flush(self, ep):
+        """Send the requests an endpoint manager waits for - it got all its parameters
+
+        :param ep: the ``Gw2Endpoint``
+        """
+        with self._lock:
+            for shared in self._requests.values():
+                if shared.leader is None and any(x[1] is ep for x in shared.waiting):
+                    self._send(shared)
+
+    def abandon(self, ep):
+        """Send again the requests sent by a failed endpoint manager, with the next access tokens
+
+        :param ep: the ``Gw2Endpoint``
+        """
+        with self._lock:
+            for shared in self._requests.values():
+                if shared.leader is ep:
+                    self._send(shared)
+            # its own waiting requests are dropped
+            self._queued.notify_all()
+
+    def _send(self, shared):
+        """Queue a request with its lowest rank access token whose endpoint manager didn't fail - lock held"""
+        shared.leader = None
+        alive = [x for x in shared.waiting if not x[1]._err.is_set()]
+        if len(alive) == 0:
+            return
+        leader = min(alive, key=lambda x: x[0])
+        shared.waiting.remove(leader)
+        (rank, ep, (ua, _f_, _pj)) = leader
+        shared.leader, shared.leader_rank = ep, rank
+        self._waiting[ep] -= 1
+        # before the end marker, see Gw2Endpoint._read
+        ep._pqueue.append((ua, _f_, _pj, shared, None))
+        self._queued.notify_all()
+
+    def _give(self, ep, request, text):
+        """Queue a request with its answer - lock held"""
+        (ua, _f_, _pj) = request
+        ep._pqueue.append((ua, _f_, _pj, None, text))
+        ep.metrics.add_shared(1)
+        self._queued.notify_all()
+
+
 class Gw2Endpoint:
     """WebAPI endpoint manager
 
     Need a table declared class with ``endpoint_def`` to work. This class downloads datas from an endpoint,
     maps them into a dictionnary which can be added to the database
+
+    With other locales, each page of a localized endpoint is downloaded in these languages too, at once. The objects
+    of a language are mapped like the main ones, then compared to them: only the strings which differ are kept, as
+    ``Gw2Translation`` rows.
     """
-    def __init__(self, table, lang, children):
+    def __init__(self, table, lang, children, tracer=None, http=None, locales=()):
         """Initialize an endpoint manager
 
         :param table: an inherited class of ``Base`` which has a ``__table_args__ = endpoint_def(...)`` attribute
         :param lang: current db language
         :param children: list of all inherited class of ``Base`` which are declared with ``EPType.child`` in type
+        :param tracer: the ``Tracer`` used to trace download / decode / mapping stages - if None, nothing is traced
+        :param http: the HTTP client used to reach the WebAPI, any object with a ``requests``-like ``get`` function
+                     - if None, ``requests`` is used
+        :param locales: other languages of the translatable strings - ``lang`` is ignored if given
         """
         self._table = table
+        self._tracer = tracer if tracer is not None else Tracer()
+        self._http = http if http is not None else requests
         kwargs = copy.deepcopy(table.__table__.info)
 
         self._endpoint = kwargs.pop('endpoint')
         self._locale = lang if kwargs.pop('locale') else None
+        self._locales = [x for x in locales if x != lang] if self._locale is not None else list()
         self._workers = kwargs.pop('workers')
         self._type = kwargs.pop('ep_type')
         self._rights = kwargs.pop('rights')
 
-        self._children = [Gw2Endpoint(x, lang, children) for x in children if x.__table__.info['parent'] == table.__name__]
+        self._children = [Gw2Endpoint(x, lang, children, tracer, http, locales)
+                          for x in children if x.__table__.info['parent'] == table.__name__]
 
         self._lock = Lock()
-        self._pkid = 0
+        self._pkid = [0]  # may be shared with other managers, see share_pkids
+
+        self._metrics = EndpointMetrics(table.__name__)
+        self._metrics.children = [ch.metrics for ch in self._children]
+        self._local = local()
 
         self._end = Event()
         self._err = Event()
         self._pqueue = deque()
+        self._shared = _SharedRequests()
+        self._refused = set()
 
     @property
     def table_name(self):
@@ -257,18 +443,99 @@ class Gw2Endpoint:
         """
         return self._rights
 
+    @property
+    def metrics(self):
+        """Give access to the endpoint counters
+
+        :return: the ``EndpointMetrics`` of this endpoint, subendpoints ones are in its ``children``
+        """
+        return self._metrics
+
+    @property
+    def refused(self):
+        """Give the access tokens refused by the WebAPI: their requests got a 401 or 403 error (revoked token, missing
+        permission...) - temporary errors (429, 5xx...) are not refusals
+
+        :return: a set of access tokens
+        """
+        return self._refused
+
+    @property
+    def tables(self):
+        """Give the table classes mapped by this endpoint: its table, the polymorphic subtypes and the subtables of
+        its JSON mapping - the subendpoints tables are not given
+
+        :return: a list of classes
+        """
+        found = list()
+        stack = [self._table]
+        while len(stack) > 0:
+            table = stack.pop()
+            if table in found:
+                continue
+            found.append(table)
+            stack.extend(table.__subclasses__())
+            stack.extend(x.info['map'] for x in inspect(table).relationships if 'map' in x.info)
+        return found
+
+    def walk(self):
+        """Iterate over this endpoint manager and all the subendpoints ones
+
+        :return: a generator of ``Gw2Endpoint``
+        """
+        yield self
+        for ch in self._children:
+            for ep in ch.walk():
+                yield ep
+
+    def seed(self, pkid):
+        """Make the generated primary key ids start after a value - used to add rows to a filled db
+
+        :param pkid: the last used primary key id
+        """
+        with self._lock:
+            self._pkid[0] = max(self._pkid[0], pkid)
+
+    def share_pkids(self, other):
+        """Generate the primary key ids with the counter of another manager, subendpoints included - so the rows
+        mapped by several trees of the same endpoint may be stored together
+
+        :param other: a ``Gw2Endpoint`` of the same table, made with the same children
+        """
+        self._lock, self._pkid = other._lock, other._pkid
+        for ch, och in zip(self._children, other._children):
+            ch.share_pkids(och)
+
+    def share_requests(self, other):
+        """Share the requests of several access tokens with another manager, subendpoints included - so the trees of
+        several keys send them once, see ``_JsonDeclarativeMeta.share_key``
+
+        :param other: a ``Gw2Endpoint`` of the same table, made with the same children
+        """
+        self._shared = other._shared
+        for ch, och in zip(self._children, other._children):
+            ch.share_requests(och)
+
     @property
     def _next_pkid(self):
         """Generate a new primary key id
 
         SQLite need an integer primary key if there is only one primary_key. Some JSON objects have a string as id and
-        have subobjects, so it need this property
+        have subobjects, so it need this property. While a translated object is mapped, the ids given to the main
+        object are given again, in the same order, so their rows match.
 
         :return:
         """
+        replay = getattr(self._local, 'replay', None)
+        if replay is not None:
+            return replay.popleft() if len(replay) > 0 else None
         with self._lock:
-            self._pkid += 1
-            return self._pkid
+            self._pkid[0] += 1
+            pkid = self._pkid[0]
+        record = getattr(self._local, 'record', None)
+        if record is not None:
+            record.append(pkid)
+        return pkid
 
     def _size(self, args=None):
         """For non single endpoints, get the number of objects returned by the endpoint
@@ -280,18 +547,23 @@ class Gw2Endpoint:
             return 0
 
         # urlp = '?' + urlencode(args) if args is not None and len(args) > 0 else ''
+        st = time.time()
         for i in range(0, 3):
             try:
                 # ans = requests.get(addr_v2 + self._endpoint + urlp, timeout=20)
-                ans = requests.get(addr_v2 + self._endpoint, params=args, timeout=10)
+                with self._tracer.span('size', 'net', self.table_name, attempt=i):
+                    ans = self._http.get(addr_v2 + self._endpoint, params=args, timeout=10)
                 s = int(math.ceil(int(ans.headers['x-result-total']) / 200))
                 ans.close()
+                self._metrics.add_size(i + 1, time.time() - st)
                 return s
             except Timeout:
                 continue
             except (HTTPError, KeyError) as e:
+                self._metrics.add_size(i + 1, time.time() - st)
                 self.on_error("Exception when getting size:", e)
                 return -1
+        self._metrics.add_size(3, time.time() - st)
         self.on_error("Timeout when getting size")
         return -1
 
@@ -325,14 +597,20 @@ class Gw2Endpoint:
         :return: list of JSON objects
         """
         args, params, parent = (None, None, None)
+        self._local.page = None
         while not self._err.is_set():
             try:
                 p = self._pqueue.pop()
                 if type(p) is str:
+                    if self._shared.wait(self):
+                        # shared requests were queued meanwhile, see _SharedRequests
+                        self._pqueue.appendleft(p)
+                        continue
                     self._end.set()
                     return None
 
-                (args, params, parent) = p
+                (args, params, parent, shared, payload) = p
+                page = PageMetrics(args, len(self._pqueue))
                 break
             except IndexError:
                 params = None
@@ -349,60 +627,129 @@ class Gw2Endpoint:
             else:
                 endpoint = self._endpoint % params
 
-        text = ''
+        if payload is not None:
+            # the answer is already known, see set_params
+            text = payload
+            page.bytes = len(text)
+            self._metrics.add_page(page)
+        else:
+            text = self._download(endpoint, args, page)
+            if text is not None and shared is not None:
+                self._shared.answer(shared, self, text)
+        if text is None:
+            return None
+
+        st = time.time()
+        _json = self._decode(text, endpoint, args, params, parent)
+        page.decode_time = time.time() - st
+        self._local.page = page
+
+        # the subendpoints params - their own requests (size...) are counted by their metrics
+        key = args['access_token'] if 'access_token' in args else ''
+        for ch in self._children:
+            for _j in _json:
+                self._table.to_child(ch, key, _j)
+
+        # the same page in the other languages
+        self._local.translated = dict()
+        if len(self._locales) > 0 and 'lang' in args:
+            pages = [PageMetrics(dict(args, lang=x), len(self._pqueue)) for x in self._locales]
+            with ThreadPoolExecutor(max_workers=len(self._locales)) as dl:
+                texts = list(dl.map(lambda x: self._download(endpoint, x.args, x), pages))
+            for lpage, ltext in zip(pages, texts):
+                if ltext is None:
+                    return None
+                st = time.time()
+                self._local.translated[lpage.args['lang']] = self._decode(ltext, endpoint, args, params, parent)
+                lpage.decode_time = time.time() - st
+        return _json
+
+    def _download(self, endpoint, args, page):
+        """Download a page of the endpoint, counted into its page counters
+
+        :param endpoint: the endpoint, with its params
+        :param args: url arguments
+        :param page: the ``PageMetrics`` of the page
+        :return: the received bytes, None on error
+        """
+        text = b''
+        st = time.time()
         for i in range(0, 3):
+            page.requests += 1
             try:
-                text = ''
                 # with closing(requests.get(addr_v2 + endpoint + urlp, stream=True, timeout=40)) as r:
-                with closing(requests.get(addr_v2 + endpoint, params=args, stream=True, timeout=30)) as r:
+                with self._tracer.span('download', 'net', self.table_name, url=endpoint, attempt=i), \
+                        closing(self._http.get(addr_v2 + endpoint, params=args, stream=True, timeout=30)) as r:
                     r.raise_for_status()
-                    for data in r.iter_content(chunk_size=1024, decode_unicode=True):
-                        text += data
+                    text = b''.join(r.iter_content(chunk_size=1024))
                     r.close()
+                break
             except Timeout:
+                page.retries += 1
                 continue
             except RequestException as e:
+                page.download_time = time.time() - st
+                self._metrics.add_page(page)
+                status = e.response.status_code if getattr(e, 'response', None) is not None else 0
+                if status in (401, 403) and 'access_token' in args:
+                    with self._lock:
+                        self._refused.add(args['access_token'])
                 self.on_error("Exception while downloading datas:", e)
                 return None
+        page.download_time = time.time() - st
+        page.bytes = len(text)
+        self._metrics.add_page(page)
         if len(text) == 0:
             self.on_error("Timeout while downloading datas")
             return None
+        return text
 
-        _json = json.loads(text)
-        if type(_json) is not list:
-            _json = [_json]
-        for i in range(0, len(_json)):
-            if type(_json[i]) is dict:
-                break
-            if _json[i] is not None and type(_json[i]) is not dict:
-                _json = [{'id': x} for x in _json if x is not None]
-                break
+    def _decode(self, text, endpoint, args, params, parent):
+        """Decode a downloaded page into a list of JSON objects, with their access token and parent datas
 
-        _json = [x for x in _json if x is not None]
+        :param text: the received bytes
+        :param endpoint: the endpoint, with its params
+        :param args: url arguments
+        :param params: remplacement params for url
+        :param parent: parent (extracted) JSON datas
+        :return: list of JSON objects
+        """
+        with self._tracer.span('decode', 'decode', self.table_name, url=endpoint, bytes=len(text)):
+            _json = json.loads(text.decode('utf-8'))
+            if type(_json) is not list:
+                _json = [_json]
+            for i in range(0, len(_json)):
+                if type(_json[i]) is dict:
+                    break
+                if _json[i] is not None and type(_json[i]) is not dict:
+                    _json = [{'id': x} for x in _json if x is not None]
+                    break
+
+            _json = [x for x in _json if x is not None]
         if (self._type & (EPType.auth | EPType.child)) != 0:
             for _j in _json:
                 if (self._type & EPType.auth) != 0:
                     _j['api_key'] = args['access_token']
                 if (self._type & EPType.child) != 0:
                     self._table.merge_json(_j, parent, params)
-
-        for ch in self._children:
-            for _j in _json:
-                self._table.to_child(ch, args['access_token'] if 'access_token' in args else '', _j)
-
         return _json
 
     def _mapping(self, _json, table, _pjson=None):
         """Map a JSON object / subobject to a storable dictionnary
 
         This method is recursive. The first call is for the endpoint object, next are for subobject found with
-        table relationship
+        table relationship. Each call is traced as a ``map`` span named after ``table``.
 
         :param _json: JSON object / subobject to map
         :param table: inherited class of Base to map JSON into
         :param _pjson: parent JSON object - None on first call, parent object of ``_json`` after
         :return: a list of mapped objects as tuple - (table, list of objects)
         """
+        with self._tracer.span(table.__name__, 'map', self.table_name):
+            return self._map_json(_json, table, _pjson)
+
+    def _map_json(self, _json, table, _pjson=None):
+        """Untraced body of ``_mapping``, see its documentation"""
         def strlist(x):
             return str(x)[1: -1]
 
@@ -498,11 +845,16 @@ class Gw2Endpoint:
                     self.on_error("_read returned None")
                 break
 
-            for _j in _json:
+            page = self._local.page
+            translated = {k: (v, {x['id']: x for x in v if 'id' in x}) for k, v in self._local.translated.items()}
+            st = time.time()
+            for i, _j in enumerate(_json):
                 if self._err.is_set():
                     break
 
+                self._local.record = list() if len(translated) > 0 else None
                 _map = self._mapping(_j, self._table)
+                pkids, self._local.record = self._local.record, None
                 if _map is None:
                     if not self._end.is_set():
                         self.on_error("_mapping returned None")
@@ -510,9 +862,61 @@ class Gw2Endpoint:
                 for elem in _map:
                     (k, v) = elem
                     mapped.append((k, v))
+                    page.add_rows(k.__name__)
+
+                for lang, (objs, ids) in translated.items():
+                    _lj = ids.get(_j['id']) if 'id' in _j else (objs[i] if i < len(objs) else None)
+                    if _lj is None:
+                        continue
+                    rows = self._translate(_map, pkids, _lj, lang)
+                    if rows is None:
+                        break
+                    mapped.extend((Gw2Translation, x) for x in rows)
+                    page.add_rows(Gw2Translation.__name__, len(rows))
+            page.mapping_time = time.time() - st
 
         return mapped if not self._err.is_set() else None
 
+    def _translate(self, _map, pkids, _ljson, lang):
+        """Map an object in another language and keep its strings which differ from the mapped main object
+
+        Primary / foreign keys are never translated, and rows without primary key are skipped. The rows are paired in
+        mapping order: an object mapped into other rows (a subobjects list of another length...) is skipped, as its
+        rows can't be paired.
+
+        :param _map: the mapped main object, as returned by ``_mapping``
+        :param pkids: the primary key ids generated while mapping the main object
+        :param _ljson: the JSON object in the other language
+        :param lang: the other language
+        :return: a list of ``Gw2Translation`` rows, None on error
+        """
+        self._local.replay = deque(pkids)
+        try:
+            _lmap = self._mapping(_ljson, self._table)
+        finally:
+            self._local.replay = None
+        if _lmap is None:
+            return None
+        if [x[0] for x in _map] != [x[0] for x in _lmap]:
+            return list()
+
+        rows = list()
+        for (table, row), (_, lrow) in zip(_map, _lmap):
+            mapper = inspect(table)
+            key = [row.get(x.key) for x in mapper.primary_key]
+            if None in key:
+                continue
+            for name, value in row.items():
+                lvalue = lrow.get(name)
+                if type(value) is not str or type(lvalue) is not str or lvalue == value or name not in mapper.columns:
+                    continue
+                col = mapper.columns[name]
+                if col.primary_key or len(col.foreign_keys) > 0:
+                    continue
+                rows.append(dict(tablename=col.table.name, row=translation_key(key), column=name, lang=lang,
+                                 value=lvalue))
+        return rows
+
     def upgrade(self):
         """Read and map all the endpoint datas, then manage subendpoints.
 
@@ -525,7 +929,7 @@ class Gw2Endpoint:
                 self.on_error("Can't create args?!")
                 return None
             for ua in uas:
-                self._pqueue.appendleft((ua, None, None))
+                self._pqueue.appendleft((ua, None, None, None, None))
             self._pqueue.appendleft('end')
 
             w = min(len(self._pqueue), self._workers)
@@ -559,7 +963,7 @@ class Gw2Endpoint:
                 ch.set_params()
 
         # starting children
-        with ThreadPoolExecutor(max_workers=len(self._children)) as ch_dl:
+        with ThreadPoolExecutor(max_workers=max(1, len(self._children))) as ch_dl:
             ch_ths = {ch_dl.submit(x.upgrade): x for x in self._children}
             for future in as_completed(ch_ths):
                 if future.exception() is not None:
@@ -582,16 +986,18 @@ class Gw2Endpoint:
         self._table.after_build(mapped)
         return mapped if not self._err.is_set() else None
 
-    def set_params(self, key='', _pjson=None):
+    def set_params(self, key='', _pjson=None, payload=None):
         """Add parameters needed to call the endpoint
 
         :param key: access token
         :param _pjson: parent endpoint object
+        :param payload: the answer, if already known - it's not downloaded. Only for single endpoints
         """
         if self._type == EPType.std:
             return
 
         if len(key) == 0 and _pjson is None:
+            self._shared.flush(self)
             self._pqueue.appendleft('end')
             return
 
@@ -614,7 +1020,18 @@ class Gw2Endpoint:
         else:
             (format_, _pj) = ([None], _pjson)
 
-        self._pqueue.extendleft([(ua, _f_, _pj) for ua in uas for _f_ in format_])
+        if (self._type & EPType.psac) == EPType.psac:
+            for _f_ in format_:
+                share = self._table.share_key(_f_, _pjson)
+                for ua in uas:
+                    if share is None:
+                        self._pqueue.appendleft((ua, _f_, _pj, None, None))
+                        continue
+                    skey = (share[0], tuple(sorted((k, v) for k, v in ua.items() if k != 'access_token')))
+                    self._shared.add(skey, share[1], self, (ua, _f_, _pj))
+            return
+
+        self._pqueue.extendleft([(ua, _f_, _pj, None, payload) for ua in uas for _f_ in format_])
 
     def on_error(self, msg='', exc=None):
         """Stop the download / mapping. The ``upgrade`` method will finish with error too"""
@@ -626,6 +1043,7 @@ class Gw2Endpoint:
             print(self._table.__name__, exc)
 
         self._err.set()
+        self._shared.abandon(self)
         for ch in self._children:
             ch.on_error()
 
@@ -643,3 +1061,24 @@ class Param(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False)
     value = Column(String, nullable=False)
+
+
+class Gw2Translation(Base):
+    """Db table - store the translatable strings of the other languages
+
+    Only the strings which differ from the db language ones are stored, see ``Gw2Db.translate``.
+
+    Attributes:
+        Gw2Translation.tablename: the name of the table holding the string
+        Gw2Translation.row: the primary key of the row holding the string, see ``translation_key``
+        Gw2Translation.column: the name of the column holding the string
+        Gw2Translation.lang: the language of the string
+        Gw2Translation.value: the string
+    """
+    __tablename__ = "gw2_translations"
+
+    tablename = Column(String, primary_key=True)
+    row = Column(String, primary_key=True)
+    column = Column(String, primary_key=True)
+    lang = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
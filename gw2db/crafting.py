@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Crafting trees resolution
+
+A ``CraftingGraph`` reads the whole recipes graph once (``Gw2Recipe`` and its ingredients), into compact adjacency
+arrays: each item of the graph is a node, and the ingredients of its recipe are stored in CSR form (compressed
+sparse rows): the ingredients of the node ``n`` are the entries ``ptr[n]`` to ``ptr[n + 1] - 1`` of the ``node`` /
+``count`` arrays.
+
+Recipes may form cycles (an item crafted from an item crafted from the first one): the ingredients closing a cycle
+are marked once, when the graph is built, and always considered as raw materials. The graph is then a DAG, whose
+nodes are sorted in a topological order, ingredients after the items they're used by.
+
+Given a price of each item (``read_prices``, or any dictionnary), ``CraftingGraph.costs`` chooses between buying and
+crafting each node, in one pass over the nodes from the raw materials up to the final items.
+
+Example:
+    >>> graph = CraftingGraph(db)
+    >>> graph.bill(30689, 2)  # raw materials of 2 Eternity
+    {19721: 500, 19976: 200, ...}
+    >>> costs = graph.costs(read_prices('prices.csv'))
+    >>> costs.cost(30689), costs.is_crafted(30689)
+    (1450000.0, True)
+    >>> graph.bill(30689, 2, costs=costs)  # items to buy to craft 2 Eternity
+    {19721: 500, 24295: 4, ...}
+"""
+
+# std imports
+from array import array
+from collections import namedtuple
+import csv
+
+# package imports
+from gw2db.cache import DbCache
+from gw2db.items.recipes import Gw2Recipe, _Gw2RecipeIngredient, _Gw2RecipeGUIngredient
+
+_Graph = namedtuple('_Graph', ['ids', 'index', 'recipe', 'output', 'ptr', 'node', 'count', 'raw', 'gptr', 'gid',
+                               'gcount', 'topo', 'order', 'subtrees'])
+"""the adjacency arrays - ``ids`` / ``index``: item id of each node / node of each item id, ``recipe`` / ``output``:
+recipe id and output count of each node (0 if not crafted), ``ptr`` / ``node`` / ``count`` / ``raw``: ingredients in
+CSR form, ``gptr`` / ``gid`` / ``gcount``: guild upgrade ingredients in CSR form, ``topo``: topological rank of each
+node, ``order``: the nodes from the raw materials up to the final items (reversed topological order), ``subtrees``:
+memoized crafting trees - key=root node"""
+
+INF = float('inf')
+"""cost of an item which can be neither bought nor crafted"""
+
+
+def read_prices(path, id_column='item_id', price_column='price'):
+    """Read items prices from a CSV file, with a header line
+
+    :param path: the CSV file path
+    :param id_column: name of the item id column
+    :param price_column: name of the price column - rows without price are skipped
+    :return: a dictionnary - key=item id, value=price
+    """
+    prices = dict()
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            price = (row.get(price_column) or '').strip()
+            if len(price) > 0:
+                prices[int(row[id_column])] = float(price)
+    return prices
+
+
+class CraftCosts:
+    """Cheapest way to get each item of a recipes graph, see ``CraftingGraph.costs``
+
+    Attributes:
+        CraftCosts.unit: the unit cost of each node of the graph (``array('d')``), ``INF`` if the item can be neither
+                         bought nor crafted
+        CraftCosts.crafted: a bytearray, 1 for the nodes cheaper to craft than to buy
+    """
+    def __init__(self, graph, unit, crafted):
+        self._graph = graph
+        self.unit = unit
+        self.crafted = crafted
+
+    def cost(self, item_id, count=1):
+        """Give the cost of items
+
+        :param item_id: the item id
+        :param count: the number of items
+        :return: the cheapest cost, ``INF`` if the item can be neither bought nor crafted. An item which is not in
+                 the recipes graph has no cost
+        """
+        n = self._graph.index.get(item_id)
+        return INF if n is None else self.unit[n] * count
+
+    def is_crafted(self, item_id):
+        """Tell if an item is cheaper to craft than to buy
+
+        :param item_id: the item id
+        :return: True if the item is crafted
+        """
+        n = self._graph.index.get(item_id)
+        return n is not None and self.crafted[n] == 1
+
+    def items(self):
+        """Give the costs of all the items of the graph
+
+        :return: a dictionnary - key=item id, value=(unit cost, crafted)
+        """
+        g = self._graph
+        return {g.ids[n]: (self.unit[n], self.crafted[n] == 1) for n in range(0, len(g.ids))}
+
+
+class CraftingGraph(DbCache):
+    """Recipes graph of a db, see ``DbCache``
+
+    An item crafted by several recipes uses the one with the lowest id. Guild upgrades (guild hall recipes
+    ingredients) are not crafted: they're only counted, see ``bill``.
+    """
+    def _build(self, session):
+        """Read the recipes and build the adjacency arrays
+
+        :param session: the session to read with, see ``DbCache._build``
+        :return: a ``_Graph``
+        """
+
+        ids = array('l')
+        index = dict()
+
+        def node_of(item_id):
+            n = index.get(item_id)
+            if n is None:
+                n = index[item_id] = len(ids)
+                ids.append(item_id)
+            return n
+
+        # one recipe by output item
+        recipes = dict()
+        for rid, item_id, output in session.query(Gw2Recipe.id, Gw2Recipe.output_item_id, Gw2Recipe.output_item_count)\
+                .order_by(Gw2Recipe.id.desc()).all():
+            recipes[node_of(item_id)] = (rid, output)
+        by_recipe = {v[0]: k for k, v in recipes.items()}
+
+        ingredients = dict()
+        for rid, item_id, count in session.query(_Gw2RecipeIngredient.recipe_id, _Gw2RecipeIngredient.item_id,
+                                                 _Gw2RecipeIngredient.count).order_by(_Gw2RecipeIngredient.item_id):
+            if rid in by_recipe:
+                ingredients.setdefault(by_recipe[rid], list()).append((node_of(item_id), count))
+        upgrades = dict()
+        for rid, upgrade_id, count in session.query(_Gw2RecipeGUIngredient.recipe_id, _Gw2RecipeGUIngredient.upgrade_id,
+                                                    _Gw2RecipeGUIngredient.count)\
+                .order_by(_Gw2RecipeGUIngredient.upgrade_id):
+            if rid in by_recipe:
+                upgrades.setdefault(by_recipe[rid], list()).append((upgrade_id, count))
+
+        size = len(ids)
+        recipe, output = array('l', [0] * size), array('l', [0] * size)
+        ptr, node, count = array('l', [0]), array('l'), array('l')
+        gptr, gid, gcount = array('l', [0]), array('l'), array('l')
+        for n in range(0, size):
+            if n in recipes:
+                recipe[n], output[n] = recipes[n]
+            for c, k in ingredients.get(n, ()):
+                node.append(c)
+                count.append(k)
+            ptr.append(len(node))
+            for u, k in upgrades.get(n, ()):
+                gid.append(u)
+                gcount.append(k)
+            gptr.append(len(gid))
+
+        raw, topo, order = self._sort(size, ptr, node)
+        return _Graph(ids, index, recipe, output, ptr, node, count, raw, gptr, gid, gcount, topo, order, dict())
+
+    @staticmethod
+    def _sort(size, ptr, node):
+        """Find the ingredients closing a cycle, then sort the nodes
+
+        :param size: number of nodes
+        :param ptr: CSR rows of the ingredients
+        :param node: CSR ingredient nodes
+        :return: (a bytearray, 1 for the ingredient entries closing a cycle - the topological rank of each node,
+                 ingredients after the items they're used by - the nodes in reversed topological order)
+        """
+        raw = bytearray(len(node))
+        state = bytearray(size)  # 0: not seen, 1: being visited, 2: done
+        post = list()
+        for root in range(0, size):
+            if state[root] != 0:
+                continue
+            state[root] = 1
+            stack = [(root, ptr[root])]
+            while len(stack) > 0:
+                n, e = stack[-1]
+                if e == ptr[n + 1]:
+                    stack.pop()
+                    state[n] = 2
+                    post.append(n)
+                    continue
+                stack[-1] = (n, e + 1)
+                c = node[e]
+                if state[c] == 1:
+                    raw[e] = 1
+                elif state[c] == 0:
+                    state[c] = 1
+                    stack.append((c, ptr[c]))
+
+        topo = array('l', [0] * size)
+        for rank, n in enumerate(reversed(post)):
+            topo[n] = rank
+        return raw, topo, array('l', post)
+
+    def _subtree(self, graph, n):
+        """Give the nodes of a crafting tree, memoized
+
+        :param graph: the ``_Graph``
+        :param n: the root node
+        :return: the nodes reachable from the root (itself included), in topological order
+        """
+        nodes = graph.subtrees.get(n)
+        if nodes is not None:
+            return nodes
+
+        seen = {n}
+        stack = [n]
+        while len(stack) > 0:
+            v = stack.pop()
+            for e in range(graph.ptr[v], graph.ptr[v + 1]):
+                c = graph.node[e]
+                if not graph.raw[e] and c not in seen:
+                    seen.add(c)
+                    stack.append(c)
+        nodes = array('l', sorted(seen, key=graph.topo.__getitem__))
+        graph.subtrees[n] = nodes
+        return nodes
+
+    def recipe_of(self, item_id):
+        """Give the recipe crafting an item
+
+        :param item_id: the item id
+        :return: the recipe id, None if the item is not crafted
+        """
+        graph = self._get()
+        n = graph.index.get(item_id)
+        return graph.recipe[n] if n is not None and graph.output[n] > 0 else None
+
+    def costs(self, prices):
+        """Choose between buying and crafting each item of the graph
+
+        The nodes are read once, from the raw materials up to the final items: the cost of a node is the cheapest of
+        its price and of its recipe cost, the sum of its ingredients costs divided by the recipe output count. An
+        ingredient closing a cycle is always bought. Guild upgrades have no price, and are not counted.
+
+        Prices and costs are kept in ``array('d')``, so that all the recipes are evaluated again in a few tens of
+        milliseconds each time the prices change.
+
+        :param prices: a dictionnary - key=item id, value=unit price. An item without price can't be bought, see
+                       ``read_prices``
+        :return: a ``CraftCosts``
+        """
+        graph = self._get()
+        ids, ptr, node, count, raw, output = graph.ids, graph.ptr, graph.node, graph.count, graph.raw, graph.output
+        size = len(ids)
+        buy = array('d', [INF]) * size
+        for n in range(0, size):
+            price = prices.get(ids[n])
+            if price is not None:
+                buy[n] = price
+
+        unit = array('d', buy)
+        crafted = bytearray(size)
+        for v in graph.order:
+            if output[v] == 0:
+                continue
+            total = 0.
+            for e in range(ptr[v], ptr[v + 1]):
+                total += count[e] * (buy if raw[e] else unit)[node[e]]
+            total /= output[v]
+            if total < unit[v]:
+                unit[v] = total
+                crafted[v] = 1
+        return CraftCosts(graph, unit, crafted)
+
+    def bill(self, item_id, count=1, upgrades=None, costs=None):
+        """Give the raw materials needed to craft items
+
+        The tree is expanded level by level: the needs of an item by all its users are summed first, then the number
+        of crafts is rounded up to the recipe output count.
+
+        :param item_id: the crafted item id
+        :param count: the number of crafted items
+        :param upgrades: if a dictionnary is given, the needed guild upgrades are added to it - key=upgrade id,
+                         value=count
+        :param costs: if a ``CraftCosts`` is given, the items cheaper to buy than to craft are not expanded: the
+                      bill gives the items to buy
+        :return: a dictionnary - key=raw material item id, value=count. An item which is not crafted is its own raw
+                 material
+        :raise ValueError: the costs were computed before the last upgrade of the db
+        """
+        graph = self._get()
+        if costs is not None and costs._graph is not graph:
+            raise ValueError('costs of a previous recipes graph')
+        root = graph.index.get(item_id)
+        if root is None:
+            return {item_id: count}
+
+        needs = {root: count}
+        bill = dict()
+        for v in self._subtree(graph, root):
+            need = needs.pop(v, 0)
+            if need <= 0:
+                continue
+            if graph.output[v] == 0 or (costs is not None and not costs.crafted[v] and v != root):
+                bill[graph.ids[v]] = bill.get(graph.ids[v], 0) + need
+                continue
+
+            crafts = -(-need // graph.output[v])
+            for e in range(graph.ptr[v], graph.ptr[v + 1]):
+                c, k = graph.node[e], crafts * graph.count[e]
+                if graph.raw[e]:
+                    bill[graph.ids[c]] = bill.get(graph.ids[c], 0) + k
+                else:
+                    needs[c] = needs.get(c, 0) + k
+            if upgrades is not None:
+                for e in range(graph.gptr[v], graph.gptr[v + 1]):
+                    upgrades[graph.gid[e]] = upgrades.get(graph.gid[e], 0) + crafts * graph.gcount[e]
+        return bill
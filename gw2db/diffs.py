@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Changes of the accounts datas between two refreshes
+
+Before an accounts refresh replaces the rows of an account (see ``Gw2Db.refresh_accounts``), ``snapshot`` reads its
+wallet, materials storage, unlocks and characters levels, then again once the new rows are stored. ``compare`` gives
+the changes as ``AccountDiff`` objects, ``record`` appends them to the history tables, and the db fires them through
+``Gw2Db.account_changed``: the consumers only read the changes instead of all the accounts tables.
+
+The history tables (``HISTORY``) are append-only, and kept by the db upgrades.
+
+Example:
+    >>> db.account_changed += lambda diff: print(diff.api_key, diff.wallet.get(1))
+    >>> db.refresh_accounts()
+    <api key> (125000, 127500)
+"""
+
+# std imports
+from collections import namedtuple
+from datetime import datetime
+
+# package imports
+from gw2db.auths.accounts import _Gw2AccountChange, _Gw2AccountUnlockChange
+from gw2db.auths.accounts import _Gw2AccountDye, _Gw2AccountMini, _Gw2AccountRecipe, _Gw2AccountSkin, \
+    _Gw2AccountTitle, _Gw2AccountVault, _Gw2AccountWallet, Gw2Account
+from gw2db.auths.characters import Gw2Character
+
+UNLOCKS = (('skins', _Gw2AccountSkin), ('dyes', _Gw2AccountDye), ('minis', _Gw2AccountMini),
+           ('titles', _Gw2AccountTitle), ('recipes', _Gw2AccountRecipe))
+"""the unlocks kinds, with their tables"""
+
+HISTORY = (_Gw2AccountChange.__table__, _Gw2AccountUnlockChange.__table__)
+"""the history tables"""
+
+
+class AccountDiff(namedtuple('AccountDiff', ['api_key', 'checked', 'wallet', 'materials', 'levels', 'unlocks'])):
+    """Changes of an account between two refreshes
+
+    Attributes:
+        AccountDiff.api_key: the API key of the account
+        AccountDiff.checked: the refresh time (UTC)
+        AccountDiff.wallet: the changed currencies - key=currency id, value=(old value, new value)
+        AccountDiff.materials: the changed materials storage counts - key=item id, value=(old count, new count)
+        AccountDiff.levels: the changed characters levels - key=character name, value=(old level, new level), the
+                            old level being None for a new character
+        AccountDiff.unlocks: the new unlocks - key=kind (see ``UNLOCKS``), value=sorted list of ids
+    """
+    __slots__ = ()
+
+    @property
+    def empty(self):
+        """True if nothing changed"""
+        return len(self.wallet) + len(self.materials) + len(self.levels) + len(self.unlocks) == 0
+
+
+def snapshot(session, keys):
+    """Read the followed datas of accounts
+
+    :param session: a session on the db
+    :param keys: the API keys of the accounts
+    :return: a dictionnary - key=API key of a stored account, value=dictionnary of its datas, see ``compare``
+    """
+    keys = list(keys)
+    found = {x[0]: dict(wallet=dict(), materials=dict(), levels=dict(), unlocks={k: set() for k, t in UNLOCKS})
+             for x in session.query(Gw2Account.api_key).filter(Gw2Account.api_key.in_(keys))}
+
+    def fill(name, query):
+        for api_key, ref, value in query:
+            if api_key in found:
+                found[api_key][name][ref] = value
+
+    fill('wallet', session.query(_Gw2AccountWallet.api_key, _Gw2AccountWallet.id, _Gw2AccountWallet.value).filter(
+        _Gw2AccountWallet.api_key.in_(keys)))
+    fill('materials', session.query(_Gw2AccountVault.api_key, _Gw2AccountVault.id, _Gw2AccountVault.count).filter(
+        _Gw2AccountVault.api_key.in_(keys)))
+    fill('levels', session.query(Gw2Character.api_key, Gw2Character.name, Gw2Character.level).filter(
+        Gw2Character.api_key.in_(keys)))
+    for kind, table in UNLOCKS:
+        for api_key, unlock_id in session.query(table.api_key, table.id).filter(table.api_key.in_(keys)):
+            if api_key in found:
+                found[api_key]['unlocks'][kind].add(unlock_id)
+    return found
+
+
+def compare(before, after, checked=None):
+    """Give the changes of accounts
+
+    A missing currency or material counts for 0, and a removed character is not a change. The accounts which were not
+    stored before are skipped: their first datas are not changes.
+
+    :param before: the previous datas, see ``snapshot``
+    :param after: the new datas, see ``snapshot``
+    :param checked: the refresh time (UTC), now if None
+    :return: a list of ``AccountDiff``, one by account stored before and after
+    """
+    checked = checked if checked is not None else datetime.utcnow()
+
+    def changes(old, new, default):
+        return {k: (old.get(k, default), v) for k, v in new.items() if old.get(k, default) != v}
+
+    diffs = list()
+    for api_key in sorted(set(before).intersection(after)):
+        old, new = before[api_key], after[api_key]
+        wallet = changes(old['wallet'], new['wallet'], 0)
+        wallet.update({k: (v, 0) for k, v in old['wallet'].items() if k not in new['wallet'] and v != 0})
+        materials = changes(old['materials'], new['materials'], 0)
+        materials.update({k: (v, 0) for k, v in old['materials'].items() if k not in new['materials'] and v != 0})
+        unlocks = {k: sorted(v - old['unlocks'][k]) for k, v in new['unlocks'].items()
+                   if len(v - old['unlocks'][k]) > 0}
+        diffs.append(AccountDiff(api_key, checked, wallet, materials, changes(old['levels'], new['levels'], None),
+                                 unlocks))
+    return diffs
+
+
+def record(session, diffs):
+    """Append changes to the history tables - not committed
+
+    :param session: a session on the db
+    :param diffs: a list of ``AccountDiff``
+    :return: the number of stored rows
+    """
+    changes = list()
+    unlocks = list()
+    for diff in diffs:
+        for kind, values in (('wallet', diff.wallet), ('materials', diff.materials), ('level', diff.levels)):
+            changes.extend(dict(api_key=diff.api_key, checked=diff.checked, kind=kind, ref=str(k), old=old, new=new)
+                           for k, (old, new) in sorted(values.items()))
+        for kind, ids in sorted(diff.unlocks.items()):
+            unlocks.extend(dict(api_key=diff.api_key, checked=diff.checked, kind=kind, unlock_id=x) for x in ids)
+    if len(changes) > 0:
+        session.execute(_Gw2AccountChange.__table__.insert(), changes)
+    if len(unlocks) > 0:
+        session.execute(_Gw2AccountUnlockChange.__table__.insert(), unlocks)
+    return len(changes) + len(unlocks)
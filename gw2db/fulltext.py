@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Full-text search index
+
+An optional SQLite FTS5 index over the names and descriptions of the major tables, built at the end of an upgrade
+with ``Gw2Db(fulltext=True)``. There is an index by language, ``gw2_search_<lang>``, with a tokenizer suited to
+the language: the db language holds the stored strings, the other languages (see ``Gw2Db.locales``) their
+translations.
+
+Each indexed row has two text columns: ``name`` (the first indexed column) and ``text`` (the other ones). Matches
+are ranked with ``bm25``, a match in the name weighing ``NAME_WEIGHT`` times a match in the text.
+
+Example:
+    >>> db = Gw2Db(fulltext=True)
+    >>> db.upgrade()
+    >>> swords = db.search('ascended swo', tables=[Gw2Item], limit=10)
+"""
+
+# std imports
+import re
+
+# ORM imports
+from sqlalchemy import inspect, text
+
+# package imports
+from gw2db.common import Base, Gw2Translation, translation_key
+
+INDEXED = {
+    'Gw2Achievement': ('name', 'description', 'requirement'),
+    'Gw2Currency': ('name', 'description'),
+    'Gw2Dye': ('name',),
+    'Gw2Finisher': ('name', 'unlock_details'),
+    'Gw2GuildUpgrade': ('name', 'description'),
+    'Gw2Item': ('name', 'description'),
+    'Gw2Mastery': ('name', 'requirement'),
+    'Gw2MiniPet': ('name',),
+    'Gw2Outfit': ('name',),
+    'Gw2Pet': ('name', 'description'),
+    'Gw2Skill': ('name', 'description'),
+    'Gw2Skin': ('name', 'description'),
+    'Gw2Specialization': ('name',),
+    'Gw2Title': ('name',),
+    'Gw2Trait': ('name', 'description'),
+}
+"""the indexed tables - key=class name, value=indexed columns, the name first"""
+
+TOKENIZERS = {
+    'en': 'unicode61 remove_diacritics 2',
+    'fr': 'unicode61 remove_diacritics 2',
+    'de': 'unicode61 remove_diacritics 2',
+    'es': 'unicode61 remove_diacritics 2',
+}
+"""the FTS5 tokenizer of each language - case and accents are ignored, apostrophes split words ("l'épée"). Stemming
+tokenizers (``porter``) are not used: they stem the prefixes of texts being typed too, 'runn' would not find
+'running'"""
+
+NAME_WEIGHT = 10.
+"""the ``bm25`` weight of the name column, the text one weighing 1"""
+
+SHORT_PREFIX = 3
+"""a text made of a shorter prefix is only searched in the names: such a prefix matches a large part of the
+descriptions, whose ranking would be slow"""
+
+
+def index_name(lang):
+    """Give the index table of a language
+
+    :param lang: the language
+    :return: the virtual table name
+    """
+    return 'gw2_search_' + lang
+
+
+def match_query(text_):
+    """Make the FTS5 query of a searched text
+
+    Each word must be found, the last one being a prefix, so a text being typed matches. See ``SHORT_PREFIX``.
+
+    :param text_: the searched text
+    :return: the query, None if the text has no word
+    """
+    words = re.findall(r'\w+', text_, re.UNICODE)
+    if len(words) == 0:
+        return None
+    if len(words) == 1 and len(words[0]) < SHORT_PREFIX:
+        return '{name} : "%s"*' % words[0]
+    return ' '.join(['"%s"' % x for x in words[:-1]] + ['"%s"*' % words[-1]])
+
+
+def has_index(session, lang):
+    """Check if a db has the index of a language
+
+    :param session: a session on the db
+    :param lang: the language
+    :return: True if the index exists
+    """
+    return session.execute(text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                           dict(name=index_name(lang))).scalar() > 0
+
+
+def _indexed_classes():
+    """Give the mapped indexed classes
+
+    :return: a list of (class, indexed columns)
+    """
+    classes = {x.__name__: x for x in Base._decl_class_registry.values() if isinstance(x, type)}
+    return [(classes[k], v) for k, v in sorted(INDEXED.items()) if k in classes]
+
+
+def build_index(session, lang, locales=()):
+    """Build (again) the indexes of the db languages
+
+    The indexes are built inside the session transaction, which is not committed.
+
+    :param session: a session on the db
+    :param lang: the db language
+    :param locales: the other languages, see ``Gw2Db.locales``
+    :return: the number of indexed rows - key=language
+    """
+    counts = dict()
+    for x in [lang] + [y for y in locales if y != lang]:
+        name = index_name(x)
+        session.execute('DROP TABLE IF EXISTS %s' % name)
+        session.execute("CREATE VIRTUAL TABLE %s USING fts5(kind UNINDEXED, row UNINDEXED, name, text, "
+                        "tokenize='%s', prefix='2 3')" % (name, TOKENIZERS[x]))
+        insert = text('INSERT INTO %s (kind, row, name, text) VALUES (:kind, :row, :name, :text)' % name)
+
+        counts[x] = 0
+        for cls, columns in _indexed_classes():
+            mapper = inspect(cls)
+            translated = dict()
+            if x != lang:
+                for col in columns:
+                    translated[col] = dict(session.query(Gw2Translation.row, Gw2Translation.value).filter(
+                        Gw2Translation.tablename == mapper.columns[col].table.name, Gw2Translation.column == col,
+                        Gw2Translation.lang == x).all())
+
+            rows = list()
+            attrs = list(mapper.primary_key) + [getattr(cls, y) for y in columns]
+            for values in session.query(*attrs).all():
+                key = translation_key(values[:len(mapper.primary_key)])
+                strings = [translated[y].get(key, v) if y in translated else v
+                           for y, v in zip(columns, values[len(mapper.primary_key):])]
+                if all(y is None for y in strings):
+                    continue
+                rows.append(dict(kind=cls.__name__, row=key, name=strings[0] or '',
+                                 text='\n'.join(y for y in strings[1:] if y is not None)))
+            if len(rows) > 0:
+                session.execute(insert, rows)
+            counts[x] += len(rows)
+    return counts
+
+
+def search(session, text_, lang, tables=None, limit=20):
+    """Search rows by their names and descriptions
+
+    :param session: a session on the db
+    :param text_: the searched text, its last word being a prefix
+    :param lang: the language of the text
+    :param tables: the searched classes, all the ``INDEXED`` ones if None
+    :param limit: maximum number of rows
+    :return: the list of found objects, best ones first - empty if the db has no index for the language
+    """
+    if tables is not None:
+        kinds = [x.__name__ for x in tables]
+        for x in kinds:
+            if x not in INDEXED:
+                raise ValueError('%s is not indexed' % x)
+    else:
+        kinds = None
+
+    query = match_query(text_)
+    if query is None or not has_index(session, lang):
+        return list()
+
+    name = index_name(lang)
+    params = dict(query=query, limit=limit)
+    where = ''
+    if kinds is not None:
+        where = ' AND kind IN (%s)' % ', '.join(':k%d' % i for i in range(0, len(kinds)))
+        params.update({'k%d' % i: x for i, x in enumerate(kinds)})
+    found = session.execute(text('SELECT kind, row FROM %s WHERE %s MATCH :query%s ORDER BY bm25(%s, 0, 0, %f, 1) '
+                                 'LIMIT :limit' % (name, name, where, name, NAME_WEIGHT)), params).fetchall()
+
+    # one query by class, then back to the ranking order
+    classes = {x.__name__: x for x, columns in _indexed_classes()}
+    by_kind = dict()
+    for kind, row in found:
+        by_kind.setdefault(kind, list()).append(row)
+    objs = dict()
+    for kind, rows in by_kind.items():
+        cls = classes[kind]
+        col = inspect(cls).primary_key[0]
+        for obj in session.query(cls).filter(col.in_([col.type.python_type(x) for x in rows])).all():
+            objs[(kind, translation_key(inspect(obj).identity))] = obj
+    return [objs[(x[0], x[1])] for x in found if (x[0], x[1]) in objs]
@@ -22,56 +22,290 @@ This package provides the "master" class of this package: ``Gw2Db``.
 import json
 import locale
 import os
+import time
 import traceback
+import zlib
 from enum import IntEnum, unique
+from inspect import signature
+from urllib.request import pathname2url
 
 # threading imports
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from threading import RLock
 
 # web imports
 import requests
 from requests import RequestException
 
 # ORM imports
-from sqlalchemy import event
+from sqlalchemy import Integer, event, func, inspect, or_, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Mapper, configure_mappers
-from sqlalchemy.engine import Engine, create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 from sqlite3 import Connection as SQLite3Connection
 
 # package imports
-from gw2db.common import Base, addr_v2, Gw2Endpoint, Param, EPType
-from gw2db.tools import CbEvent
+from gw2db import fulltext, registry, tokens
+from gw2db.common import Base, addr_v2, Gw2Endpoint, Gw2Translation, LANGS, Param, EPType, translation_key
+from gw2db.memprof import MemoryProfiler
+from gw2db.metrics import UpgradeMetrics
+from gw2db.tools import BoundedHttp, CbEvent
+from gw2db.tracing import Tracer
+
+
+PRAGMA_PROFILES = {
+    'default': (
+        ('journal_mode', 'MEMORY'),
+        ('synchronous', 'FULL'),
+        ('locking_mode', 'NORMAL'),
+        ('temp_store', 'MEMORY'),
+        ('cache_size', '-16000'),
+        ('case_sensitive_like', '0'),
+        ('encoding', '"UTF-8"'),
+    ),
+    'bulk_load': (
+        ('page_size', '8192'),
+        ('journal_mode', 'MEMORY'),
+        ('synchronous', 'OFF'),
+        ('locking_mode', 'EXCLUSIVE'),
+        ('temp_store', 'MEMORY'),
+        ('cache_size', '-128000'),
+        ('case_sensitive_like', '0'),
+        ('encoding', '"UTF-8"'),
+    ),
+    'serving': (
+        ('mmap_size', '268435456'),
+        ('temp_store', 'MEMORY'),
+        ('cache_size', '-64000'),
+        ('case_sensitive_like', '0'),
+        ('query_only', '1'),
+    ),
+}
+"""SQLite pragmas set on the gw2db connections, by profile name - key=name, value=list of (pragma, value):
+    - default: the main connection, out of upgrades
+    - bulk_load: the connection writing an upgrade - no sync, exclusive lock, large cache and pages
+    - serving: the read-only connections of the read-serving mode - memory mapped file, large cache
+"""
 
-from gw2db.auths import *
-from gw2db.items import *
-from gw2db.miscs import *
-from gw2db.profs import *
-from gw2db.story import *
+_FILE_PRAGMAS = ('page_size', 'journal_mode')
+"""pragmas writing into the db file, skipped by read-only connections"""
 
 
-@event.listens_for(Engine, "connect")
-def _set_sqlite_pragma(dbapi_connection, connection_record):
-    """Event function called when db is connected
+def _set_sqlite_pragma(dbapi_connection, connection_record, profile='default', skip=()):
+    """Event function called when a gw2db engine connects to the db
 
-    Set some parameters to the connection and the db to speed up exchanges.
+    Set the parameters of a profile (see ``PRAGMA_PROFILES``) to the connection and the db to speed up exchanges.
+    A WAL journal is kept: it's set by the read-serving mode, and readers may be using it. ``page_size`` only changes
+    an empty db.
     This function should never be called manually.
 
     :param dbapi_connection: the establised connection
     :param connection_record: unused parameter
+    :param profile: the profile name
+    :param skip: the pragmas not to set
     """
     if isinstance(dbapi_connection, SQLite3Connection):
         cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA journal_mode = MEMORY")
-        cursor.execute("PRAGMA temp_store = MEMORY")
-        cursor.execute("PRAGMA cache_size = -1000")
-        cursor.execute("PRAGMA case_sensitive_like = 0")
-        cursor.execute("PRAGMA encoding = \"UTF-8\"")
+        for name, value in PRAGMA_PROFILES[profile]:
+            if name in skip:
+                continue
+            if name == 'journal_mode':
+                cursor.execute("PRAGMA journal_mode")
+                if cursor.fetchone()[0].lower() == 'wal':
+                    continue
+            cursor.execute("PRAGMA %s = %s" % (name, value))
+            if name == 'locking_mode':
+                # a held exclusive lock is only released when the db is read again
+                cursor.execute("SELECT count(*) FROM sqlite_master")
         cursor.close()
 
 
+def _schema_fingerprint(metadata):
+    """Compute the fingerprint of a tables schema
+
+    It covers the tables, their columns (name, type, primary key, nullable), foreign keys and indexes, so any change
+    of the table declarations changes it.
+
+    :param metadata: the ``MetaData`` holding the tables
+    :return: a positive 31 bits integer, to be stored as the db ``user_version``
+    """
+    parts = list()
+    for table in sorted(metadata.tables.values(), key=lambda x: x.name):
+        parts.append(table.name)
+        for c in table.columns:
+            parts.append('%s %s %s %d %d' % (c.name, type(c.type).__name__, getattr(c.type, 'length', None),
+                                             c.primary_key, c.nullable))
+        parts.extend(sorted(x.target_fullname for x in table.foreign_keys))
+        parts.extend(sorted('%s %s %d' % (x.name, ','.join(c.name for c in x.columns), x.unique)
+                            for x in table.indexes))
+    # 0 is the version of a db which was never stamped
+    return (zlib.crc32('\n'.join(parts).encode('utf-8')) & 0x7fffffff) or 1
+
+
+def _owned_by(table, tables, keys):
+    """Make the condition selecting the rows of some accounts, through the foreign keys cascade
+
+    A table with an ``api_key`` column is filtered on it, another one on its foreign keys to the rows of the accounts
+    in the other given tables.
+
+    :param table: the ``Table``
+    :param tables: the tables of the accounts datas
+    :param keys: the API keys of the accounts
+    :return: the condition, None if the table rows are not linked to an account
+    """
+    if 'api_key' in table.c:
+        return table.c.api_key.in_(keys)
+    clauses = list()
+    for fk in table.foreign_keys:
+        if fk.column.table in tables and fk.column.table is not table:
+            parent = _owned_by(fk.column.table, tables, keys)
+            if parent is not None:
+                clauses.append(fk.parent.in_(select([fk.column]).where(parent)))
+    return or_(*clauses) if len(clauses) > 0 else None
+
+
+def _sql_default(column):
+    """Give the SQL literal of a column scalar default
+
+    :param column: the ``Column``
+    :return: the literal, None if the column has no scalar default
+    """
+    if column.default is None or not column.default.is_scalar:
+        return None
+    value = column.default.arg
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'%s'" % str(value).replace("'", "''")
+
+
+def _migrate(engine):
+    """Bring the existing tables of a db to the current declarations
+
+    A table only missing columns which may be added (nullable, or with a scalar default) gets them with
+    ``ALTER TABLE``, its rows are kept. Other changed tables (missing primary key or mandatory columns, mandatory
+    columns which are not declared anymore) are dropped and created again: their datas come from the WebAPI, so the
+    stored build is cleared and the next ``Gw2Db.upgrade`` downloads them again. The parameters and the accounts
+    history don't come from the WebAPI: their rows are copied into the new table, those missing a mandatory column
+    being skipped.
+
+    :param engine: the engine of the db
+    :return: the names of the tables created again
+    """
+    kept = [Param.__table__]
+    if 'auths.accounts' in registry.loaded():
+        # the history tables of gw2db.diffs, without loading the other families it needs
+        from gw2db.auths.accounts import _Gw2AccountChange, _Gw2AccountUnlockChange
+        kept.extend([_Gw2AccountChange.__table__, _Gw2AccountUnlockChange.__table__])
+    recreated = list()
+    for table in Base.metadata.sorted_tables:
+        found = {x[1]: x for x in engine.execute('PRAGMA table_info("%s")' % table.name)}
+        if len(found) == 0:
+            continue
+        missing = [x for x in table.columns if x.name not in found]
+        # cid, name, type, notnull, dflt_value, pk
+        dropped = [x for x in found.values() if x[1] not in table.c and x[3] and x[4] is None]
+        if len(missing) == 0 and len(dropped) == 0:
+            continue
+        if len(dropped) == 0 and all(not x.primary_key and (x.nullable or _sql_default(x) is not None)
+                                     for x in missing):
+            for col in missing:
+                default = _sql_default(col)
+                engine.execute('ALTER TABLE "%s" ADD COLUMN "%s" %s%s%s' % (
+                    table.name, col.name, col.type.compile(dialect=engine.dialect),
+                    '' if col.nullable else ' NOT NULL', '' if default is None else ' DEFAULT ' + default))
+            continue
+        recreated.append(table.name)
+        if table not in kept:
+            table.drop(engine)
+            table.create(engine)
+            continue
+
+        # the temporary copy is only known by its connection
+        columns = ', '.join('"%s"' % x.name for x in table.columns if x.name in found)
+        with engine.connect() as conn:
+            with conn.begin():
+                conn.execute('CREATE TEMP TABLE "migrated_%s" AS SELECT * FROM "%s"' % (table.name, table.name))
+                table.drop(conn)
+                table.create(conn)
+                conn.execute('INSERT OR IGNORE INTO "%s" (%s) SELECT %s FROM "migrated_%s"' % (
+                    table.name, columns, columns, table.name))
+                conn.execute('DROP TABLE "migrated_%s"' % table.name)
+
+    if any(x not in [t.name for t in kept] for x in recreated):
+        engine.execute(Param.__table__.delete().where(Param.__table__.c.name == 'build'))
+    return recreated
+
+
+def _create_tables(engine):
+    """Create the missing tables of a db, and migrate the changed ones, unless its schema fingerprint is the current
+    one
+
+    The fingerprint is stored in the db ``user_version``: an up to date db only costs this check. It's only stored
+    once all the families are mapped (see ``gw2db.registry``), as a partial schema never matches a complete db.
+    Tables declared with other columns are migrated, see ``_migrate``.
+
+    :param engine: the engine of the db
+    """
+    fingerprint = _schema_fingerprint(Base.metadata)
+    if engine.execute('PRAGMA user_version').scalar() == fingerprint:
+        return
+    Base.metadata.create_all(engine)
+    _migrate(engine)
+    if len(registry.loaded()) == len(registry.FAMILIES):
+        engine.execute('PRAGMA user_version = %d' % fingerprint)
+
+
+def _on_reader_connect(dbapi_connection, connection_record):
+    """Event function called when a read-serving connection is established
+
+    Disable the driver transactions handling, so ``_on_reader_begin`` can start real SQLite transactions.
+    This function should never be called manually.
+
+    :param dbapi_connection: the establised connection
+    :param connection_record: unused parameter
+    """
+    dbapi_connection.isolation_level = None
+
+
+def _on_serving_connect(dbapi_connection, connection_record):
+    """Event function called when a read-serving connection is established: set the ``serving`` pragma profile
+
+    This function should never be called manually.
+
+    :param dbapi_connection: the establised connection
+    :param connection_record: unused parameter
+    """
+    _set_sqlite_pragma(dbapi_connection, connection_record, 'serving', _FILE_PRAGMAS)
+
+
+def _on_load_connect(dbapi_connection, connection_record):
+    """Event function called when a sidecar db is connected: set the ``bulk_load`` pragma profile
+
+    This function should never be called manually.
+
+    :param dbapi_connection: the establised connection
+    :param connection_record: unused parameter
+    """
+    _set_sqlite_pragma(dbapi_connection, connection_record, 'bulk_load')
+
+
+def _on_reader_begin(conn):
+    """Event function called when a read-serving session starts a transaction
+
+    The driver doesn't begin a transaction before a SELECT, so each query would read the last commit. An explicit
+    BEGIN makes all the queries of a session read the same snapshot, until the session ends.
+    This function should never be called manually.
+
+    :param conn: the connection starting a transaction
+    """
+    conn.execute('BEGIN')
+
+
 @event.listens_for(Mapper, "mapper_configured")
 def _on_table_mapped(mapper, class_):
     """Event fuction called when all declared tables are mapped into db
@@ -125,13 +359,25 @@ class EndpointUpgradeStatus(IntEnum):
 class Gw2Db(object):
     """Package master class
 
-    This class manage the database: access, upgrades... It's a singleton class, multipe instanciations return the
-    same instance.
+    This class manage the database: access, upgrades... There is one instance by db file: multiple instanciations
+    with the same path return the same instance, and each instance has its own engines and sessions, so several dbs
+    can be used at once. An opened instance is not initialized again: the arguments of the next instanciations are
+    ignored, until it's closed. Instanciations may run in several threads at once, and an instance whose
+    initialization failed is dropped.
 
     Example:
         >>> with Gw2Db() as db:
         >>>    my_datas = db.session.query(...).filter(...).all()
         >>>    # do something with my_datas
+        >>>
+        >>> # a db by language
+        >>> dbs = {x: Gw2Db(path='gw2_%s.db' % x, lang=x) for x in ['en', 'fr', 'de', 'es']}
+        >>>
+        >>> # or all the languages in one db
+        >>> db = Gw2Db(lang='en', locales=['fr', 'de', 'es'])
+        >>> db.upgrade()
+        >>> item = db.session.query(Gw2Item).first()
+        >>> fr_name = db.translate(item, 'name', 'fr')
 
     Warning:
         - All the gw2_* tables must be considered as "read-only".
@@ -141,16 +387,61 @@ class Gw2Db(object):
     """
     __endpoints__ = list()
 
-    _instance = None
+    _instances = dict()
+
+    # held while an instance is got or initialized: one instance by path, initialized once
+    _instances_lock = RLock()
 
     def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(Gw2Db, cls).__new__(
-                                cls, *args)
-        return cls._instance
+        arguments = signature(cls.__init__).bind(None, *args, **kwargs)
+        arguments.apply_defaults()
+        path = os.path.abspath(arguments.arguments['path'])
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = super(Gw2Db, cls).__new__(cls)
+            return cls._instances[path]
     
-    def __init__(self):
-        """Initialize the manager"""
+    def __init__(self, serving=False, pool_size=5, sidecar=False, readonly=False, families=None, path='gw2.db',
+                 engine_options=None, lang=None, locales=None, fulltext=False):
+        """Initialize the manager
+
+        :param serving: if True, open the db in read-serving mode: WAL journal, a pool of read-only connections used
+                        by ``reader`` sessions, and upgrades replacing the datas in a single transaction
+        :param pool_size: number of pooled read-only connections, in read-serving mode
+        :param sidecar: if True, upgrades build the new datas into a separate file, verify it then swap it in, see
+                        ``_upgrade_sidecar``. The db keeps a rollback journal, even in read-serving mode
+        :param readonly: if True, open an existing db file as a read-only snapshot: no table creation nor write, a
+                         memory mapped file shared through the OS page cache by all the processes opening it.
+                         ``serving`` is ignored, ``upgrade`` always fails, and ``refresh`` must be called to read a
+                         file swapped by an upgrade of another process. With ``sidecar``, the file - only replaced by
+                         sidecar upgrades, never written in place - is opened as immutable
+        :param families: the table families to map (see ``gw2db.registry``), with the families they depend on - all
+                         the families if None. Only the mapped tables are created and listed by ``show_endpoints``
+        :param path: the db file, relative to the current directory
+        :param engine_options: ``create_engine`` arguments of the main engine, added to or replacing the defaults
+        :param lang: the language of the datas, stored if the db has none yet - see ``lang``
+        :param locales: the other languages of the translatable strings, stored - see ``locales``
+        :param fulltext: if True, upgrades build the full-text index of the db languages, see ``search``
+        """
+        path = os.path.abspath(path)
+        with Gw2Db._instances_lock:
+            if getattr(self, '_engine', None) is not None:
+                # already opened, see __new__
+                return
+            # dropped meanwhile by a failed initialization
+            Gw2Db._instances.setdefault(path, self)
+            try:
+                self._initialize(serving, pool_size, sidecar, readonly, families, path, engine_options, lang, locales,
+                                 fulltext)
+            except Exception:
+                # a failed instance isn't given again, see __new__
+                if Gw2Db._instances.get(path) is self:
+                    del Gw2Db._instances[path]
+                raise
+
+    def _initialize(self, serving, pool_size, sidecar, readonly, families, path, engine_options, lang, locales,
+                    fulltext):
+        """Initialize the manager, see ``__init__``"""
         self.running_status = CbEvent()
         """a callback event, showing the upgrade status
         parameters are: <status (DbUpgradeStatus)>, <nb of endpoints (int)>
@@ -158,14 +449,64 @@ class Gw2Db(object):
         self.endpoint_status = CbEvent()
         """a callback event, showing an endpoint upgrade status
         parameters are: <status (EndpointUpgradeStatus)>, <tablename (str)>"""
+        self.metrics_status = CbEvent()
+        """a callback event, showing an endpoint counters once it's upgraded (or failed)
+        parameters are: <tablename (str)>, <metrics (EndpointMetrics)>"""
+        self.last_metrics = None
+        """the summary of the last upgrade (UpgradeMetrics), None if no upgrade ran"""
+        self.account_changed = CbEvent()
+        """a callback event, fired for each account whose datas changed during an accounts refresh, see
+        ``gw2db.diffs``
+        parameters are: <diff (AccountDiff)>"""
+        self.token_ttl = tokens.TTL
+        """the time the access tokens permissions are cached by the accounts refreshes (seconds), see
+        ``gw2db.tokens``"""
+        self.tracer = Tracer()
+        """the tracer (gw2db.tracing.Tracer) used during upgrades - disabled by default"""
+        self.http = requests
+        """the HTTP client used to reach the WebAPI, any object with a ``requests``-like ``get`` function"""
+        self.memory_profile = False
+        """if True, upgrades record memory samples at each stage - disabled by default"""
+        self.memory_status = CbEvent()
+        """a callback event, showing a memory sample when ``memory_profile`` is enabled
+        parameters are: <sample (MemorySample)>"""
+        self.last_memory = None
+        """the memory samples of the last profiled upgrade (MemoryProfiler), None if no upgrade was profiled"""
+        self.swapped = CbEvent()
+        """a callback event, fired when an upgraded db file is swapped in (sidecar mode) - sessions got before must
+        be dropped, ``session`` and ``reader`` give sessions on the new file
+        parameters are: <version (int)>"""
         
-        self._db = 'gw2.db'
+        self._db = os.path.abspath(path)
         self._back = self._db + '.back'
+        self._new = self._db + '.new'
+        self._readonly = readonly
+        self._serving = serving and not readonly
+        self._pool_size = pool_size
+        self._sidecar = sidecar and not readonly
+        self._immutable = sidecar and readonly
+        self._engine_options = engine_options or dict()
+        self._lang = lang
+        self._fulltext = fulltext
+        self._reverse = None
         
         self._engine = None
         self._session = None
+        self._read_engine = None
+        self._readers = scoped_session(self._new_reader) if self._serving else None
+        self._ino = None
+        self._read_ino = None
+        self._stale = False
+        self._lock = RLock()
+        self._profile = 'default'
         
+        registry.load(families)
         self._make_db()
+        if lang is not None:
+            # storing the given language in a new db
+            self.lang
+        if locales is not None and not readonly:
+            self.locales = locales
 
     def __enter__(self):
         return self
@@ -175,43 +516,340 @@ class Gw2Db(object):
         self._get_session()
 
     def __del__(self):
-        self._close_db()
+        try:
+            self._close_db()
+        except Exception:
+            # at interpreter shutdown, the ORM may already be torn down
+            pass
 
     @property
     def session(self):
         """Give access to the db session"""
         return self._get_session()
 
+    @property
+    def reader(self):
+        """Give access to the read-only session of the current thread
+
+        In read-serving mode, each thread gets its own session over a pooled read-only connection. All its queries
+        read the same snapshot of the db, even while an upgrade is running, until ``release_reader`` is called.
+        Out of this mode, it's the main session.
+        """
+        if self._readers is None:
+            return self._get_session()
+        if self._read_engine is None:
+            self._get_session()
+        return self._readers()
+
+    @contextmanager
+    def fresh_reader(self):
+        """Give a read-only session on the last datas, for a ``with`` block
+
+        In read-serving mode, it's a new session closed at the end of the block: unlike ``reader``, it never reads the
+        snapshot still opened by the current thread. Out of this mode, it's the main session.
+        """
+        if self._readers is None:
+            yield self._get_session()
+            return
+        if self._read_engine is None:
+            self._get_session()
+        session = self._new_reader()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def release_reader(self):
+        """Close the read-only session of the current thread, ending its snapshot
+
+        Call it when a request is served, so the next one reads the last datas. It does nothing out of read-serving
+        mode.
+        """
+        if self._readers is not None:
+            self._readers.remove()
+
+    def refresh(self):
+        """Reconnect to the db file if it was swapped by an upgrade, from this process or another one
+
+        It's called before each new ``reader`` session. Sessions opened before keep reading the previous file until
+        they are closed. The read-only connections are reconnected at once, the main session - which another thread
+        may be using - by the next ``session`` access.
+
+        :return: True if the db was reconnected
+        """
+        with self._lock:
+            try:
+                ino = os.stat(self._db).st_ino
+            except OSError:
+                return False
+            reconnected = False
+            if self._read_engine is not None and ino != self._read_ino:
+                old = self._read_engine
+                self._make_read_engine()
+                old.dispose()
+                reconnected = True
+            if self._ino is not None and ino != self._ino and not self._stale:
+                self._stale = True
+                reconnected = True
+            return reconnected
+
     @property
     def lang(self):
-        """Get the db language or find it from system regarding the WebAPI available languages"""
+        """Get the db language, or the one given at initialization, or find it from system regarding the WebAPI
+        available languages - the found language is stored, except in read-only mode"""
         self._get_session()
 
         try:
             _lang = self._session.query(Param).filter(Param.name == 'lang').first().value
             return _lang
         except (SQLAlchemyError, AttributeError):
-            _lang = locale.getdefaultlocale(envvars=['LANG'])[0].split('_')[0]
+            _lang = self._lang
+            if _lang is None:
+                # no system language without LANG
+                _lang = (locale.getdefaultlocale(envvars=['LANG'])[0] or '').split('_')[0]
             if _lang not in ['fr', 'de', 'en', 'es']:
                 _lang = 'en'
+            if self._readonly:
+                return _lang
             self._session.add(Param(name='lang', value=_lang))
             self._session.commit()
             return _lang
 
+    @property
+    def locales(self):
+        """Get the other languages of the translatable strings
+
+        Upgrades download the localized endpoints in these languages too, and store their strings which differ from
+        the db language ones, see ``translate``. The languages are stored, so next upgrades keep them.
+        """
+        p = self._get_session().query(Param).filter(Param.name == 'locales').first()
+        return p.value.split(',') if p is not None and len(p.value) > 0 else list()
+
+    @locales.setter
+    def locales(self, value):
+        for x in value:
+            if x not in LANGS:
+                raise ValueError('Unknown language: %s' % x)
+        session = self._get_session()
+        session.query(Param).filter(Param.name == 'locales').delete()
+        session.add(Param(name='locales', value=','.join(value)))
+        session.commit()
+
+    def translate(self, obj, column, lang=None):
+        """Give a translatable string of a row in a language
+
+        :param obj: the row, an object of a mapped table
+        :param column: the column name
+        :param lang: one of the db languages (``lang`` or ``locales``) - ``lang`` if None
+        :return: the string in this language, the ``lang`` one if it has no translation
+        """
+        value = getattr(obj, column)
+        if lang is None or lang == self.lang:
+            return value
+        state = inspect(obj)
+        tr = self.reader.query(Gw2Translation.value).filter(
+            Gw2Translation.tablename == state.mapper.columns[column].table.name,
+            Gw2Translation.row == translation_key(state.identity),
+            Gw2Translation.column == column,
+            Gw2Translation.lang == lang).first()
+        return tr[0] if tr is not None else value
+
+    def translations(self, table, column, lang, session=None):
+        """Give all the translated strings of a column in a language
+
+        :param table: the table class
+        :param column: the column name
+        :param lang: one of ``locales``
+        :param session: the session to read with, ``reader`` if None
+        :return: a dictionnary - key=row key (see ``gw2db.common.translation_key``), value=translated string. Rows which
+                 are missing use the ``lang`` string
+        """
+        name = inspect(table).columns[column].table.name
+        session = session if session is not None else self.reader
+        return dict(session.query(Gw2Translation.row, Gw2Translation.value).filter(
+            Gw2Translation.tablename == name, Gw2Translation.column == column, Gw2Translation.lang == lang).all())
+
+    def search(self, text, tables=None, limit=20, lang=None):
+        """Search rows by their names and descriptions, through the full-text index (see ``gw2db.fulltext``)
+
+        :param text: the searched text, its last word being a prefix (e.g. 'ascended swo')
+        :param tables: the searched classes, all the indexed ones if None
+        :param limit: maximum number of rows
+        :param lang: one of the db languages (``lang`` or ``locales``) - ``lang`` if None
+        :return: the list of found objects, best ones first - empty if the db has no index for the language
+        """
+        return fulltext.search(self.reader, text, lang if lang is not None else self.lang, tables, limit)
+
+    def owned(self, api_key, item_id):
+        """Give the owned count of an item, all the account locations summed (see ``gw2db.holdings``)
+
+        :param api_key: the API key of the account
+        :param item_id: the item id
+        :return: the count, 0 if the item is not owned
+        """
+        from gw2db import holdings
+        return holdings.owned(self.reader, api_key, item_id)
+
+    def holdings(self, api_key, item_ids=None):
+        """Give the owned items of an account, with the count of each location (see ``gw2db.holdings``)
+
+        :param api_key: the API key of the account
+        :param item_ids: the wanted item ids, all the owned items if None
+        :return: a list of (``_Gw2AccountHolding``, ``Gw2Item``) tuples, by item id
+        """
+        from gw2db import holdings
+        return holdings.holdings(self.reader, api_key, item_ids)
+
+    @property
+    def reverse(self):
+        """the items reverse index (``gw2db.reverse.ReverseIndex``), built at the first use then at the end of each
+        successful upgrade"""
+        with self._lock:
+            if self._reverse is None:
+                # gw2db.reverse needs this module
+                from gw2db.reverse import ReverseIndex
+                self._reverse = ReverseIndex(self)
+            return self._reverse
+
+    def used_in(self, item_id):
+        """Give the recipes using an item as ingredient, see ``reverse``
+
+        :param item_id: the item id
+        :return: the list of recipe ids, ascending
+        """
+        return self.reverse.used_in(item_id)
+
+    def rewarded_by(self, item_id):
+        """Give the achievements rewarding an item, see ``reverse``
+
+        :param item_id: the item id
+        :return: the list of achievement ids, ascending
+        """
+        return self.reverse.rewarded_by(item_id)
+
     def _make_db(self):
         """Initialize the db engine and create a session"""
-        self._engine = create_engine('sqlite:///' + self._db,
+        self._stale = False
+        if self._readonly:
+            self._make_snapshot()
+            return
+
+        options = dict(connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        options.update(self._engine_options)
+        self._engine = create_engine('sqlite:///' + self._db, **options)
+        event.listen(self._engine, 'connect', self._on_connect)
+        _create_tables(self._engine)
+        self._session = sessionmaker(bind=self._engine)(autoflush=False)
+        self._ino = os.stat(self._db).st_ino
+        self._map_tables()
+        if self._sidecar:
+            # a swapped file must come alone: no WAL file may be shared by the previous and the new db
+            self._engine.execute('PRAGMA journal_mode = MEMORY')
+        if self._serving:
+            self._make_readers()
+
+    def _make_snapshot(self):
+        """Initialize a read-only engine on the existing db file and create a session (read-only mode)
+
+        The file is read through a memory map with the ``serving`` pragma profile. Other processes may write it (an
+        accounts refresh, an in-place upgrade...), so it's only opened as immutable - SQLite neither locks nor checks it
+        for changes - when they swap it with sidecar upgrades, and has no WAL journal which may still hold committed
+        datas.
+        """
+        self._ino = os.stat(self._db).st_ino
+        url = 'sqlite:///file:%s?mode=ro&uri=true' % pathname2url(os.path.abspath(self._db))
+        if self._immutable and not os.path.isfile(self._db + '-wal'):
+            url += '&immutable=1'
+        self._engine = create_engine(url,
                                      connect_args={'check_same_thread': False},
                                      poolclass=StaticPool)
-        Base.metadata.bind = self._engine
-        Base.metadata.create_all()
+        event.listen(self._engine, 'connect', _on_serving_connect)
         self._session = sessionmaker(bind=self._engine)(autoflush=False)
+        self._map_tables()
+
+    def _map_tables(self):
+        """Configure the mapping of the imported tables and list their endpoints"""
         configure_mappers()
+        # tables configured before this module was imported were not seen by ``_on_table_mapped``
+        for cls in list(Base._decl_class_registry.values()):
+            if isinstance(cls, type):
+                _on_table_mapped(None, cls)
+
+    def _make_readers(self):
+        """Switch the db to WAL journaling and create the pool of read-only connections (read-serving mode)"""
+        if not self._sidecar:
+            self._engine.execute('PRAGMA journal_mode = WAL')
+        self._make_read_engine()
+
+    def _make_read_engine(self):
+        """Create the pool of read-only connections on the current db file"""
+        self._read_ino = os.stat(self._db).st_ino
+        url = 'sqlite:///file:%s?mode=ro&uri=true' % pathname2url(os.path.abspath(self._db))
+        self._read_engine = create_engine(url,
+                                          connect_args={'check_same_thread': False},
+                                          poolclass=QueuePool, pool_size=self._pool_size)
+        event.listen(self._read_engine, 'connect', _on_reader_connect)
+        event.listen(self._read_engine, 'connect', _on_serving_connect)
+        event.listen(self._read_engine, 'begin', _on_reader_begin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Event function called when the main engine connects to the db: set the current pragma profile
+
+        :param dbapi_connection: the establised connection
+        :param connection_record: unused parameter
+        """
+        _set_sqlite_pragma(dbapi_connection, connection_record, self._profile, self._shared_pragmas())
+
+    def _shared_pragmas(self):
+        """Give the pragmas the main connection must not set, as other connections read the db
+
+        :return: a tuple of pragma names
+        """
+        return ('locking_mode',) if self._serving or self._sidecar else ()
+
+    def _set_profile(self, profile):
+        """Switch the main connection to a pragma profile
+
+        :param profile: the profile name, see ``PRAGMA_PROFILES``
+        """
+        self._profile = profile
+        if self._session is not None:
+            # session connection > pooled connection > DBAPI connection
+            dbapi_connection = self._session.connection().connection.connection
+            _set_sqlite_pragma(dbapi_connection, None, profile, self._shared_pragmas())
+
+    def _new_reader(self):
+        """Create a read-only session, for ``reader`` - the db is reconnected first if its file was swapped
+
+        :return: a session on the read-only connections pool
+        """
+        self.refresh()
+        return Session(bind=self._read_engine, autoflush=False)
+
+    def _reconnect(self):
+        """Reopen the db file: new engines and main session, previous read-only connections are closed once their
+        sessions end - only called by the thread owning the main session"""
+        with self._lock:
+            old = self._read_engine
+            if self._session is not None:
+                self._session.close()
+            if self._engine is not None:
+                self._engine.dispose()
+            self._make_db()
+            if old is not None:
+                old.dispose()
         
     def _close_db(self):
         """Shut down the db engine and the opened session"""
+        if self._readers is not None:
+            self._readers.remove()
+
+        if self._read_engine is not None:
+            self._read_engine.dispose()
+            self._read_engine = None
+
         if self._session is not None:
-            self._session.close_all()
+            self._session.close()
             self._session = None
             
         if self._engine is not None:
@@ -224,7 +862,7 @@ class Gw2Db(object):
         :return: -1 on error, 0 if versions are equals, remote version if an upgrade is needed
         """
         try:
-            ans = requests.get(addr_v2 + 'build', timeout=5)
+            ans = self.http.get(addr_v2 + 'build', timeout=5)
             rv = json.loads(ans.text)['id']
         except RequestException:
             return -1
@@ -237,65 +875,123 @@ class Gw2Db(object):
             
         return rv if rv > lv else 0
 
-    def _fill_datas(self, lang, params):
+    def _fill_datas(self, lang, params, commit=True, session=None):
         """Download, map and store all declared endpoints datas
 
         :param lang: the language to use as url argument
         :param params: current parameters stored in db, as dictionnary (k=name, v=value)
+        :param commit: if False, stored datas are not committed - the caller commits them all at once
+        :param session: the session to store datas with - the main session if None
         :return: True on success, False on error
         """
+        session = session if session is not None else self._session
         # TODO: start img dl
         
         keys = [v for k, v in params.items() if k.startswith('KEY_')]
+        locales = [x for x in params.get('locales', '').split(',') if len(x) > 0]
         self.running_status(DbUpgradeStatus.downloading, len(Gw2Db.__endpoints__))
-        
-        import time
-        st = time.time()
 
         chs = [x for x in Gw2Db.__endpoints__ if (x.__table__.info['ep_type'] & EPType.child) != 0]
-        eps = [Gw2Endpoint(x, lang, chs) for x in Gw2Db.__endpoints__ if (x.__table__.info['ep_type'] & EPType.child) == 0]
-        with ThreadPoolExecutor(max_workers=len(eps)) as mapper:
-            ths = {}
-            for ep in eps:
-                ths[mapper.submit(ep.upgrade)] = ep
-                self.endpoint_status(EndpointUpgradeStatus.downloading, ep.table_name)
-                for key in keys:
-                    ep.set_params(key=key)
-                ep.set_params()
-
-            def _on_error(_cls_):
-                self.endpoint_status(EndpointUpgradeStatus.error, _cls_)
-                for _ep_ in eps:
-                    _ep_.on_error()
-                return False
+        eps = [Gw2Endpoint(x, lang, chs, self.tracer, self.http, locales)
+               for x in Gw2Db.__endpoints__ if (x.__table__.info['ep_type'] & EPType.child) == 0]
 
-            ok = True
-            for future in as_completed(ths):
-                if future.exception() is not None:
-                    traceback.print_exc()
-                    ok = _on_error(ths[future].table_name)
-                    continue
-                if not ok:
-                    continue
+        self.last_metrics = UpgradeMetrics()
+        for ep in eps:
+            self.last_metrics.add(ep.metrics)
 
-                ep = ths[future]
-                datas = future.result()
-                if datas is not None:
-                    self.endpoint_status(EndpointUpgradeStatus.commiting, ep.table_name)
-                    try:
-                        for k, v in datas.items():
-                            self._session.bulk_insert_mappings(k, v, return_defaults=True)
-                            self._session.commit()
-                    except SQLAlchemyError:
+        prof = None
+        if self.memory_profile:
+            prof = self.last_memory = MemoryProfiler()
+            prof.start()
+        try:
+            if prof is not None:
+                self.memory_status(prof.samples[-1])
+
+            with ThreadPoolExecutor(max_workers=len(eps)) as mapper:
+                ths = {}
+                for ep in eps:
+                    ths[mapper.submit(ep.upgrade)] = ep
+                    self.endpoint_status(EndpointUpgradeStatus.downloading, ep.table_name)
+                    for key in keys:
+                        ep.set_params(key=key)
+                    ep.set_params()
+
+                def _on_error(_ep_):
+                    self.endpoint_status(EndpointUpgradeStatus.error, _ep_.table_name)
+                    self.metrics_status(_ep_.table_name, _ep_.metrics)
+                    for _e_ in eps:
+                        _e_.on_error()
+                    return False
+
+                ok = True
+                for future in as_completed(ths):
+                    if future.exception() is not None:
                         traceback.print_exc()
-                        ok = _on_error(ep.table_name)
+                        ok = _on_error(ths[future])
+                        continue
+                    if not ok:
                         continue
-                    self.endpoint_status(EndpointUpgradeStatus.success, ep.table_name)
-                else:
-                    ok = _on_error(ths[future].table_name)
 
-        print('all dl: ', (time.time() - st))
-        
+                    ep = ths[future]
+                    datas = future.result()
+                    if datas is not None:
+                        if prof is not None:
+                            self.memory_status(prof.sample('mapped', ep.table_name, datas))
+                        self.endpoint_status(EndpointUpgradeStatus.commiting, ep.table_name)
+                        try:
+                            for k, v in datas.items():
+                                st = time.time()
+                                with self.tracer.span(k.__name__, 'db', ep.table_name, stage='insert', rows=len(v)):
+                                    session.bulk_insert_mappings(k, v, return_defaults=True)
+                                if commit:
+                                    with self.tracer.span(k.__name__, 'db', ep.table_name, stage='commit'):
+                                        session.commit()
+                                ep.metrics.add_insert(k.__name__, len(v), time.time() - st)
+                        except SQLAlchemyError:
+                            traceback.print_exc()
+                            ok = _on_error(ep)
+                            continue
+                        self.endpoint_status(EndpointUpgradeStatus.success, ep.table_name)
+                        self.metrics_status(ep.table_name, ep.metrics)
+                        if prof is not None:
+                            self.memory_status(prof.sample('inserted', ep.table_name))
+                    else:
+                        ok = _on_error(ep)
+
+            if ok:
+                # tables computed from the stored datas - these modules need this one
+                from gw2db import holdings, prerequisites
+                derived = (('Gw2Achievement', '_Gw2AchievementClosure', prerequisites.store),
+                           ('Gw2Token', '_Gw2AccountHolding', holdings.refresh))
+                try:
+                    for endpoint, name, fill in derived:
+                        st = time.time()
+                        with self.tracer.span(name, 'db', endpoint, stage='derive'):
+                            count = fill(session)
+                        if commit:
+                            session.commit()
+                        self.last_metrics.endpoints[endpoint].add_insert(name, count, time.time() - st)
+                except SQLAlchemyError:
+                    traceback.print_exc()
+                    ok = False
+
+            if ok and self._fulltext:
+                try:
+                    with self.tracer.span('fulltext', 'db', stage='index'):
+                        fulltext.build_index(session, lang, locales)
+                    if commit:
+                        session.commit()
+                except SQLAlchemyError:
+                    traceback.print_exc()
+                    ok = False
+        finally:
+            # the allocations tracing is stopped, even on exception
+            self.last_metrics.stop()
+            if prof is not None:
+                prof.stop()
+                self.memory_status(prof.samples[-1])
+        self.tracer.flush()
+
         # TODO: end img dl
                             
         if not ok:
@@ -303,11 +999,232 @@ class Gw2Db(object):
             return False
         return True
 
+    def refresh_accounts(self, keys=None):
+        """Download the accounts datas again, without upgrading the other tables
+
+        Only the ``Gw2Token`` endpoint and its subendpoints are run. The rows of the refreshed accounts are then
+        replaced in a single transaction: they're deleted through the foreign keys cascade (see ``_owned_by``), the
+        new ones are inserted with primary key ids following the stored ones, and the owned items are summed again
+        (see ``gw2db.holdings``). The db version is not checked, so it works between two builds of the WebAPI.
+        For large sets of keys, see ``ingest_accounts``. The changes of each account are appended to the history
+        tables and fired through ``account_changed``, see ``gw2db.diffs``.
+
+        The access tokens permissions are cached for ``token_ttl`` seconds (see ``gw2db.tokens``): ``tokeninfo`` is
+        not downloaded for the cached ones, and the refused ones are skipped, their rows being kept.
+
+        :param keys: the API keys of the accounts, all the stored ``KEY_`` parameters if None
+        :return: -1 on error, else the number of stored rows
+        """
+        keys, locales, known = self._accounts_params(keys)
+        if keys is None:
+            return -1
+        keys = [x for x in keys if x not in known or known[x] is not None]
+        if len(keys) == 0:
+            return 0
+
+        ep, tables = self._accounts_endpoint(self.http, locales)
+        self._seed_pkids(ep)
+        self.last_metrics = UpgradeMetrics()
+        self.last_metrics.add(ep.metrics)
+        self.endpoint_status(EndpointUpgradeStatus.downloading, ep.table_name)
+        try:
+            datas = self._download_accounts(ep, keys, known)
+            count = -1
+            if datas is not None:
+                self.endpoint_status(EndpointUpgradeStatus.commiting, ep.table_name)
+                count = self._store_accounts(ep, datas, keys, tables, known)
+            else:
+                self._refuse(set().union(*[x.refused for x in ep.walk()]))
+        finally:
+            self.last_metrics.stop()
+            self.tracer.flush()
+
+        if count < 0:
+            self.endpoint_status(EndpointUpgradeStatus.error, ep.table_name)
+            return -1
+        self.endpoint_status(EndpointUpgradeStatus.success, ep.table_name)
+        self.metrics_status(ep.table_name, ep.metrics)
+        return count
+
+    def ingest_accounts(self, keys=None, workers=4, max_requests=16):
+        """Download the datas of many accounts, each one on its own - see ``refresh_accounts``
+
+        Each key gets its own endpoints tree: keys are run in turn by ``workers`` threads, all the trees sharing at
+        most ``max_requests`` concurrent requests to the WebAPI. The requests shared by several keys (see
+        ``Gw2Endpoint.share_requests``) are sent once for all the trees. A failed key (revoked token, missing
+        right...) only stops its own tree, and its stored rows are kept. The rows of each key are stored in their own
+        transaction, as soon as its tree is done.
+
+        :param keys: the API keys of the accounts, all the stored ``KEY_`` parameters if None
+        :param workers: number of keys downloaded at once
+        :param max_requests: maximum number of concurrent requests, all keys together
+        :return: a dictionnary - key=API key, value=number of stored rows, -1 on error
+        """
+        keys, locales, known = self._accounts_params(keys)
+        if keys is None:
+            return dict()
+
+        http = BoundedHttp(self.http, max_requests)
+        first = None
+        # the refused access tokens are skipped, see gw2db.tokens
+        results = {x: -1 for x in keys if x in known and known[x] is None}
+        self.last_metrics = UpgradeMetrics()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            ths = dict()
+            for key in [x for x in keys if x not in results]:
+                ep, tables = self._accounts_endpoint(http, locales)
+                if first is None:
+                    first = ep
+                    self._seed_pkids(ep)
+                else:
+                    ep.share_pkids(first)
+                    ep.share_requests(first)
+                self.last_metrics.add(ep.metrics, '%s %s' % (ep.table_name, key))
+                ths[pool.submit(self._download_accounts, ep, [key], known)] = (key, ep, tables)
+
+            for future in as_completed(ths):
+                key, ep, tables = ths.pop(future)
+                datas = future.result()
+                if datas is not None:
+                    results[key] = self._store_accounts(ep, datas, [key], tables, known)
+                else:
+                    results[key] = -1
+                    self._refuse(set().union(*[x.refused for x in ep.walk()]))
+                self.metrics_status(ep.table_name, ep.metrics)
+        self.last_metrics.stop()
+        self.tracer.flush()
+        return results
+
+    def _accounts_params(self, keys):
+        """Check the db may store accounts datas, and read the accounts parameters
+
+        :param keys: the API keys of the accounts, all the stored ``KEY_`` parameters if None
+        :return: (the list of API keys, None if the db is read-only - the other languages - the fresh cached
+                 permissions of the keys, see ``gw2db.tokens.read``)
+        """
+        if self._readonly:
+            # nothing may be written
+            return None, None, None
+
+        # the accounts datas refer to all the families
+        if len(registry.loaded()) < len(registry.FAMILIES):
+            registry.load()
+            self._map_tables()
+            _create_tables(self._engine)
+
+        params = {x.name: x.value for x in self._get_session().query(Param).all()}
+        keys = list(keys) if keys is not None else [v for k, v in params.items() if k.startswith('KEY_')]
+        return (keys, [x for x in params.get('locales', '').split(',') if len(x) > 0],
+                tokens.read(params, keys, self.token_ttl))
+
+    def _accounts_endpoint(self, http, locales):
+        """Make a manager of the accounts endpoints tree
+
+        :param http: the HTTP client
+        :param locales: the other languages
+        :return: (the ``Gw2Token`` endpoint manager, the set of the tables mapped by its tree)
+        """
+        chs = [x for x in Gw2Db.__endpoints__ if (x.__table__.info['ep_type'] & EPType.child) != 0]
+        token = [x for x in Gw2Db.__endpoints__ if x.__name__ == 'Gw2Token'][0]
+        ep = Gw2Endpoint(token, self.lang, chs, self.tracer, http, locales)
+        return ep, set(t.__table__ for x in ep.walk() for t in x.tables)
+
+    def _seed_pkids(self, ep):
+        """Make the primary key ids of an endpoints tree follow the stored ones, so they don't collide with the rows
+        of the other accounts
+
+        :param ep: the root endpoint manager
+        """
+        session = self._get_session()
+        for x in ep.walk():
+            pkids = [session.query(func.max(t.c.pkid)).scalar() for t in set(y.__table__ for y in x.tables)
+                     if 'pkid' in t.c and isinstance(t.c.pkid.type, Integer)]
+            x.seed(max([y for y in pkids if y is not None] + [0]))
+
+    @staticmethod
+    def _download_accounts(ep, keys, known):
+        """Threaded method - download and map the accounts datas
+
+        :param ep: the root endpoint manager
+        :param keys: the API keys of the accounts
+        :param known: the cached permissions of the keys, not downloaded again
+        :return: a dictionnary of mapped objects - key=table class, value=list of objects - None on error
+        """
+        for key in keys:
+            ep.set_params(key=key, payload=tokens.payload(known[key]) if key in known else None)
+        ep.set_params()
+        try:
+            return ep.upgrade()
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def _store_accounts(self, ep, datas, keys, tables, known):
+        """Replace the rows of accounts, in a single transaction - the downloaded permissions are cached too, and
+        the changes of the accounts recorded then fired
+
+        :param ep: the root endpoint manager, its metrics count the inserted rows
+        :param datas: the mapped objects, see ``_download_accounts``
+        :param keys: the API keys of the accounts
+        :param tables: the tables mapped by the endpoints tree
+        :param known: the cached permissions of the keys
+        :return: the number of stored rows, -1 on error
+        """
+        # these modules need this one
+        from gw2db import diffs, holdings
+        session = self._get_session()
+        count = 0
+        try:
+            with self._lock:
+                before = diffs.snapshot(session, keys)
+                for table in reversed(Base.metadata.sorted_tables):
+                    if table in tables:
+                        where = _owned_by(table, tables, keys)
+                        if where is not None:
+                            session.execute(table.delete().where(where))
+                for k, v in datas.items():
+                    st = time.time()
+                    with self.tracer.span(k.__name__, 'db', ep.table_name, stage='insert', rows=len(v)):
+                        session.bulk_insert_mappings(k, v, return_defaults=True)
+                    ep.metrics.add_insert(k.__name__, len(v), time.time() - st)
+                    count += len(v)
+                holdings.refresh(session, keys)
+                tokens.store(session, {k: v for k, v in tokens.permissions(datas).items() if k not in known})
+                changes = [x for x in diffs.compare(before, diffs.snapshot(session, keys)) if not x.empty]
+                diffs.record(session, changes)
+                session.commit()
+        except SQLAlchemyError:
+            traceback.print_exc()
+            session.rollback()
+            return -1
+        for x in changes:
+            self.account_changed(x)
+        return count
+
+    def _refuse(self, keys):
+        """Cache access tokens refused by the WebAPI, see ``gw2db.tokens``
+
+        :param keys: the refused API keys
+        """
+        if len(keys) == 0:
+            return
+        session = self._get_session()
+        try:
+            with self._lock:
+                tokens.store(session, {x: None for x in keys})
+                session.commit()
+        except SQLAlchemyError:
+            traceback.print_exc()
+            session.rollback()
+
     def _get_session(self):
         """Give access to the opened session, or open a new one if needed
 
         :return: a session object
         """
+        if self._stale:
+            # the file was swapped, see refresh
+            self._reconnect()
         if self._engine is None:
             if self._session is None:
                 self._make_db()
@@ -328,11 +1245,24 @@ class Gw2Db(object):
         """Upgrade database if needed or requested
 
         This method check if an upgrade is needed and in this case, backs up the current datas, retreive new datas, store them
-        then delete backed. If an error occurs, new datas are deleted and backed are restored.
+        then delete backed. If an error occurs, new datas are deleted and backed are restored. While new datas are
+        stored, the connection uses the ``bulk_load`` pragma profile.
+        In read-serving mode, datas are replaced in a single transaction instead, see ``_upgrade_in_place``, and in
+        sidecar mode they are built in a separate file, see ``_upgrade_sidecar``.
 
         :param force: if True, force the upgrade even if it's not needed
         :return: -1 on error, 0 when upgrade is not needed, new version on success
         """
+        if self._readonly:
+            # nothing may be written
+            return -1
+
+        # all the tables are stored, even those of the families which are not mapped yet
+        if len(registry.loaded()) < len(registry.FAMILIES):
+            registry.load()
+            self._map_tables()
+            _create_tables(self._engine)
+
         self.running_status(DbUpgradeStatus.started, len(Gw2Db.__endpoints__))
         if force:
             self._get_session()
@@ -349,11 +1279,56 @@ class Gw2Db(object):
         lang = self.lang
         params = {x.name: x.value for x in self._session.query(Param).filter(Param.name != 'build').all()}
 
+        if self._sidecar:
+            return self._upgrade_sidecar(nv, lang, params)
+
+        # the connection storing the new datas is switched to bulk loading, then back to the default profile
+        try:
+            if self._serving:
+                return self._upgrade_in_place(nv, lang, params)
+            return self._upgrade_file(nv, lang, params)
+        finally:
+            self._set_profile('default')
+
+    @staticmethod
+    def _copy_history(engine, path):
+        """Copy the accounts history of another db file into a db - see ``gw2db.diffs``
+
+        The rows are copied by SQLite, without being loaded.
+
+        :param engine: the engine of the db
+        :param path: the path of the other db file
+        """
+        # this module needs this one
+        from gw2db import diffs
+        # the attached file is only known by the connection attaching it
+        with engine.connect() as conn:
+            conn.execute('ATTACH DATABASE ? AS previous', (path,))
+            try:
+                with conn.begin():
+                    for table in diffs.HISTORY:
+                        columns = ', '.join('"%s"' % x.name for x in table.columns)
+                        conn.execute('INSERT INTO "%s" (%s) SELECT %s FROM previous."%s"' % (
+                            table.name, columns, columns, table.name))
+            finally:
+                conn.execute('DETACH DATABASE previous')
+
+    def _upgrade_file(self, nv, lang, params):
+        """Back the db file up, then create a new one and store the new datas into it
+
+        On error, the new file is deleted and the backed one restored.
+
+        :param nv: the new version
+        :param lang: the language to use as url argument
+        :param params: current parameters stored in db, as dictionnary (k=name, v=value)
+        :return: -1 on error, new version on success
+        """
         self._close_db()
         if os.path.isfile(self._db):
             os.rename(self._db, self._back)
         
-        # creating new db
+        # creating new db, connected for bulk loading
+        self._profile = 'bulk_load'
         self._make_db()
 
         try:
@@ -361,7 +1336,9 @@ class Gw2Db(object):
             if self._fill_datas(lang, params) is False:
                 raise NameError('An error occured while getting new datas')
 
-            # saved, adding backed params and current build
+            # saved, adding the backed accounts history, params and current build
+            if os.path.isfile(self._back):
+                self._copy_history(self._engine, self._back)
             if len(params) > 0:
                 self._session.add_all([Param(name=k, value=v) for k, v in params.items()])
             self._session.add(Param(name='build', value=str(nv)))
@@ -370,10 +1347,6 @@ class Gw2Db(object):
             # all fine, deleting backup
             if os.path.isfile(self._back):
                 os.remove(self._back)
-
-            # let's go!
-            ret = nv
-            self.running_status(DbUpgradeStatus.success, len(Gw2Db.__endpoints__))
         except Exception as e:
             print(e)
             traceback.print_exc()
@@ -384,12 +1357,148 @@ class Gw2Db(object):
             # deleting new incomplete db and restore backed
             if os.path.isfile(self._db):
                 os.remove(self._db)
-            os.rename('./' + self._back, './' + self._db)
+            os.rename(self._back, self._db)
 
             # reuse backed db
             self._make_db()
             self.running_status(DbUpgradeStatus.error, -1)
+            return -1
 
-            ret = -1
+        # let's go! the callbacks run once the upgrade is over: their errors can't undo it
+        self.running_status(DbUpgradeStatus.success, len(Gw2Db.__endpoints__))
+        return nv
 
-        return ret
+    def _upgrade_in_place(self, nv, lang, params):
+        """Replace the datas inside a single write transaction (read-serving mode)
+
+        With the WAL journal, readers keep reading the previous datas while the upgrade is running, and see the new
+        ones once their session is released after the final commit. On error, the transaction is rolled back. The
+        parameters and the accounts history are kept.
+
+        :param nv: the new version
+        :param lang: the language to use as url argument
+        :param params: current parameters stored in db, as dictionnary (k=name, v=value)
+        :return: -1 on error, new version on success
+        """
+        try:
+            # this module needs this one
+            from gw2db import diffs
+            self._set_profile('bulk_load')
+            for table in reversed(Base.metadata.sorted_tables):
+                if table is not Param.__table__ and table not in diffs.HISTORY:
+                    self._session.execute(table.delete())
+            self._session.query(Param).filter(Param.name == 'build').delete()
+
+            if self._fill_datas(lang, params, commit=False) is False:
+                raise NameError('An error occured while getting new datas')
+
+            self._session.add(Param(name='build', value=str(nv)))
+            self._session.commit()
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            self._session.rollback()
+            self.running_status(DbUpgradeStatus.error, -1)
+            return -1
+
+        self.running_status(DbUpgradeStatus.success, len(Gw2Db.__endpoints__))
+        return nv
+
+    def _upgrade_sidecar(self, nv, lang, params):
+        """Build the datas into a separate file, verify it, then swap it in (sidecar mode)
+
+        The current db is untouched until the swap, a replacement of the file in one step: sessions opened before keep
+        reading the previous datas, the next ones read the new datas. On error, the separate file is deleted.
+
+        :param nv: the new version
+        :param lang: the language to use as url argument
+        :param params: current parameters stored in db, as dictionnary (k=name, v=value)
+        :return: -1 on error, new version on success
+        """
+        for path in (self._new, self._new + '-journal'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+        # connections are really closed once released: none may keep a lock on the file after the swap
+        engine = create_engine('sqlite:///' + self._new,
+                               connect_args={'check_same_thread': False},
+                               poolclass=NullPool)
+        event.listen(engine, 'connect', _on_load_connect)
+        session = None
+        try:
+            _create_tables(engine)
+            session = sessionmaker(bind=engine)(autoflush=False)
+
+            if self._fill_datas(lang, params, session=session) is False:
+                raise NameError('An error occured while getting new datas')
+
+            session.add_all([Param(name=k, value=v) for k, v in params.items()])
+            session.add(Param(name='build', value=str(nv)))
+            session.commit()
+            self._copy_history(engine, self._db)
+
+            errors = self._verify(session)
+            if len(errors) > 0:
+                raise NameError('New datas verification failed: ' + ', '.join(errors))
+            session.close()
+            engine.dispose()
+
+            # swapping: the main connection is closed first, so the file is replaced without pending writes
+            with self._lock:
+                self._session.close()
+                self._engine.dispose()
+                os.replace(self._new, self._db)
+                self._reconnect()
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            if session is not None:
+                session.close()
+            engine.dispose()
+            if os.path.isfile(self._new):
+                os.remove(self._new)
+            self.running_status(DbUpgradeStatus.error, -1)
+            return -1
+
+        self.running_status(DbUpgradeStatus.success, len(Gw2Db.__endpoints__))
+        self.swapped(nv)
+        return nv
+
+    def _verify(self, session):
+        """Check an upgraded db
+
+        The db must pass the SQLite integrity check, each table must hold the number of rows inserted by the last
+        upgrade - the rows of the current db for the accounts history - and the WebAPI static tables which have datas
+        in the current db must not be empty. The accounts tables may become empty: a deleted character, a removed
+        key...
+
+        :param session: a session on the upgraded db
+        :return: the list of found problems, empty if the db is fine
+        """
+        # this module needs this one
+        from gw2db import diffs
+        errors = [x[0] for x in session.execute('PRAGMA integrity_check').fetchall() if x[0] != 'ok']
+
+        classes = {x.__name__: x for x in Base._decl_class_registry.values() if isinstance(x, type)}
+        inserted = dict()
+        for m in self.last_metrics.walk():
+            for name, count in m.inserted.items():
+                for table in inspect(classes[name]).tables:
+                    inserted[table.name] = inserted.get(table.name, 0) + count
+
+        # the tables of the accounts families, see gw2db.registry
+        accounts = set(t for x in classes.values() if x.__module__.startswith('gw2db.auths.')
+                       for t in inspect(x).tables)
+
+        for table in Base.metadata.sorted_tables:
+            if table is Param.__table__:
+                continue
+            count = session.query(func.count()).select_from(table).scalar()
+            expected = inserted.get(table.name, 0) if table not in diffs.HISTORY else \
+                self._session.query(func.count()).select_from(table).scalar()
+            if count != expected:
+                errors.append('%s holds %d rows, %d inserted' % (table.name, count, expected))
+            elif count == 0 and table is not Gw2Translation.__table__ and table not in accounts and \
+                    self._session.query(func.count()).select_from(table).scalar() > 0:
+                errors.append('%s is empty' % table.name)
+        return errors
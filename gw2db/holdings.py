@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Items owned by the accounts
+
+The items of an account are spread in five tables: bank, materials storage (vault), shared inventory slots,
+characters inventories and equipments. ``refresh`` sums them once into ``_Gw2AccountHolding``, one row by account
+and item with the count of each location, at the end of each refresh of the accounts datas (see ``Gw2Db.upgrade``):
+``owned`` and ``holdings`` are then a single indexed query.
+
+Example:
+    >>> owned(db.reader, api_key, 19721)
+    250
+    >>> [(h.item_id, h.count, h.bank, h.materials) for h, item in holdings(db.reader, api_key, [19721])]
+    [(19721, 250, 0, 250)]
+"""
+
+# ORM imports
+from sqlalchemy import case, func, literal, select, union_all
+
+# package imports
+from gw2db.auths.accounts import _Gw2AccountBank, _Gw2AccountHolding, _Gw2AccountInventory, _Gw2AccountVault
+from gw2db.auths.characters import Gw2Character, _Gw2CharacterEquipment, _Gw2CharacterInventory
+from gw2db.items.items import Gw2Item
+
+LOCATIONS = ('bank', 'materials', 'shared', 'characters', 'equipped')
+"""the locations of the items, ``_Gw2AccountHolding`` columns"""
+
+
+def _sources(keys):
+    """Give the queries of the owned items of each location
+
+    :param keys: the API keys of the accounts, all the accounts if None
+    :return: a list of selects - (api_key, item_id, count, location)
+    """
+    def source(location, api_key, item_id, count, *where):
+        query = select([api_key.label('api_key'), item_id.label('item_id'), count.label('count'),
+                        literal(location).label('location')])
+        for x in where:
+            query = query.where(x)
+        return query if keys is None else query.where(api_key.in_(keys))
+
+    return [
+        source('bank', _Gw2AccountBank.api_key, _Gw2AccountBank.id, _Gw2AccountBank.count),
+        source('materials', _Gw2AccountVault.api_key, _Gw2AccountVault.id, _Gw2AccountVault.count),
+        source('shared', _Gw2AccountInventory.api_key, _Gw2AccountInventory.id, _Gw2AccountInventory.count),
+        source('characters', Gw2Character.api_key, _Gw2CharacterInventory.id, _Gw2CharacterInventory.count,
+               _Gw2CharacterInventory.char_id == Gw2Character.name),
+        source('equipped', Gw2Character.api_key, _Gw2CharacterEquipment.id, literal(1),
+               _Gw2CharacterEquipment.char_id == Gw2Character.name),
+    ]
+
+
+def refresh(session, keys=None):
+    """Compute the owned items of accounts again
+
+    :param session: a session on the db - the rows are not committed
+    :param keys: the API keys of the accounts, all the accounts if None
+    :return: the number of stored rows
+    """
+    delete = _Gw2AccountHolding.__table__.delete()
+    if keys is not None:
+        keys = list(keys)
+        delete = delete.where(_Gw2AccountHolding.api_key.in_(keys))
+    session.execute(delete)
+
+    rows = union_all(*_sources(keys)).alias('rows')
+    query = select([rows.c.api_key, rows.c.item_id, func.sum(rows.c.count)] +
+                   [func.sum(case([(rows.c.location == x, rows.c.count)], else_=0)) for x in LOCATIONS])\
+        .group_by(rows.c.api_key, rows.c.item_id)
+    insert = _Gw2AccountHolding.__table__.insert().from_select(['api_key', 'item_id', 'count'] + list(LOCATIONS),
+                                                               query)
+    return session.execute(insert).rowcount
+
+
+def owned(session, api_key, item_id):
+    """Give the owned count of an item
+
+    :param session: a session on the db
+    :param api_key: the API key of the account
+    :param item_id: the item id
+    :return: the count, all locations summed - 0 if the item is not owned
+    """
+    row = session.query(_Gw2AccountHolding.count).filter(_Gw2AccountHolding.api_key == api_key,
+                                                         _Gw2AccountHolding.item_id == item_id).first()
+    return row[0] if row is not None else 0
+
+
+def holdings(session, api_key, item_ids=None):
+    """Give the owned items of an account, with their locations
+
+    :param session: a session on the db
+    :param api_key: the API key of the account
+    :param item_ids: the wanted item ids, all the owned items if None
+    :return: a list of (``_Gw2AccountHolding``, ``Gw2Item``) tuples, by item id - the item is None if it's not in
+             the db
+    """
+    query = session.query(_Gw2AccountHolding, Gw2Item).outerjoin(Gw2Item, Gw2Item.id == _Gw2AccountHolding.item_id)\
+        .filter(_Gw2AccountHolding.api_key == api_key)
+    if item_ids is not None:
+        query = query.filter(_Gw2AccountHolding.item_id.in_(list(item_ids)))
+    return query.order_by(_Gw2AccountHolding.item_id).all()
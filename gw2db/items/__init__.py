@@ -28,13 +28,19 @@ Here is the list of accessible endpoints from this package:
     - v2/skins
 """
 
-from .colors import Gw2Dye
-from .guild import Gw2GuildUpgrade
-from .items import Gw2Item, Gw2ArmorItem, Gw2BackItem, Gw2BagItem, Gw2ConsumableItem, Gw2ContainerItem, \
-    Gw2CraftingMaterialItem, Gw2GatheringItem, Gw2GizmoItem, Gw2MiniatureItem, Gw2SalvageItem, Gw2TraitItem, \
-    Gw2TrinketItem, Gw2UpgradeItem, Gw2WeaponItem
-from .itemstats import Gw2Itemstat
-from .materials import Gw2Material
-from .minipets import Gw2MiniPet
-from .recipes import Gw2Recipe
-from .skins import Gw2Skin
+from gw2db import registry
+
+if registry.LAZY:
+    # families are imported when their classes are used, see ``gw2db.registry``
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .colors import Gw2Dye
+    from .guild import Gw2GuildUpgrade
+    from .items import Gw2Item, Gw2ArmorItem, Gw2BackItem, Gw2BagItem, Gw2ConsumableItem, Gw2ContainerItem, \
+        Gw2CraftingMaterialItem, Gw2GatheringItem, Gw2GizmoItem, Gw2MiniatureItem, Gw2SalvageItem, Gw2TraitItem, \
+        Gw2TrinketItem, Gw2UpgradeItem, Gw2WeaponItem
+    from .itemstats import Gw2Itemstat
+    from .materials import Gw2Material
+    from .minipets import Gw2MiniPet
+    from .recipes import Gw2Recipe
+    from .skins import Gw2Skin
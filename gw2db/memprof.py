@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Upgrade memory profiling
+
+This module provides the memory profile mode of upgrades: at each stage (an endpoint mapped, an endpoint inserted,
+...) it records the process peak RSS, the ``tracemalloc`` current / peak traced memory and biggest allocation sites,
+and an estimation of the bytes held per table by the mapped datas.
+
+Endpoints run concurrently: the traced peak of a sample is the highest traced memory since the previous sample,
+whichever endpoint allocated it. The per-table estimation is exact for the endpoint of the sample.
+"""
+
+# std imports
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    """Give the peak resident set size of the process
+
+    :return: the peak RSS in bytes, or None if the platform doesn't provide it
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def estimate_size(obj):
+    """Estimate the bytes held by a mapped object
+
+    Only containers produced by JSON decoding / mapping are walked (dict, list, tuple), other objects are counted
+    with ``sys.getsizeof``. Shared objects are counted once.
+
+    :param obj: the object to measure
+    :return: the estimated size in bytes
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while len(stack) > 0:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if type(o) is dict:
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif type(o) in (list, tuple):
+            stack.extend(o)
+    return size
+
+
+class MemorySample:
+    """Memory state at an upgrade stage
+
+    Attributes:
+        MemorySample.stage: the stage name (``started``, ``mapped``, ``inserted``, ``ended``)
+        MemorySample.table_name: the endpoint table name, empty for global stages
+        MemorySample.rss_peak: the process peak RSS (bytes), None if unavailable
+        MemorySample.traced_current: the memory currently traced by ``tracemalloc`` (bytes)
+        MemorySample.traced_peak: the highest memory traced since the previous sample (bytes)
+        MemorySample.tables: estimated bytes held by the mapped datas, by table name
+        MemorySample.rows: number of mapped rows, by table name
+        MemorySample.top: biggest allocation sites, as a list of ("file:line", bytes)
+    """
+    def __init__(self, stage, table_name=''):
+        self.stage = stage
+        self.table_name = table_name
+        self.rss_peak = None
+        self.traced_current = 0
+        self.traced_peak = 0
+        self.tables = dict()
+        self.rows = dict()
+        self.top = list()
+
+    @property
+    def mapped_bytes(self):
+        """Estimated bytes held by all the mapped datas of the sample"""
+        return sum(self.tables.values())
+
+    def as_dict(self):
+        """Give the sample as a dictionnary
+
+        :return: a JSON serializable dictionnary
+        """
+        return dict(stage=self.stage, table_name=self.table_name, rss_peak=self.rss_peak,
+                    traced_current=self.traced_current, traced_peak=self.traced_peak, tables=dict(self.tables),
+                    rows=dict(self.rows), top=list(self.top))
+
+    def __str__(self):
+        return '%-8s %-28s rss_peak=%s traced=%d peak=%d mapped=%d' % (
+            self.stage, self.table_name, self.rss_peak, self.traced_current, self.traced_peak, self.mapped_bytes)
+
+
+class MemoryProfiler:
+    """Memory samples recorder
+
+    Example:
+        >>> prof = MemoryProfiler()
+        >>> prof.start()
+        >>> prof.sample('mapped', 'Gw2Item', mapped)
+        >>> prof.stop()
+        >>> print(prof.peak)
+    """
+    def __init__(self, top=10, frames=1):
+        """Initialize the recorder
+
+        :param top: number of allocation sites kept in each sample
+        :param frames: number of frames stored by ``tracemalloc`` for each allocation
+        """
+        self.samples = list()
+        self._top = top
+        self._frames = frames
+        self._owner = False
+
+    def start(self):
+        """Start tracing allocations, if not already done"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._owner = True
+        self.sample('started')
+
+    def stop(self):
+        """Record a last sample, then stop tracing allocations if the recorder started it"""
+        self.sample('ended')
+        if self._owner:
+            tracemalloc.stop()
+            self._owner = False
+
+    def sample(self, stage, table_name='', mapped=None):
+        """Record a memory sample
+
+        :param stage: the stage name
+        :param table_name: the endpoint table name
+        :param mapped: the mapped datas of the endpoint - key=table class, value=list of mapped rows
+        :return: the recorded ``MemorySample``
+        """
+        s = MemorySample(stage, table_name)
+        s.rss_peak = peak_rss()
+        if tracemalloc.is_tracing():
+            s.traced_current, s.traced_peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            if self._top > 0:
+                stats = tracemalloc.take_snapshot().statistics('lineno')
+                s.top = [(str(x.traceback), x.size) for x in stats[:self._top]]
+        if mapped is not None:
+            for k, v in mapped.items():
+                s.tables[k.__name__] = estimate_size(v)
+                s.rows[k.__name__] = len(v)
+        self.samples.append(s)
+        return s
+
+    @property
+    def peak(self):
+        """The sample with the highest traced peak, None if there is no sample"""
+        if len(self.samples) == 0:
+            return None
+        return max(self.samples, key=lambda x: x.traced_peak)
+
+    def as_dict(self):
+        """Give the samples as a dictionnary
+
+        :return: a JSON serializable dictionnary
+        """
+        return dict(samples=[x.as_dict() for x in self.samples])
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Upgrade metrics
+
+This module provides the counters filled while an upgrade runs: requests, bytes, decode / mapping / insert times,
+rows produced per table, retries and queue depth. They are collected per endpoint and per page, then gathered into
+an end-of-run summary.
+"""
+
+# std imports
+import time
+
+# threading imports
+from threading import Lock
+
+
+class PageMetrics:
+    """Counters for one downloaded page of an endpoint
+
+    Attributes:
+        PageMetrics.args: url arguments used to download the page (without access token)
+        PageMetrics.requests: number of HTTP requests sent (retries included)
+        PageMetrics.retries: number of requests which timed out and were sent again
+        PageMetrics.bytes: number of bytes received
+        PageMetrics.queue_depth: number of pending pages in the endpoint queue when this one was popped
+        PageMetrics.download_time: time spent waiting for the network (seconds)
+        PageMetrics.decode_time: time spent decoding JSON (seconds)
+        PageMetrics.mapping_time: time spent mapping JSON objects to rows (seconds)
+        PageMetrics.rows: number of rows produced, by table name
+    """
+    def __init__(self, args=None, queue_depth=0):
+        """Initialize page counters
+
+        :param args: url arguments of the page
+        :param queue_depth: pending pages count when the page was popped
+        """
+        self.args = {k: v for k, v in args.items() if k != 'access_token'} if args is not None else dict()
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.queue_depth = queue_depth
+        self.download_time = 0.
+        self.decode_time = 0.
+        self.mapping_time = 0.
+        self.rows = dict()
+
+    def add_rows(self, table_name, count=1):
+        """Count produced rows
+
+        :param table_name: name of the table class the rows are mapped into
+        :param count: number of rows
+        """
+        self.rows[table_name] = self.rows.get(table_name, 0) + count
+
+    def as_dict(self):
+        """Give the counters as a dictionnary
+
+        :return: a JSON serializable dictionnary
+        """
+        return dict(args=self.args, requests=self.requests, retries=self.retries, bytes=self.bytes,
+                    queue_depth=self.queue_depth, download_time=self.download_time, decode_time=self.decode_time,
+                    mapping_time=self.mapping_time, rows=dict(self.rows))
+
+
+class EndpointMetrics:
+    """Counters for one endpoint manager
+
+    Page counters are added by the endpoint threads, so every update is done under a lock.
+
+    Attributes:
+        EndpointMetrics.table_name: name of the table class associated to the endpoint
+        EndpointMetrics.pages: list of ``PageMetrics``, in download order
+        EndpointMetrics.size_requests: number of HTTP requests sent to get the endpoint size
+        EndpointMetrics.size_time: time spent getting the endpoint size (seconds)
+        EndpointMetrics.shared: number of requests not sent, their datas being shared with another access token
+        EndpointMetrics.insert_time: time spent inserting rows in db, by table name (seconds)
+        EndpointMetrics.inserted: number of rows inserted in db, by table name
+        EndpointMetrics.children: metrics of the subendpoints managers
+    """
+    def __init__(self, table_name):
+        """Initialize endpoint counters
+
+        :param table_name: name of the table class associated to the endpoint
+        """
+        self.table_name = table_name
+        self.pages = list()
+        self.size_requests = 0
+        self.size_time = 0.
+        self.shared = 0
+        self.insert_time = dict()
+        self.inserted = dict()
+        self.children = list()
+
+        self._lock = Lock()
+
+    def add_page(self, page):
+        """Add the counters of a downloaded page
+
+        :param page: a ``PageMetrics`` object
+        """
+        with self._lock:
+            self.pages.append(page)
+
+    def add_size(self, requests, duration):
+        """Add the counters of an endpoint size request
+
+        :param requests: number of HTTP requests sent
+        :param duration: time spent (seconds)
+        """
+        with self._lock:
+            self.size_requests += requests
+            self.size_time += duration
+
+    def add_shared(self, count):
+        """Add requests which are not sent, see ``Gw2Endpoint.set_params``
+
+        :param count: number of requests given the answer of another one
+        """
+        with self._lock:
+            self.shared += count
+
+    def add_insert(self, table_name, count, duration):
+        """Add the counters of a db insertion
+
+        :param table_name: name of the inserted table class
+        :param count: number of inserted rows
+        :param duration: time spent (seconds)
+        """
+        with self._lock:
+            self.inserted[table_name] = self.inserted.get(table_name, 0) + count
+            self.insert_time[table_name] = self.insert_time.get(table_name, 0.) + duration
+
+    def _sum(self, attr):
+        with self._lock:
+            return sum(getattr(p, attr) for p in self.pages)
+
+    @property
+    def requests(self):
+        """Number of HTTP requests sent, size requests included"""
+        return self._sum('requests') + self.size_requests
+
+    @property
+    def retries(self):
+        """Number of timed out requests sent again"""
+        return self._sum('retries')
+
+    @property
+    def bytes(self):
+        """Number of bytes received"""
+        return self._sum('bytes')
+
+    @property
+    def download_time(self):
+        """Time spent waiting for the network, size requests included (seconds)"""
+        return self._sum('download_time') + self.size_time
+
+    @property
+    def decode_time(self):
+        """Time spent decoding JSON (seconds)"""
+        return self._sum('decode_time')
+
+    @property
+    def mapping_time(self):
+        """Time spent mapping JSON objects to rows (seconds)"""
+        return self._sum('mapping_time')
+
+    @property
+    def max_queue_depth(self):
+        """Highest number of pending pages seen in the endpoint queue"""
+        with self._lock:
+            return max([p.queue_depth for p in self.pages] or [0])
+
+    @property
+    def rows(self):
+        """Number of rows produced, by table name"""
+        rows = dict()
+        with self._lock:
+            for p in self.pages:
+                for k, v in p.rows.items():
+                    rows[k] = rows.get(k, 0) + v
+        return rows
+
+    def walk(self):
+        """Iterate over these metrics and all the subendpoints ones
+
+        :return: a generator of ``EndpointMetrics``
+        """
+        yield self
+        for ch in self.children:
+            for m in ch.walk():
+                yield m
+
+    def as_dict(self):
+        """Give the counters as a dictionnary
+
+        :return: a JSON serializable dictionnary
+        """
+        return dict(table_name=self.table_name, requests=self.requests, retries=self.retries, bytes=self.bytes,
+                    download_time=self.download_time, decode_time=self.decode_time, mapping_time=self.mapping_time,
+                    max_queue_depth=self.max_queue_depth, shared=self.shared, rows=self.rows,
+                    inserted=dict(self.inserted), insert_time=dict(self.insert_time),
+                    pages=[p.as_dict() for p in self.pages],
+                    children=[ch.as_dict() for ch in self.children])
+
+
+class UpgradeMetrics:
+    """End-of-run summary of an upgrade
+
+    Attributes:
+        UpgradeMetrics.endpoints: the root endpoints metrics, by table name - or by the name given to ``add``
+        UpgradeMetrics.started: upgrade start timestamp
+        UpgradeMetrics.ended: upgrade end timestamp, None while running
+    """
+    def __init__(self):
+        """Initialize an empty summary"""
+        self.endpoints = dict()
+        self.started = time.time()
+        self.ended = None
+
+    @property
+    def duration(self):
+        """Upgrade duration (seconds)"""
+        return (self.ended if self.ended is not None else time.time()) - self.started
+
+    def add(self, metrics, name=None):
+        """Add a root endpoint metrics
+
+        :param metrics: an ``EndpointMetrics`` object
+        :param name: the key of the metrics in ``endpoints``, its table name if None - the trees of several runs of
+                     the same root endpoint need their own
+        """
+        self.endpoints[name if name is not None else metrics.table_name] = metrics
+
+    def stop(self):
+        """Mark the upgrade as ended"""
+        self.ended = time.time()
+
+    def walk(self):
+        """Iterate over all endpoints metrics, subendpoints included
+
+        :return: a generator of ``EndpointMetrics``
+        """
+        for m in self.endpoints.values():
+            for sm in m.walk():
+                yield sm
+
+    def totals(self):
+        """Sum the counters of all endpoints
+
+        :return: a dictionnary of summed counters
+        """
+        keys = ['requests', 'retries', 'bytes', 'download_time', 'decode_time', 'mapping_time']
+        tot = {k: 0 for k in keys}
+        tot['rows'] = 0
+        tot['inserted'] = 0
+        tot['insert_time'] = 0.
+        for m in self.walk():
+            for k in keys:
+                tot[k] += getattr(m, k)
+            tot['rows'] += sum(m.rows.values())
+            tot['inserted'] += sum(m.inserted.values())
+            tot['insert_time'] += sum(m.insert_time.values())
+        return tot
+
+    def as_dict(self):
+        """Give the summary as a dictionnary
+
+        :return: a JSON serializable dictionnary
+        """
+        return dict(duration=self.duration, totals=self.totals(),
+                    endpoints={k: v.as_dict() for k, v in self.endpoints.items()})
+
+    def __str__(self):
+        lines = ['upgrade: %.2fs' % self.duration]
+        for m in sorted(self.walk(), key=lambda x: x.table_name):
+            lines.append('  %-28s req=%-5d retry=%-3d %9d B  dl=%.2fs  decode=%.2fs  map=%.2fs  insert=%.2fs  rows=%d'
+                         % (m.table_name, m.requests, m.retries, m.bytes, m.download_time, m.decode_time,
+                            m.mapping_time, sum(m.insert_time.values()), sum(m.rows.values())))
+        return '\n'.join(lines)
@@ -30,10 +30,16 @@ Here is the list of accessible endpoints from this package:
     - v2/worlds
 """
 
-from .achievements import Gw2Achievement, Gw2AchievementCategory, Gw2AchievementGroup
-from .currency import Gw2Currency
-from .emblem import Gw2EmblemBackground, Gw2EmblemForeground
-from .finishers import Gw2Finisher
-from .outfits import Gw2Outfit
-from .titles import Gw2Title
-from .worlds import Gw2World
\ No newline at end of file
+from gw2db import registry
+
+if registry.LAZY:
+    # families are imported when their classes are used, see ``gw2db.registry``
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .achievements import Gw2Achievement, Gw2AchievementCategory, Gw2AchievementGroup
+    from .currency import Gw2Currency
+    from .emblem import Gw2EmblemBackground, Gw2EmblemForeground
+    from .finishers import Gw2Finisher
+    from .outfits import Gw2Outfit
+    from .titles import Gw2Title
+    from .worlds import Gw2World
@@ -153,6 +153,23 @@ class _Gw2AchievementRequires(Base):
     req_id = Column(Integer, ForeignKey("gw2_misc_achievement.id"), primary_key=True)
 
 
+class _Gw2AchievementClosure(Base):
+    """Db table - the transitive closure of the achievements prerequisites, filled at the end of each upgrade (see
+    ``gw2db.prerequisites``)
+
+    Attributes:
+        _Gw2AchievementClosure.ach_id: the achievement id
+        _Gw2AchievementClosure.req_id: the id of an achievement needed before, directly or not
+        _Gw2AchievementClosure.depth: the length of the shortest prerequisites chain between them, 1 if direct
+    """
+    __tablename__ = "gw2_misc_achievement_closure"
+
+    # Columns
+    ach_id = Column(Integer, ForeignKey("gw2_misc_achievement.id"), primary_key=True)
+    req_id = Column(Integer, ForeignKey("gw2_misc_achievement.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+
 class Gw2Achievement(Base):
     """Map the achievements endpoint
 
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""In-memory prefix index, for names autocomplete
+
+A ``PrefixIndex`` reads the names of some tables once, then answers prefix queries without any db access: each
+name is stored from each of its words ("Mighty Iron Sword" is found by "mig", "iron s", "swo"), case and accents
+ignored, in a sorted list searched with ``bisect``. The best ``k`` matches are given, by a configurable rank.
+
+The index is built at the first query, and built again after each successful upgrade of its db.
+
+Example:
+    >>> index = PrefixIndex(db)
+    >>> index.complete('iron s', k=5)
+    [PrefixEntry(kind='Gw2Item', id=19684, name='Iron Sword', rarity='Basic', level=5), ...]
+"""
+
+# std imports
+import heapq
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+
+# ORM imports
+from sqlalchemy import inspect
+
+# package imports
+from gw2db.cache import DbCache
+from gw2db.common import Base, translation_key
+
+TABLES = ('Gw2Achievement', 'Gw2Item', 'Gw2Skill', 'Gw2Trait')
+"""the class names of the tables indexed by default"""
+
+RARITIES = ['Junk', 'Basic', 'Fine', 'Masterwork', 'Rare', 'Exotic', 'Ascended', 'Legendary']
+"""the items rarities, from the lowest"""
+
+PrefixEntry = namedtuple('PrefixEntry', ['kind', 'id', 'name', 'rarity', 'level'])
+"""an indexed row: its class name, id, name, rarity and level (None if its table has no such column)"""
+
+
+def normalize(text):
+    """Normalize a text for prefix comparisons: lower case, without accents nor repeated spaces
+
+    :param text: the text
+    :return: the normalized text
+    """
+    text = unicodedata.normalize('NFKD', text)
+    return ' '.join(''.join(x for x in text if not unicodedata.combining(x)).casefold().split())
+
+
+def default_rank(entry):
+    """Default rank of the entries: the highest rarity first, then the highest level, then the shortest name
+
+    :param entry: a ``PrefixEntry``
+    :return: the sort key, lowest first
+    """
+    rarity = RARITIES.index(entry.rarity) if entry.rarity in RARITIES else -1
+    return -rarity, -(entry.level or 0), len(entry.name), entry.name
+
+
+class PrefixIndex(DbCache):
+    """Names prefix index of a db, see ``DbCache``
+
+    Attributes:
+        PrefixIndex.rank: the rank function of the entries, see ``default_rank``
+    """
+    def __init__(self, db, tables=None, rank=default_rank, lang=None):
+        """Initialize an index - it's built at the first query
+
+        :param db: the ``Gw2Db`` to read names from
+        :param tables: the indexed classes, the mapped ones of ``TABLES`` if None
+        :param rank: a function giving the sort key of a ``PrefixEntry``, the lowest first
+        :param lang: the language of the names, one of the db languages (``lang`` or ``locales``) - ``lang`` if None
+        """
+        super(PrefixIndex, self).__init__(db)
+        self.rank = rank
+        self._tables = tables
+        self._lang = lang
+
+    def _classes(self):
+        """Give the indexed classes
+
+        :return: a list of classes
+        """
+        if self._tables is not None:
+            return list(self._tables)
+        classes = {x.__name__: x for x in Base._decl_class_registry.values() if isinstance(x, type)}
+        return [classes[x] for x in TABLES if x in classes]
+
+    def _build(self, session):
+        """Read the names and build the sorted keys
+
+        :param session: the session to read with, see ``DbCache._build``
+        :return: (keys, entry index of each key, entries)
+        """
+        translated = self._lang is not None and self._lang != self._db.lang
+
+        entries = list()
+        keys = list()
+        for cls in self._classes():
+            mapper = inspect(cls)
+            names = self._db.translations(cls, 'name', self._lang, session) if translated else dict()
+            attrs = [mapper.primary_key[0], cls.name]
+            attrs.extend(getattr(cls, x) if x in mapper.columns else None for x in ('rarity', 'level'))
+            query = session.query(*[x for x in attrs if x is not None])
+            for row in query.all():
+                values = iter(row)
+                id_, name = next(values), next(values)
+                rarity, level = [next(values) if x is not None else None for x in attrs[2:]]
+                name = names.get(translation_key([id_]), name)
+                if not name:
+                    continue
+
+                words = normalize(name).split(' ')
+                for i in range(0, len(words)):
+                    keys.append((' '.join(words[i:]), len(entries)))
+                entries.append(PrefixEntry(cls.__name__, id_, name, rarity, level))
+        keys.sort()
+        return [x[0] for x in keys], [x[1] for x in keys], entries
+
+    def complete(self, prefix, k=10, tables=None):
+        """Give the best entries whose name has a word starting with a prefix
+
+        :param prefix: the typed text - it may be several words, the last one being a prefix
+        :param k: maximum number of entries
+        :param tables: the searched classes, all the indexed ones if None
+        :return: a list of ``PrefixEntry``, best ranked first
+        """
+        keys, refs, entries = self._get()
+        prefix = normalize(prefix)
+        if len(prefix) == 0:
+            return list()
+        kinds = None if tables is None else {x.__name__ for x in tables}
+
+        found = set()
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            found.add(refs[i])
+        found = (entries[x] for x in found)
+        if kinds is not None:
+            found = (x for x in found if x.kind in kinds)
+        return heapq.nsmallest(k, found, key=self.rank)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Achievements prerequisites graph
+
+``Gw2Achievement.prerequisites`` links an achievement to the ones needed before it. A ``PrerequisiteGraph`` reads
+the whole relation once, with its transitive closure: everything needed before an achievement, in topological order,
+and the achievements an account may unlock next are then given without walking the relation.
+
+The closure is computed at the end of each upgrade and cached in the ``_Gw2AchievementClosure`` table (see
+``store``): the graph is read from it, or computed from the relation if the table is empty (db upgraded before).
+Prerequisites closing a cycle, if any, are ignored.
+
+Example:
+    >>> graph = PrerequisiteGraph(db)
+    >>> graph.prerequisites(2258)  # everything needed before, first ones first
+    [2000, 2101, 2163]
+    >>> graph.unlockable(api_key)
+    [2163, 4012, ...]
+"""
+
+# std imports
+from collections import namedtuple
+
+# package imports
+from gw2db.auths.accounts import _Gw2AccountAchievement
+from gw2db.cache import DbCache
+from gw2db.miscs.achievements import _Gw2AchievementClosure, _Gw2AchievementRequires
+
+_Graph = namedtuple('_Graph', ['reqs', 'direct', 'users', 'order'])
+"""the read relation - ``reqs``: frozenset of all the prerequisites of each achievement, ``direct`` / ``users``: direct
+prerequisites of each achievement / achievements directly needing it, ``order``: the achievements of the relation in
+topological order"""
+
+
+def closure(pairs):
+    """Compute the transitive closure of prerequisites
+
+    :param pairs: (achievement id, prerequisite id) tuples
+    :return: a dictionnary - key=achievement id, value=dictionnary of its prerequisites (key=prerequisite id,
+             value=depth, 1 if direct). Achievements without prerequisites are not given
+    """
+    requires = dict()
+    for ach_id, req_id in pairs:
+        requires.setdefault(ach_id, set()).add(req_id)
+    requires = {k: sorted(v) for k, v in requires.items()}
+
+    # depth first walk, prerequisites closing a cycle are dropped
+    state = dict()  # missing: not seen, 1: being visited, 2: done
+    post = list()
+    for root in sorted(requires):
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, 0)]
+        while len(stack) > 0:
+            n, i = stack[-1]
+            reqs = requires.get(n, ())
+            if i == len(reqs):
+                stack.pop()
+                state[n] = 2
+                post.append(n)
+                continue
+            stack[-1] = (n, i + 1)
+            c = reqs[i]
+            if state.get(c) == 1:
+                reqs[i] = None
+            elif c not in state:
+                state[c] = 1
+                stack.append((c, 0))
+
+    result = dict()
+    for n in post:
+        reqs = dict()
+        for p in requires.get(n, ()):
+            if p is None:
+                continue
+            reqs[p] = 1
+            for x, d in result.get(p, dict()).items():
+                if reqs.get(x, d + 2) > d + 1:
+                    reqs[x] = d + 1
+        if len(reqs) > 0:
+            result[n] = reqs
+    return result
+
+
+def store(session):
+    """Compute the closure of the prerequisites relation of a db, and store it
+
+    :param session: a session on the db, ``_Gw2AchievementClosure`` being empty
+    :return: the number of stored rows
+    """
+    rows = [dict(ach_id=a, req_id=r, depth=d)
+            for a, reqs in closure(session.query(_Gw2AchievementRequires.ach_id, _Gw2AchievementRequires.req_id))
+            .items() for r, d in reqs.items()]
+    session.bulk_insert_mappings(_Gw2AchievementClosure, rows)
+    return len(rows)
+
+
+class PrerequisiteGraph(DbCache):
+    """Achievements prerequisites graph of a db, see ``DbCache``"""
+    def _build(self, session):
+        """Read the closure, computed from the relation if it's not stored
+
+        :param session: the session to read with, see ``DbCache._build``
+        :return: a ``_Graph``
+        """
+        rows = session.query(_Gw2AchievementClosure.ach_id, _Gw2AchievementClosure.req_id,
+                             _Gw2AchievementClosure.depth).all()
+        if len(rows) == 0:
+            rows = [(a, r, d) for a, reqs in closure(session.query(_Gw2AchievementRequires.ach_id,
+                                                                   _Gw2AchievementRequires.req_id)).items()
+                    for r, d in reqs.items()]
+
+        reqs, direct, users = dict(), dict(), dict()
+        for a, r, d in rows:
+            reqs.setdefault(a, set()).add(r)
+            if d == 1:
+                direct.setdefault(a, list()).append(r)
+                users.setdefault(r, list()).append(a)
+        reqs = {k: frozenset(v) for k, v in reqs.items()}
+
+        graph = _Graph(reqs, direct, users, None)
+        return graph._replace(order=sorted(set(reqs).union(users), key=self._rank(graph)))
+
+    @staticmethod
+    def _rank(graph):
+        """Give the topological sort key
+
+        An achievement needs more achievements than each of its prerequisites: sorting them by number of
+        prerequisites, then by id, gives a topological order.
+
+        :param graph: the ``_Graph``
+        :return: the sort key function of achievement ids
+        """
+        return lambda x: (len(graph.reqs.get(x, ())), x)
+
+    def prerequisites(self, ach_id):
+        """Give all the achievements needed before an achievement
+
+        :param ach_id: the achievement id
+        :return: the list of achievement ids, in topological order (each one after its own prerequisites)
+        """
+        graph = self._get()
+        return sorted(graph.reqs.get(ach_id, ()), key=self._rank(graph))
+
+    def requires(self, ach_id, req_id):
+        """Tell if an achievement is needed before another one, directly or not
+
+        :param ach_id: the achievement id
+        :param req_id: the maybe needed achievement id
+        :return: True if ``req_id`` is needed before ``ach_id``
+        """
+        return req_id in self._get().reqs.get(ach_id, ())
+
+    def order(self, ids=None):
+        """Sort achievements in topological order
+
+        :param ids: the achievement ids, all the achievements of the relation if None
+        :return: the list of achievement ids, each one after its prerequisites. Achievements without prerequisites
+                 come first, by id
+        """
+        graph = self._get()
+        if ids is None:
+            return list(graph.order)
+        return sorted(ids, key=self._rank(graph))
+
+    def unlockable_from(self, done):
+        """Give the achievements unlocked by some done achievements
+
+        :param done: the done achievement ids
+        :return: the list of the achievements which are not done, but whose prerequisites are all done - ascending
+                 ids. Achievements without prerequisites are not given
+        """
+        graph = self._get()
+        done = set(done)
+        found = set()
+        for x in done:
+            for a in graph.users.get(x, ()):
+                if a not in done and a not in found and all(r in done for r in graph.direct[a]):
+                    found.add(a)
+        return sorted(found)
+
+    def unlockable(self, api_key):
+        """Give the achievements an account may unlock next, see ``unlockable_from``
+
+        :param api_key: the API key of the account
+        :return: the list of achievement ids, ascending
+        """
+        done = self._db.reader.query(_Gw2AccountAchievement.id).filter(_Gw2AccountAchievement.api_key == api_key,
+                                                                       _Gw2AccountAchievement.done == True).all()
+        return self.unlockable_from(x[0] for x in done)
@@ -27,10 +27,16 @@ Here is the list of accessible endpoints from this package:
     - v2/traits
 """
 
-from .legends import Gw2Legend
-from .masteries import Gw2Mastery
-from .pets import Gw2Pet
-from .professions import Gw2Profession
-from .skills import Gw2Skill
-from .specializations import Gw2Specialization
-from .traits import Gw2Trait
+from gw2db import registry
+
+if registry.LAZY:
+    # families are imported when their classes are used, see ``gw2db.registry``
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .legends import Gw2Legend
+    from .masteries import Gw2Mastery
+    from .pets import Gw2Pet
+    from .professions import Gw2Profession
+    from .skills import Gw2Skill
+    from .specializations import Gw2Specialization
+    from .traits import Gw2Trait
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Table families registry, for lazy loading
+
+A family is a table mapping module, named by its path in the package (``items.items``, ``profs.skills``...). This
+module declares the families without importing them: their public classes and the families their foreign keys and
+relationships refer to, which must be mapped with them.
+
+By default, ``import gw2db`` imports all the families. With the ``GW2DB_LAZY`` environment variable set to ``1``,
+nothing is imported until it's used:
+    - ``Gw2Db(families=[...])`` only imports and maps the given families, with their dependencies
+    - accessing a class of ``gw2db`` or of a subpackage imports its family (Python 3.7 and higher)
+    - upgrades import all the families, as they store all the tables
+
+Example:
+    >>> # GW2DB_LAZY=1
+    >>> import gw2db
+    >>> db = gw2db.Gw2Db(families=['items.skins'])
+    >>> skins = db.session.query(gw2db.Gw2Skin).all()
+"""
+
+# std imports
+import importlib
+import os
+import sys
+
+LAZY = os.environ.get('GW2DB_LAZY', '0') not in ('', '0')
+"""True if the lazy loading mode is enabled"""
+
+FAMILIES = {
+    'auths.accounts': ('Gw2Account',),
+    'auths.characters': ('Gw2Character',),
+    'auths.guilds': ('Gw2Guild',),
+    'auths.token': ('Gw2Token',),
+    'items.colors': ('Gw2Dye',),
+    'items.guild': ('Gw2GuildUpgrade',),
+    'items.items': ('Gw2Item', 'Gw2ArmorItem', 'Gw2BackItem', 'Gw2BagItem', 'Gw2ConsumableItem', 'Gw2ContainerItem',
+                    'Gw2CraftingMaterialItem', 'Gw2GatheringItem', 'Gw2GizmoItem', 'Gw2MiniatureItem',
+                    'Gw2SalvageItem', 'Gw2TraitItem', 'Gw2TrinketItem', 'Gw2UpgradeItem', 'Gw2WeaponItem'),
+    'items.itemstats': ('Gw2Itemstat',),
+    'items.materials': ('Gw2Material',),
+    'items.minipets': ('Gw2MiniPet',),
+    'items.recipes': ('Gw2Recipe',),
+    'items.skins': ('Gw2Skin',),
+    'miscs.achievements': ('Gw2Achievement', 'Gw2AchievementCategory', 'Gw2AchievementGroup'),
+    'miscs.currency': ('Gw2Currency',),
+    'miscs.emblem': ('Gw2EmblemBackground', 'Gw2EmblemForeground'),
+    'miscs.finishers': ('Gw2Finisher',),
+    'miscs.outfits': ('Gw2Outfit',),
+    'miscs.titles': ('Gw2Title',),
+    'miscs.worlds': ('Gw2World',),
+    'profs.facts': (),
+    'profs.legends': ('Gw2Legend',),
+    'profs.masteries': ('Gw2Mastery',),
+    'profs.pets': ('Gw2Pet',),
+    'profs.professions': ('Gw2Profession',),
+    'profs.skills': ('Gw2Skill',),
+    'profs.specializations': ('Gw2Specialization',),
+    'profs.traits': ('Gw2Trait',),
+    'story.backstory': ('Gw2BackstoryQuestion', 'Gw2BackstoryAnswer'),
+    'story.story': ('Gw2Story', 'Gw2Season'),
+}
+"""the table families - key=family name, value=public classes"""
+
+DEPENDS = {
+    'auths.accounts': ('auths.guilds', 'auths.token', 'items.colors', 'items.items', 'items.materials',
+                       'items.minipets', 'items.recipes', 'items.skins', 'miscs.achievements', 'miscs.currency',
+                       'miscs.finishers', 'miscs.outfits', 'miscs.titles', 'miscs.worlds', 'profs.masteries'),
+    'auths.characters': ('auths.token', 'items.items', 'items.itemstats', 'items.skins', 'miscs.titles',
+                         'profs.professions', 'profs.skills', 'profs.specializations', 'profs.traits',
+                         'story.backstory'),
+    'auths.guilds': ('auths.accounts', 'items.colors', 'miscs.emblem'),
+    'items.colors': ('items.items',),
+    'items.guild': ('items.items',),
+    'items.items': ('items.colors', 'items.itemstats', 'items.materials', 'items.minipets', 'items.recipes',
+                    'items.skins'),
+    'items.materials': ('items.items',),
+    'items.minipets': ('items.items',),
+    'items.recipes': ('items.guild', 'items.items'),
+    'miscs.achievements': ('items.items', 'items.minipets', 'items.skins', 'miscs.titles', 'profs.masteries'),
+    'miscs.finishers': ('items.items',),
+    'miscs.outfits': ('items.items',),
+    'miscs.titles': ('miscs.achievements',),
+    'profs.facts': ('profs.skills', 'profs.traits'),
+    'profs.legends': ('profs.skills',),
+    'profs.professions': ('profs.skills', 'profs.specializations', 'profs.traits'),
+    'profs.skills': ('profs.facts', 'profs.professions'),
+    'profs.specializations': ('profs.professions', 'profs.traits'),
+    'profs.traits': ('profs.facts', 'profs.specializations'),
+}
+"""the families referred to by each family tables - key=family name, value=family names"""
+
+ENTRY = ('Gw2Db', 'DbUpgradeStatus', 'EndpointUpgradeStatus')
+"""the public names of the ``gw2db.gw2db`` module"""
+
+
+def family_of(name, package=''):
+    """Find the family of a public class
+
+    :param name: the class name
+    :param package: if given, only the families of this subpackage are searched (``items``, ``profs``...)
+    :return: the family name, None if no family declares this class
+    """
+    for family, classes in FAMILIES.items():
+        if name in classes and family.startswith(package):
+            return family
+    return None
+
+
+def closure(families):
+    """Give families with all the families they depend on
+
+    :param families: a list of family names
+    :return: the set of family names
+    """
+    found = set()
+    stack = list(families)
+    while len(stack) > 0:
+        family = stack.pop()
+        if family in found:
+            continue
+        if family not in FAMILIES:
+            raise KeyError('Unknown table family: %s' % family)
+        found.add(family)
+        stack.extend(DEPENDS.get(family, ()))
+    return found
+
+
+def load(families=None):
+    """Import families and the families they depend on
+
+    :param families: a list of family names, all the families if None
+    :return: the set of imported family names
+    """
+    found = closure(FAMILIES if families is None else families)
+    for family in sorted(found):
+        importlib.import_module('gw2db.' + family)
+    return found
+
+
+def loaded():
+    """Give the imported families
+
+    :return: the set of imported family names
+    """
+    return {x for x in FAMILIES if 'gw2db.' + x in sys.modules}
+
+
+def public_names():
+    """Give the public names of the ``gw2db`` package
+
+    :return: a list of names
+    """
+    return [x for classes in FAMILIES.values() for x in classes] + list(ENTRY)
+
+
+def lazy_getattr(package):
+    """Make the module ``__getattr__`` function (PEP 562) of a lazy package
+
+    The function imports the family of an accessed class, or the accessed submodule.
+
+    :param package: the package name (``gw2db``, ``gw2db.items``...)
+    :return: the function
+    """
+    prefix = package[len('gw2db') + 1:]
+
+    def __getattr__(name):
+        if name.startswith('__'):
+            raise AttributeError('module %r has no attribute %r' % (package, name))
+        family = family_of(name, prefix)
+        if family is not None:
+            load([family])
+            return getattr(sys.modules['gw2db.' + family], name)
+        if prefix == '' and name in ENTRY:
+            return getattr(importlib.import_module('gw2db.gw2db'), name)
+        try:
+            return importlib.import_module(package + '.' + name)
+        except ImportError as e:
+            if e.name != package + '.' + name:
+                raise
+            raise AttributeError('module %r has no attribute %r' % (package, name))
+    return __getattr__
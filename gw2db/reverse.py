@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Reverse indexes of the items
+
+The relations of the db go from a recipe or an achievement to the items it uses: a ``ReverseIndex`` reads them once
+and stores the other way, item to recipes / achievements, in compact arrays (CSR form: the rows of the ``k``-th item
+id of ``keys`` are the entries ``ptr[k]`` to ``ptr[k + 1] - 1`` of ``rows``). Queries are then answered without any
+db access.
+
+The index is eager: it's built again at the end of each successful upgrade of its db, see ``DbCache``.
+
+Example:
+    >>> index = ReverseIndex(db)
+    >>> index.used_in(19721)  # recipes using Glob of Ectoplasm
+    [1234, 5678, ...]
+"""
+
+# std imports
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+# package imports
+from gw2db.cache import DbCache
+from gw2db.items.recipes import _Gw2RecipeIngredient
+from gw2db.miscs.achievements import _Gw2ABItem, _Gw2ARItem
+
+_Csr = namedtuple('_Csr', ['keys', 'ptr', 'rows'])
+"""a reverse relation - ``keys``: sorted item ids, ``ptr`` / ``rows``: ids related to each key, in CSR form"""
+
+_Reverse = namedtuple('_Reverse', ['recipes', 'rewards', 'bits'])
+"""the reverse relations - items to the recipes using them, to the achievements rewarding them, to the achievements
+whose bits need them"""
+
+
+def _csr(pairs):
+    """Build a reverse relation
+
+    :param pairs: (item id, related id) tuples
+    :return: a ``_Csr``, each key giving its distinct related ids in ascending order
+    """
+    keys, ptr, rows = array('l'), array('l', [0]), array('l')
+    for item_id, row in sorted(set(pairs)):
+        if len(keys) == 0 or keys[-1] != item_id:
+            if len(keys) > 0:
+                ptr.append(len(rows))
+            keys.append(item_id)
+        rows.append(row)
+    if len(keys) > 0:
+        ptr.append(len(rows))
+    return _Csr(keys, ptr, rows)
+
+
+def _lookup(csr, item_id):
+    """Give the related ids of an item
+
+    :param csr: the ``_Csr``
+    :param item_id: the item id
+    :return: the list of related ids, empty if none
+    """
+    k = bisect_left(csr.keys, item_id)
+    if k == len(csr.keys) or csr.keys[k] != item_id:
+        return list()
+    return csr.rows[csr.ptr[k]:csr.ptr[k + 1]].tolist()
+
+
+class ReverseIndex(DbCache):
+    """Items to recipes and achievements reverse index of a db, see ``DbCache``"""
+    def __init__(self, db, eager=True):
+        """Initialize the index - see ``DbCache``"""
+        super().__init__(db, eager)
+
+    def _build(self, session):
+        """Read the relations
+
+        :param session: the session to read with, see ``DbCache._build``
+        :return: a ``_Reverse``
+        """
+        return _Reverse(
+            _csr(session.query(_Gw2RecipeIngredient.item_id, _Gw2RecipeIngredient.recipe_id)),
+            _csr(session.query(_Gw2ARItem.item_id, _Gw2ARItem.ach_id)),
+            _csr(session.query(_Gw2ABItem.item_id, _Gw2ABItem.ach_id)))
+
+    def used_in(self, item_id):
+        """Give the recipes using an item as ingredient
+
+        :param item_id: the item id
+        :return: the list of recipe ids, ascending
+        """
+        return _lookup(self._get().recipes, item_id)
+
+    def rewarded_by(self, item_id):
+        """Give the achievements rewarding an item
+
+        :param item_id: the item id
+        :return: the list of achievement ids, ascending
+        """
+        return _lookup(self._get().rewards, item_id)
+
+    def collected_by(self, item_id):
+        """Give the achievements having an item as bit (collections)
+
+        :param item_id: the item id
+        :return: the list of achievement ids, ascending
+        """
+        return _lookup(self._get().bits, item_id)
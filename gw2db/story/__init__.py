@@ -23,5 +23,11 @@ Here is the list of accessible endpoints from this package:
     - v2/stories/seasons
 """
 
-from .story import Gw2Story, Gw2Season
-from .backstory import Gw2BackstoryQuestion, Gw2BackstoryAnswer
+from gw2db import registry
+
+if registry.LAZY:
+    # families are imported when their classes are used, see ``gw2db.registry``
+    __getattr__ = registry.lazy_getattr(__name__)
+else:
+    from .story import Gw2Story, Gw2Season
+    from .backstory import Gw2BackstoryQuestion, Gw2BackstoryAnswer
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Cache of the access tokens permissions
+
+The permissions of each access token are stored as a ``TOKEN_<key>`` parameter, with the time they were checked.
+While they're fresh, the accounts refreshes (see ``Gw2Db.refresh_accounts``) give them to the ``Gw2Token`` endpoint
+instead of downloading ``tokeninfo``, so the accounts endpoints start at once. The access tokens refused by the WebAPI
+are stored too, without permissions: they're skipped until their entry expires.
+
+Being parameters, the entries are kept by the db upgrades.
+"""
+
+# std imports
+import ast
+import json
+import time
+
+# package imports
+from gw2db.common import Param
+
+# name prefix of the cache parameters
+PREFIX = 'TOKEN_'
+
+# default time an entry is fresh (seconds)
+TTL = 3600.
+
+
+def read(params, keys, ttl=TTL, now=None):
+    """Give the fresh entries of access tokens
+
+    :param params: the stored parameters, as dictionnary (k=name, v=value)
+    :param keys: the access tokens
+    :param ttl: the time an entry is fresh (seconds)
+    :param now: the current time, ``time.time()`` if None
+    :return: a dictionnary - key=access token, value=list of permissions, None for refused tokens
+    """
+    now = now if now is not None else time.time()
+    found = dict()
+    for key in keys:
+        value = params.get(PREFIX + key)
+        if value is None:
+            continue
+        entry = json.loads(value)
+        if now - entry['checked'] < ttl:
+            found[key] = entry['permissions']
+    return found
+
+
+def payload(permissions):
+    """Make the ``tokeninfo`` answer of cached permissions - the ``Gw2Token`` rows mapped from it are the same
+
+    :param permissions: a list of permissions
+    :return: the answer bytes
+    """
+    return json.dumps(dict(permissions=permissions)).encode('utf-8')
+
+
+def permissions(datas):
+    """Give the permissions of the access tokens mapped by the ``Gw2Token`` endpoint
+
+    :param datas: a dictionnary of mapped objects - key=table class, value=list of objects
+    :return: a dictionnary - key=access token, value=list of permissions
+    """
+    rows = [v for k, v in datas.items() if k.__name__ == 'Gw2Token']
+    # the lists are mapped as their repr, without brackets
+    return {x['api_key']: ast.literal_eval('[%s]' % x['permissions']) for x in (rows[0] if len(rows) > 0 else [])}
+
+
+def store(session, entries, now=None):
+    """Store entries into the cache - not committed
+
+    :param session: the session to store the entries with
+    :param entries: a dictionnary - key=access token, value=list of permissions, None for refused tokens
+    :param now: the checking time, ``time.time()`` if None
+    """
+    now = now if now is not None else time.time()
+    for key, perms in entries.items():
+        value = json.dumps(dict(checked=now, permissions=perms))
+        param = session.query(Param).filter(Param.name == PREFIX + key).first()
+        if param is None:
+            session.add(Param(name=PREFIX + key, value=value))
+        else:
+            param.value = value
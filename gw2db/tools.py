@@ -19,6 +19,9 @@ Provides some generic tools for this package
 
 """
 
+# std imports
+from threading import BoundedSemaphore
+
 
 class CbEvent:
     """Callback event handler
@@ -68,3 +71,66 @@ class CbEvent:
     __isub__ = unhandle
     __call__ = fire
     __len__ = get_handler_count
+
+
+class BoundedHttp:
+    """HTTP client bounding the number of concurrent requests, shared by several downloads
+
+    Example:
+        >>> http = BoundedHttp(requests, 8)
+        >>> ans = http.get(url, params=args, timeout=10)  # waits while 8 requests are running
+    """
+
+    def __init__(self, http, limit):
+        """Wrap an HTTP client
+
+        :param http: the wrapped client, any object with a ``requests``-like ``get`` function
+        :param limit: maximum number of concurrent requests
+        """
+        self._http = http
+        self._slots = BoundedSemaphore(limit)
+
+    def get(self, *args, **kwargs):
+        """Send a GET request once less than ``limit`` requests are running, see ``requests.get``
+
+        A streamed answer (``stream=True``) is still running while its content is read: it keeps its slot until it's
+        closed.
+        """
+        self._slots.acquire()
+        try:
+            ans = self._http.get(*args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        if not kwargs.get('stream', False):
+            self._slots.release()
+            return ans
+        return _BoundedResponse(ans, self._slots)
+
+
+class _BoundedResponse:
+    """Streamed answer of a ``BoundedHttp``, releasing its slot once closed - the other attributes are the wrapped
+    answer ones
+    """
+
+    def __init__(self, ans, slots):
+        self._ans = ans
+        self._slots = slots
+
+    def __getattr__(self, name):
+        return getattr(self._ans, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the answer and release its slot"""
+        try:
+            self._ans.close()
+        finally:
+            slots, self._slots = self._slots, None
+            if slots is not None:
+                slots.release()
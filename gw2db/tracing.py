@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of pyGw2Tools.
+#
+# pyGw2Tools is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# pyGw2Tools is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with gw2db.
+# If not, see <http://www.gnu.org/licenses/>.
+
+"""Upgrade tracing
+
+This module provides optional tracing spans around the upgrade stages (download, decode, mapping, insertion).
+Spans are sent to a pluggable exporter:
+    - ``NullExporter``: the default one, does nothing
+    - ``ChromeTraceExporter``: writes a Chrome trace-event JSON file, readable with chrome://tracing or Perfetto
+    - ``CallbackExporter``: calls a function for each ended span
+
+Example:
+    >>> db = Gw2Db()
+    >>> db.tracer = Tracer(ChromeTraceExporter('upgrade.json'))
+    >>> db.upgrade()
+"""
+
+# std imports
+import json
+import os
+import time
+
+# threading imports
+from threading import Lock, current_thread, get_ident
+
+
+class Span:
+    """A timed upgrade stage
+
+    Attributes:
+        Span.name: stage name (``size``, ``download``, ``decode``, table name for mapping, ...)
+        Span.cat: stage category (``net``, ``decode``, ``map``, ``db``)
+        Span.endpoint: name of the endpoint table class which runs the stage
+        Span.thread_id: identifier of the thread which runs the stage
+        Span.thread_name: name of the thread which runs the stage
+        Span.start: start timestamp (seconds)
+        Span.end: end timestamp (seconds), None while running
+        Span.args: other informations about the stage
+    """
+    __slots__ = ('name', 'cat', 'endpoint', 'thread_id', 'thread_name', 'start', 'end', 'args', '_tracer')
+
+    def __init__(self, tracer, name, cat, endpoint, args):
+        self._tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.endpoint = endpoint
+        self.args = args
+        self.thread_id = get_ident()
+        self.thread_name = current_thread().name
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        """Span duration (seconds)"""
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end = time.time()
+        if exc_type is not None:
+            self.args['error'] = str(exc_val)
+        self._tracer.exporter.export(self)
+
+
+class _NullSpan:
+    """Span returned by a disabled tracer, does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class NullExporter:
+    """Exporter which drops all spans"""
+
+    def export(self, span):
+        """Handle an ended span
+
+        :param span: the ended ``Span``
+        """
+        pass
+
+    def flush(self):
+        """Write pending spans, if any"""
+        pass
+
+
+class CallbackExporter(NullExporter):
+    """Exporter which calls a function for each ended span"""
+
+    def __init__(self, callback):
+        """Initialize the exporter
+
+        :param callback: function called with the ended ``Span`` as only parameter. It's called from the thread
+                         which ran the stage
+        """
+        self._callback = callback
+
+    def export(self, span):
+        self._callback(span)
+
+
+class ChromeTraceExporter(NullExporter):
+    """Exporter which writes spans in the Chrome trace-event JSON format
+
+    Spans are kept in memory and written by ``flush``. Each span is a complete event ("ph": "X"), the endpoint
+    being its category prefix and one of its arguments, and each thread gets a name metadata event.
+    """
+
+    def __init__(self, path):
+        """Initialize the exporter
+
+        :param path: the JSON file to write
+        """
+        self._path = path
+        self._lock = Lock()
+        self._events = list()
+        self._threads = dict()
+
+    def export(self, span):
+        event = dict(name=span.name, cat=span.cat, ph='X', pid=os.getpid(), tid=span.thread_id,
+                     ts=span.start * 1e6, dur=(span.end - span.start) * 1e6,
+                     args=dict(endpoint=span.endpoint, **span.args))
+        with self._lock:
+            self._events.append(event)
+            self._threads[span.thread_id] = span.thread_name
+
+    def flush(self):
+        with self._lock:
+            meta = [dict(name='thread_name', ph='M', pid=os.getpid(), tid=k, args=dict(name=v))
+                    for k, v in self._threads.items()]
+            with open(self._path, 'w') as f:
+                json.dump(dict(traceEvents=meta + self._events, displayTimeUnit='ms'), f)
+
+
+class Tracer:
+    """Spans factory
+
+    A tracer without exporter is disabled: its spans are a shared no-op object, so the upgrade pays nothing for it.
+    """
+
+    def __init__(self, exporter=None):
+        """Initialize the tracer
+
+        :param exporter: the spans exporter - if None, the tracer is disabled
+        """
+        self.exporter = exporter if exporter is not None else NullExporter()
+        self.enabled = exporter is not None
+
+    def span(self, name, cat='', endpoint='', **args):
+        """Create a span, to be used as a context manager
+
+        :param name: stage name
+        :param cat: stage category
+        :param endpoint: name of the endpoint table class which runs the stage
+        :param args: other informations about the stage
+        :return: a ``Span``, or a no-op object if the tracer is disabled
+        """
+        if not self.enabled:
+            return _null_span
+        return Span(self, name, cat, endpoint, args)
+
+    def flush(self):
+        """Ask the exporter to write pending spans"""
+        self.exporter.flush()
@@ -0,0 +1,38 @@
+"""Shared helpers of the tests
+
+The tests replay WebAPI corpora through ``benchmarks.corpus`` / ``benchmarks.synth``: run them from a source checkout
+(or an sdist, see ``MANIFEST.in``), the installed ``gw2db`` package doesn't ship ``benchmarks``.
+"""
+
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+from gw2db import Gw2Db
+
+
+class DbTestCase(TestCase):
+    """Test case running in a temporary directory, its dbs being closed and removed at the end"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        for path in [x for x in Gw2Db._instances if x.startswith(self.tmp + os.sep)]:
+            Gw2Db._instances.pop(path)._close_db()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def translate(value, lang):
+    """Give a copy of JSON datas, with their names / descriptions prefixed by the language"""
+    if type(value) is list:
+        return [translate(x, lang) for x in value]
+    if type(value) is not dict:
+        return value
+    return {k: '%s %s' % (lang.upper(), v) if k in ('name', 'description') and type(v) is str else translate(v, lang)
+            for k, v in value.items()}
@@ -0,0 +1,387 @@
+from unittest.mock import Mock, patch
+
+from collections import deque
+import copy
+import threading
+import time
+
+from sqlalchemy import func
+
+from gw2db import Gw2Db, Gw2Item, Gw2Character, Gw2Guild, Gw2Token
+from gw2db.auths.accounts import _Gw2AccountBank, _Gw2AccountBankInfusion, _Gw2AccountBankUpgrade, \
+    _Gw2AccountHolding
+from gw2db.auths.characters import _Gw2CharacterEquipment, _Gw2CharacterEquipmentStat, \
+    _Gw2CharacterEquipmentUpgrade
+from gw2db.common import Base, Gw2Endpoint, Param, _SharedRequests
+from gw2db.tokens import read
+from gw2db.tools import BoundedHttp
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestAccounts(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.corpus = Synthesizer(scale=0.002, keys=2).make()
+        self.db = Gw2Db(lang='en')
+        self.db.http = CorpusHttp(self.corpus)
+        self.db.session.add_all([Param(name='KEY_%s' % k, value=k) for k in self.corpus.keys])
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+
+    def counts(self):
+        # the parameters cache the access tokens permissions, see gw2db.tokens
+        return {x.name: self.db.session.query(func.count()).select_from(x).scalar()
+                for x in Base.metadata.sorted_tables if x is not Param.__table__}
+
+    def test_refresh(self):
+        counts = self.counts()
+        version = self.db.session.query(Param.value).filter(Param.name == 'build').scalar()
+        items = self.db.session.query(Gw2Item.id).all()
+
+        # the same datas again: same rows, the static tables untouched
+        stored = self.db.refresh_accounts()
+        self.assertTrue(stored > 0)
+        self.assertEquals(self.counts(), counts)
+        self.assertEquals(self.db.session.query(Gw2Item.id).all(), items)
+        self.assertEquals(self.db.session.query(Param.value).filter(Param.name == 'build').scalar(), version)
+        self.assertEquals(sum(sum(m.inserted.values()) for m in self.db.last_metrics.walk()), stored)
+        self.assertEquals(list(self.db.last_metrics.endpoints), ['Gw2Token'])
+
+    def test_refresh_key(self):
+        key, other = self.corpus.keys
+        names = self.db.session.query(Gw2Character.name).filter(Gw2Character.api_key == other).all()
+        bank = self.db.session.query(_Gw2AccountBank.pkid).filter(_Gw2AccountBank.api_key == other).all()
+        counts = self.counts()
+
+        # the other account is not downloaded again
+        self.db.http.corpus.payloads.pop('tokeninfo?access_token=%s' % other)
+        self.assertTrue(self.db.refresh_accounts([key]) > 0)
+        self.assertEquals(self.counts(), counts)
+        self.assertEquals(self.db.session.query(Gw2Character.name).filter(Gw2Character.api_key == other).all(), names)
+        self.assertEquals(self.db.session.query(_Gw2AccountBank.pkid).filter(_Gw2AccountBank.api_key == other).all(),
+                          bank)
+
+        # a removed bank is removed from the owned items
+        self.db.http.corpus.payloads['account/bank?access_token=%s' % key] = list()
+        self.assertTrue(self.db.refresh_accounts([key]) > 0)
+        self.assertEquals(self.db.session.query(_Gw2AccountBank).filter(_Gw2AccountBank.api_key == key).count(), 0)
+        self.assertEquals(self.db.session.query(_Gw2AccountHolding).filter(
+            _Gw2AccountHolding.api_key == key, _Gw2AccountHolding.bank > 0).count(), 0)
+
+    def test_refresh_error(self):
+        counts = self.counts()
+        self.db.http.errors['tokeninfo?access_token=%s' % self.corpus.keys[1]] = 401
+        self.assertEquals(self.db.refresh_accounts(), -1)
+        self.assertEquals(self.counts(), counts)
+        self.assertEquals(self.db.refresh_accounts([]), 0)
+
+        # the refused access token is skipped now
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertEquals(self.counts(), counts)
+
+    def test_token_cache(self):
+        key, other = self.corpus.keys
+        http = self.db.http
+        requests = http.requests
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        sent = http.requests - requests
+
+        # tokeninfo is not downloaded while the permissions are cached
+        tokens = self.db.session.query(Gw2Token.api_key, Gw2Token.permissions).order_by(Gw2Token.api_key).all()
+        http.corpus.payloads.pop('tokeninfo?access_token=%s' % key)
+        requests = http.requests
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertEquals(http.requests - requests, sent - 2)
+        self.assertEquals(self.db.session.query(Gw2Token.api_key, Gw2Token.permissions).order_by(
+            Gw2Token.api_key).all(), tokens)
+        self.assertTrue(all(x > 0 for x in self.db.ingest_accounts().values()))
+
+        # expired permissions are downloaded again, and the refused token is cached too
+        self.db.token_ttl = 0
+        http.errors['tokeninfo?access_token=%s' % key] = 401
+        self.assertEquals(self.db.refresh_accounts(), -1)
+        self.db.token_ttl = 3600
+        params = {x.name: x.value for x in self.db.session.query(Param).all()}
+        self.assertEquals(read(params, [key]), {key: None})
+        self.assertEquals(read(params, [other])[other], self.corpus.get('tokeninfo', access_token=other)['permissions'])
+        self.assertEquals(read(params, [key], ttl=0), dict())
+
+        characters = self.db.session.query(Gw2Character).filter(Gw2Character.api_key == key).count()
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertEquals(self.db.session.query(Gw2Character).filter(Gw2Character.api_key == key).count(), characters)
+        self.assertEquals(self.db.ingest_accounts()[key], -1)
+
+    def test_token_errors(self):
+        key, other = self.corpus.keys
+        self.db.token_ttl = 0
+
+        # temporary errors are not refusals
+        for status in (429, 500, 503, 404):
+            self.db.http.errors['tokeninfo?access_token=%s' % key] = status
+            self.assertEquals(self.db.refresh_accounts(), -1)
+            self.assertEquals(self.db.ingest_accounts()[key], -1)
+            params = {x.name: x.value for x in self.db.session.query(Param).all()}
+            self.assertEquals(read(params, [key], ttl=3600), dict())
+
+        # the refused token is skipped until its entry expires
+        self.db.token_ttl = 3600
+        self.db.http.errors['tokeninfo?access_token=%s' % key] = 403
+        self.assertEquals(self.db.ingest_accounts()[key], -1)
+        del self.db.http.errors['tokeninfo?access_token=%s' % key]
+        self.assertEquals(self.db.ingest_accounts()[key], -1)
+        self.db.token_ttl = 0
+        self.assertTrue(self.db.ingest_accounts()[key] > 0)
+
+        # revoked while its permissions are cached: refused by a subendpoint
+        self.db.token_ttl = 3600
+        for refresh in (lambda: self.db.ingest_accounts()[key], self.db.refresh_accounts):
+            self.db.http.errors.pop('account?access_token=%s' % key, None)
+            self.db.session.query(Param).filter(Param.name == 'TOKEN_%s' % key).delete()
+            self.db.session.commit()
+            self.assertTrue(self.db.ingest_accounts([key])[key] > 0)
+            self.db.http.errors['account?access_token=%s' % key] = 401
+            self.assertEquals(refresh(), -1)
+            params = {x.name: x.value for x in self.db.session.query(Param).all()}
+            self.assertEquals(read(params, [key]), {key: None})
+
+    def test_bank_upgrades(self):
+        key = self.corpus.keys[0]
+        slots = [x for x in self.db.http.corpus.payloads['account/bank?access_token=%s' % key] if x is not None]
+        s = self.db.session
+
+        # the infusions and upgrades of each slot, in their own table, referring to the slot row
+        for table, attr, name in ((_Gw2AccountBankInfusion, 'infusion_id', 'infusions'),
+                                  (_Gw2AccountBankUpgrade, 'upgrade_id', 'upgrades')):
+            expected = sorted((x['id'], i) for x in slots for i in x.get(name, []))
+            self.assertTrue(len(expected) > 0)
+            rows = s.query(_Gw2AccountBank.id, getattr(table, attr)).join(table, table.id == _Gw2AccountBank.pkid) \
+                .filter(_Gw2AccountBank.api_key == key).all()
+            self.assertEquals(sorted(rows), expected)
+            self.assertEquals(s.execute('PRAGMA foreign_key_check(%s)' % table.__tablename__).fetchall(), [])
+
+    def test_equipment_upgrades(self):
+        key = self.corpus.keys[0]
+        characters = self.db.http.corpus.payloads['characters?access_token=%s' % key]
+        equipment = [(c['name'], x) for c in characters for x in c['equipment']]
+        eqp = _Gw2CharacterEquipment
+        s = self.db.session
+
+        # the upgrades and stats of each piece, referring to its row
+        expected = sorted((n, x['id'], i) for n, x in equipment for i in x.get('upgrades', []))
+        self.assertTrue(len(expected) > 0)
+        rows = s.query(eqp.char_id, eqp.id, _Gw2CharacterEquipmentUpgrade.upgrade_id).join(
+            _Gw2CharacterEquipmentUpgrade, _Gw2CharacterEquipmentUpgrade.eqp_id == eqp.pkid).filter(
+            eqp.char_id.in_([c['name'] for c in characters])).all()
+        self.assertEquals(sorted(rows), expected)
+
+        expected = sorted((n, x['id'], x['stats']['id'], x['stats']['attributes']['Power']) for n, x in equipment
+                          if 'stats' in x)
+        self.assertTrue(len(expected) > 0)
+        rows = s.query(eqp.char_id, eqp.id, _Gw2CharacterEquipmentStat.id, _Gw2CharacterEquipmentStat.power).join(
+            _Gw2CharacterEquipmentStat, _Gw2CharacterEquipmentStat.eqp_id == eqp.pkid).filter(
+            eqp.char_id.in_([c['name'] for c in characters])).all()
+        self.assertEquals(sorted(rows), expected)
+
+        for table in (_Gw2CharacterEquipmentUpgrade, _Gw2CharacterEquipmentStat):
+            self.assertEquals(s.execute('PRAGMA foreign_key_check(%s)' % table.__tablename__).fetchall(), [])
+
+    def test_decode_time(self):
+        set_params = Gw2Endpoint.set_params
+
+        def slow(ep, key='', _pjson=None, payload=None):
+            if len(key) > 0:
+                time.sleep(0.05)
+            return set_params(ep, key, _pjson, payload)
+
+        # the subendpoints params are not decoding time
+        with patch.object(Gw2Endpoint, 'set_params', slow):
+            self.assertTrue(self.db.refresh_accounts() > 0)
+        pages = self.db.last_metrics.endpoints['Gw2Token'].pages
+        self.assertEquals(len(pages), 2)
+        self.assertTrue(all(x.decode_time < 0.05 for x in pages))
+
+    def test_shared_guild(self):
+        key, other = self.corpus.keys
+        payloads = self.db.http.corpus.payloads
+        guild = payloads['account?access_token=%s' % key]['guild_leader'][0]
+        payloads['account?access_token=%s' % other]['guilds'].append(guild)
+        self.assertNotIn('guild/%s?access_token=%s' % (guild, other), payloads)
+
+        # the guild is downloaded once, with the leader access token
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        metrics = [x for x in self.db.last_metrics.walk() if x.table_name == 'Gw2Guild'][0]
+        self.assertEquals(metrics.shared, 1)
+        rows = self.db.session.query(Gw2Guild).filter(Gw2Guild.id == guild).all()
+        self.assertEquals(sorted(x.api_key for x in rows), sorted([key, other]))
+        self.assertEquals(len(set((x.name, x.tag, x.motd) for x in rows)), 1)
+        self.assertEquals(len(set(x.pkid for x in rows)), 2)
+
+    def test_ingest_shared(self):
+        key, other = self.corpus.keys
+        payloads = self.db.http.corpus.payloads
+        guild = payloads['account?access_token=%s' % key]['guild_leader'][0]
+        payloads['account?access_token=%s' % other]['guilds'].append(guild)
+        # a member sees less than a leader
+        member = copy.deepcopy(payloads['guild/%s?access_token=%s' % (guild, key)])
+        member['name'] = 'member view'
+        payloads['guild/%s?access_token=%s' % (guild, other)] = member
+        http = self.db.http
+        sent = list()
+
+        class Http:
+            def get(self, url, params=None, **kwargs):
+                if url.endswith('guild/%s' % guild):
+                    sent.append(params['access_token'])
+                return http.get(url, params=params, **kwargs)
+
+        # the trees of the keys share the guild request - with the leader access token, unless the other tree gets
+        # all its parameters first: the leader gets its own answer then
+        self.db.http = Http()
+        for workers in (1, 2):
+            del sent[:]
+            results = self.db.ingest_accounts(workers=workers)
+            self.assertTrue(all(x > 0 for x in results.values()))
+            self.assertTrue(sent in ([key], [other, key]), sent)
+            if workers == 1:
+                self.assertEquals(sent, [key])
+            rows = dict(self.db.session.query(Gw2Guild.api_key, Gw2Guild.name).filter(Gw2Guild.id == guild).all())
+            self.assertEquals(sorted(rows), sorted([key, other]))
+            self.assertNotEqual(rows[key], 'member view')
+
+        # the leader fails: the other key sends it
+        del sent[:]
+        http.errors['guild/%s?access_token=%s' % (guild, key)] = 500
+        results = self.db.ingest_accounts(workers=1)
+        self.assertEquals(results[key], -1)
+        self.assertTrue(results[other] > 0)
+        self.assertEquals(sent, [key, other])
+        self.assertEquals(self.db.session.query(Gw2Guild).filter(Gw2Guild.api_key == other,
+                                                                  Gw2Guild.id == guild).count(), 1)
+
+    def test_shared_ranks(self):
+        class Ep:
+            def __init__(self):
+                self._err = threading.Event()
+                self._pqueue = deque()
+                self.metrics = Mock()
+
+        shared = _SharedRequests()
+        leader, member, late = Ep(), Ep(), Ep()
+
+        # a member request is sent first, a leader asks meanwhile: it gets its own answer
+        shared.add('guild', 1, member, ('member', None, None))
+        shared.flush(member)
+        request = member._pqueue.pop()
+        self.assertEquals(request[0], 'member')
+        shared.add('guild', 0, leader, ('leader', None, None))
+        self.assertEquals(len(leader._pqueue), 0)
+        self.assertEquals(shared.waiting(leader), 1)
+        shared.answer(request[3], member, b'member')
+        request = leader._pqueue.pop()
+        self.assertEquals(request[4], None)
+        self.assertEquals(shared.waiting(leader), 0)
+        shared.answer(request[3], leader, b'leader')
+
+        # the leader answer is given to the next ones, whatever their rank
+        shared.add('guild', 0, late, ('late', None, None))
+        shared.add('guild', 1, late, ('late', None, None))
+        self.assertEquals([x[4] for x in late._pqueue], [b'leader', b'leader'])
+
+        # a member answer is only given to members
+        shared.add('other', 1, member, ('member', None, None))
+        shared.flush(member)
+        request = member._pqueue.pop()
+        shared.answer(request[3], member, b'member')
+        shared.add('other', 1, late, ('late', None, None))
+        self.assertEquals(late._pqueue.pop()[4], b'member')
+        shared.add('other', 0, leader, ('leader', None, None))
+        self.assertEquals(leader._pqueue.pop()[4], None)
+
+        # the end of a manager waits for its requests to be queued, or its failure
+        for name, end in (('flushed', lambda: shared.flush(member)),
+                          ('failed', lambda: (member._err.set(), shared.abandon(member)))):
+            shared.add(name, 1, member, ('member', None, None))
+            done = list()
+            thread = threading.Thread(target=lambda: done.append(shared.wait(member)))
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+            end()
+            thread.join(5)
+            self.assertEquals(done, [True])
+        self.assertFalse(shared.wait(leader))
+
+    def test_ingest(self):
+        key, other = self.corpus.keys
+        counts = self.counts()
+        # the same datas again, each key on its own: same rows
+        results = self.db.ingest_accounts(workers=2, max_requests=3)
+        self.assertEquals(sorted(results), sorted([key, other]))
+        self.assertTrue(all(x > 0 for x in results.values()))
+        # the metrics of each tree
+        self.assertEquals(sorted(self.db.last_metrics.endpoints), sorted(['Gw2Token %s' % x for x in results]))
+        self.assertEquals(sum(sum(m.inserted.values()) for m in self.db.last_metrics.walk()), sum(results.values()))
+        self.assertEquals(self.counts(), counts)
+        self.assertEquals(self.db.ingest_accounts([key], workers=1), {key: results[key]})
+        self.assertEquals(self.counts(), counts)
+
+        # a revoked key keeps its rows, the other one is stored anyway - the permissions are checked again
+        self.db.token_ttl = 0
+        bank = self.db.session.query(_Gw2AccountBank.pkid).filter(_Gw2AccountBank.api_key == other).all()
+        self.db.http.corpus.payloads.pop('tokeninfo?access_token=%s' % other)
+        self.db.http.corpus.payloads['account/bank?access_token=%s' % key] = list()
+        results = self.db.ingest_accounts()
+        self.assertTrue(results[key] > 0)
+        self.assertEquals(results[other], -1)
+        self.assertEquals(self.db.session.query(_Gw2AccountBank).filter(_Gw2AccountBank.api_key == key).count(), 0)
+        self.assertEquals(self.db.session.query(_Gw2AccountBank.pkid).filter(_Gw2AccountBank.api_key == other).all(),
+                          bank)
+        self.assertEquals(self.db.ingest_accounts([]), dict())
+
+    def test_bounded_http(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        class Http:
+            def get(self, *args, **kwargs):
+                with lock:
+                    running[0] += 1
+                    running[1] = max(running)
+                time.sleep(0.01)
+                with lock:
+                    running[0] -= 1
+                return args[0]
+
+        http = BoundedHttp(Http(), 2)
+        threads = [threading.Thread(target=http.get, args=(x,)) for x in range(0, 8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEquals(running, [0, 2])
+        self.assertEquals(http.get('url'), 'url')
+
+        # a streamed answer keeps its slot until it's closed
+        class Answer:
+            closed = 0
+
+            def close(self):
+                Answer.closed += 1
+
+        http = BoundedHttp(type('Http', (), dict(get=lambda *args, **kwargs: Answer()))(), 1)
+        ans = http.get('url', stream=True)
+        waiting = threading.Thread(target=http.get, args=('url',))
+        waiting.start()
+        waiting.join(0.05)
+        self.assertTrue(waiting.is_alive())
+        ans.close()
+        ans.close()
+        waiting.join()
+        self.assertEquals(Answer.closed, 2)
+        self.assertIsInstance(http.get('url'), Answer)
@@ -0,0 +1,132 @@
+from gw2db import Gw2Db, Gw2Item, Gw2Recipe
+from gw2db.crafting import INF, CraftingGraph, read_prices
+from gw2db.items.recipes import _Gw2RecipeIngredient, _Gw2RecipeGUIngredient
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+def add_recipes(session, recipes):
+    """Store recipes - (recipe id, output item id, output count, [(ingredient item id, count)...])"""
+    for rid, item_id, output, ingredients in recipes:
+        session.add(Gw2Recipe(id=rid, type='Refinement', output_item_id=item_id, output_item_count=output,
+                              time_to_craft_ms=1000, min_rating=0, chat_link='[&CQEAAAA=]'))
+        session.add_all([_Gw2RecipeIngredient(recipe_id=rid, item_id=x, count=k) for x, k in ingredients])
+    session.commit()
+
+
+class TestCrafting(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db(lang='en')
+
+    def test_bill(self):
+        add_recipes(self.db.session, [
+            (10, 1, 1, [(2, 2), (3, 1)]),
+            (11, 2, 5, [(4, 3)]),
+            (12, 3, 1, [(2, 4), (5, 1)]),
+            (20, 3, 1, [(5, 100)]),
+        ])
+        self.db.session.add(_Gw2RecipeGUIngredient(recipe_id=10, upgrade_id=500, count=1))
+        self.db.session.commit()
+
+        graph = CraftingGraph(self.db)
+        self.assertFalse(graph.built)
+        self.assertEquals(graph.recipe_of(3), 12)
+        self.assertTrue(graph.built)
+        self.assertIsNone(graph.recipe_of(4))
+        self.assertIsNone(graph.recipe_of(999))
+
+        # the needs of all the users are summed, then rounded up to the output count
+        upgrades = dict()
+        self.assertEquals(graph.bill(1, upgrades=upgrades), {4: 6, 5: 1})
+        self.assertEquals(upgrades, {500: 1})
+        self.assertEquals(graph.bill(1, 3), {4: 12, 5: 3})
+        self.assertEquals(graph.bill(2, 5), {4: 3})
+        self.assertEquals(graph.bill(2, 6), {4: 6})
+        self.assertEquals(graph.bill(4, 7), {4: 7})
+        self.assertEquals(graph.bill(999, 2), {999: 2})
+        self.assertEquals(sorted(graph._get().ids[x] for x in graph._get().subtrees), [1, 2, 4])
+
+    def test_cycle(self):
+        add_recipes(self.db.session, [
+            (13, 6, 1, [(7, 1)]),
+            (14, 7, 1, [(6, 2)]),
+            (15, 8, 1, [(6, 1), (9, 1)]),
+        ])
+        graph = CraftingGraph(self.db)
+        self.assertIn(graph.bill(6), ({6: 2}, {7: 1}))
+        self.assertIn(graph.bill(8), ({6: 2, 9: 1}, {7: 1, 9: 1}, {6: 1, 9: 1}))
+
+        # the ingredient closing the cycle is bought
+        costs = graph.costs({7: 5.})
+        self.assertEquals(costs.cost(6), 5.)
+        self.assertEquals(costs.cost(7), 5.)
+        self.assertEquals(costs.cost(8), INF)
+        self.assertEquals(graph.costs({7: 5., 9: 1.}).cost(8), 6.)
+
+    def test_costs(self):
+        add_recipes(self.db.session, [
+            (10, 1, 1, [(2, 2), (3, 1)]),
+            (11, 2, 5, [(4, 3)]),
+            (12, 3, 1, [(2, 4), (5, 1)]),
+        ])
+        graph = CraftingGraph(self.db)
+
+        costs = graph.costs({2: 1., 3: 100., 4: 1., 5: 10.})
+        self.assertAlmostEqual(costs.cost(2), .6)
+        self.assertAlmostEqual(costs.cost(3), 12.4)
+        self.assertAlmostEqual(costs.cost(1, 2), 27.2)
+        self.assertTrue(costs.is_crafted(1))
+        self.assertTrue(costs.is_crafted(2))
+        self.assertFalse(costs.is_crafted(4))
+        self.assertEquals(costs.cost(4), 1.)
+        self.assertEquals(costs.cost(999), INF)
+        self.assertEquals(sorted(costs.items()), [1, 2, 3, 4, 5])
+        self.assertEquals(graph.bill(1, costs=costs), {4: 6, 5: 1})
+
+        # the items cheaper to buy are not expanded
+        costs = graph.costs({2: .5, 3: 100., 4: 1., 5: 10.})
+        self.assertFalse(costs.is_crafted(2))
+        self.assertAlmostEqual(costs.cost(1), 13.)
+        self.assertEquals(graph.bill(1, costs=costs), {2: 6, 5: 1})
+        self.assertEquals(graph.bill(2, 5, costs=costs), {4: 3})
+
+        # an ingredient without price makes the recipe uncraftable
+        costs = graph.costs({2: .5, 3: 100., 4: 1.})
+        self.assertEquals(costs.cost(3), 100.)
+        self.assertFalse(costs.is_crafted(3))
+        self.assertEquals(graph.costs({4: 1.}).cost(1), INF)
+
+        graph.invalidate()
+        self.assertRaises(ValueError, graph.bill, 1, costs=costs)
+
+    def test_read_prices(self):
+        with open('prices.csv', 'w') as f:
+            f.write('item_id,name,price\n19721,Glob of Ectoplasm,2500\n19976,Mystic Coin,\n24295,Vial,12.5\n')
+        self.assertEquals(read_prices('prices.csv'), {19721: 2500., 24295: 12.5})
+        self.assertEquals(read_prices('prices.csv', id_column='item_id', price_column='item_id'),
+                          {19721: 19721., 19976: 19976., 24295: 24295.})
+
+    def test_invalidate(self):
+        self.db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        self.assertEquals(self.db.upgrade(True), 1)
+        graph = CraftingGraph(self.db)
+        recipes = self.db.session.query(Gw2Recipe).all()
+        self.assertTrue(len(recipes) > 0)
+        for r in recipes:
+            self.assertEquals(graph.recipe_of(r.output_item_id) is not None, True)
+            self.assertTrue(all(x > 0 for x in graph.bill(r.output_item_id, 10).values()))
+
+        prices = {x.id: float(x.id % 100) for x in self.db.session.query(Gw2Item)}
+        costs = graph.costs(prices)
+        for item_id, (unit, crafted) in costs.items().items():
+            self.assertTrue(unit <= prices.get(item_id, INF))
+            self.assertEquals(crafted, unit < prices.get(item_id, INF))
+
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertFalse(graph.built)
+        graph.close()
@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import os
+
+from gw2db import Gw2Db, Gw2Skin
+from gw2db.auths.accounts import _Gw2AccountChange, _Gw2AccountUnlockChange
+from gw2db.common import Param
+from gw2db.diffs import compare, snapshot
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestDiffs(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.corpus = Synthesizer(scale=0.002, keys=2).make()
+        self.db = Gw2Db(lang='en')
+        self.db.http = CorpusHttp(self.corpus)
+        self.db.session.add_all([Param(name='KEY_%s' % k, value=k) for k in self.corpus.keys])
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+
+        self.diffs = list()
+        self.db.account_changed += self.diffs.append
+
+    def history(self):
+        changes, unlocks = _Gw2AccountChange, _Gw2AccountUnlockChange
+        return (self.db.session.query(changes.api_key, changes.kind, changes.ref, changes.old, changes.new).order_by(
+                    changes.id).all(),
+                self.db.session.query(unlocks.api_key, unlocks.kind, unlocks.unlock_id).order_by(unlocks.id).all())
+
+    def test_refresh(self):
+        key, other = self.corpus.keys
+        payloads = self.db.http.corpus.payloads
+
+        # the same datas: no change
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertEquals(self.diffs, list())
+        self.assertEquals(self.history(), ([], []))
+
+        wallet = payloads['account/wallet?access_token=%s' % key]
+        old_value = wallet[0]['value']
+        wallet[0]['value'] += 25
+        materials = payloads['account/materials?access_token=%s' % key]
+        removed = materials.pop()
+        character = payloads['characters?access_token=%s' % key][0]
+        character['level'] += 1
+        skins = payloads['account/skins?access_token=%s' % key]
+        new_skin = [x[0] for x in self.db.session.query(Gw2Skin.id) if x[0] not in skins][:1]
+        self.assertEquals(len(new_skin), 1)
+        skins.extend(new_skin)
+
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertEquals(len(self.diffs), 1)
+        diff = self.diffs[0]
+        self.assertEquals(diff.api_key, key)
+        self.assertEquals(diff.wallet, {wallet[0]['id']: (old_value, old_value + 25)})
+        self.assertEquals(diff.materials, {removed['id']: (removed['count'], 0)})
+        self.assertEquals(diff.levels, {character['name']: (character['level'] - 1, character['level'])})
+        self.assertEquals(diff.unlocks, {'skins': new_skin})
+        self.assertFalse(diff.empty)
+
+        changes, unlocks = self.history()
+        self.assertEquals(changes, [
+            (key, 'wallet', str(wallet[0]['id']), old_value, old_value + 25),
+            (key, 'materials', str(removed['id']), removed['count'], 0),
+            (key, 'level', character['name'], character['level'] - 1, character['level']),
+        ])
+        self.assertEquals(unlocks, [(key, 'skins', x) for x in new_skin])
+
+        # the history is kept by the upgrades, and only appended
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertEquals(self.history(), (changes, unlocks))
+        self.assertTrue(all(x > 0 for x in self.db.ingest_accounts().values()))
+        self.assertEquals(self.history(), (changes, unlocks))
+
+    def test_compare(self):
+        key, other = self.corpus.keys
+        before = snapshot(self.db.session, [key, 'unknown'])
+        self.assertEquals(sorted(before), [key])
+
+        after = {key: dict(before[key], levels=dict(before[key]['levels'], New=2),
+                           unlocks=dict(before[key]['unlocks'], dyes=before[key]['unlocks']['dyes'] | {9999})),
+                 other: before[key]}
+        diffs = compare(before, after)
+        self.assertEquals(len(diffs), 1)
+        self.assertEquals((diffs[0].wallet, diffs[0].materials), (dict(), dict()))
+        self.assertEquals(diffs[0].levels, {'New': (None, 2)})
+        self.assertEquals(diffs[0].unlocks, {'dyes': [9999]})
+        self.assertTrue(compare(before, before)[0].empty)
+
+    def test_upgrade_modes(self):
+        for mode in ('sidecar', 'serving'):
+            db = Gw2Db(path='%s.db' % mode, lang='en', **{mode: True})
+            try:
+                db.http = self.db.http
+                db.session.add(Param(name='KEY_%s' % self.corpus.keys[0], value=self.corpus.keys[0]))
+                db.session.commit()
+                self.assertEquals(db.upgrade(True), 1)
+                self.db.http.corpus.payloads['account/wallet?access_token=%s' % self.corpus.keys[0]][0]['value'] += 1
+                self.assertTrue(db.refresh_accounts() > 0)
+                self.assertEquals(db.session.query(_Gw2AccountChange).count(), 1)
+                # the history is copied from the previous file, and left in place by an in-place upgrade
+                with patch.object(Gw2Db, '_copy_history', wraps=Gw2Db._copy_history) as copy:
+                    self.assertEquals(db.upgrade(True), 1)
+                    self.assertEquals(copy.call_count, 1 if mode == 'sidecar' else 0)
+                self.assertEquals(db.session.query(_Gw2AccountChange).count(), 1)
+            finally:
+                Gw2Db._instances.pop(os.path.abspath('%s.db' % mode))._close_db()
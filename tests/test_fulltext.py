@@ -0,0 +1,63 @@
+import copy
+import re
+
+from gw2db import Gw2Db, Gw2Item, Gw2Recipe, Gw2Skill
+from gw2db.fulltext import has_index, match_query
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase, translate
+
+
+class TestFulltext(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        corpus = Synthesizer(scale=0.002, keys=0).make()
+        for k, v in list(corpus.payloads.items()):
+            if k.endswith('lang=en'):
+                corpus.payloads[k[:-2] + 'fr'] = translate(copy.deepcopy(v), 'fr')
+        self.http = CorpusHttp(corpus)
+
+    def test_match_query(self):
+        self.assertEquals(match_query('Ascended swo'), '"Ascended" "swo"*')
+        self.assertEquals(match_query('  "xyz\' '), '"xyz"*')
+        self.assertEquals(match_query('as'), '{name} : "as"*')
+        self.assertIsNone(match_query(' - '))
+
+    def test_search(self):
+        db = Gw2Db(lang='en', locales=['fr'], fulltext=True)
+        db.http = self.http
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertTrue(has_index(db.session, 'en'))
+        self.assertTrue(has_index(db.session, 'fr'))
+
+        item = db.session.query(Gw2Item).filter(Gw2Item.name != None).first()
+        found = db.search(item.name, tables=[Gw2Item], limit=200)
+        self.assertIn(item, found)
+        self.assertTrue(all(isinstance(x, Gw2Item) for x in found))
+
+        # the last word is a prefix
+        word = re.findall(r'\w+', item.name)[0]
+        found = db.search(word[:3], limit=5)
+        self.assertTrue(0 < len(found) <= 5)
+
+        found = db.search(item.name, tables=[Gw2Skill])
+        self.assertTrue(all(isinstance(x, Gw2Skill) for x in found))
+
+        # the other languages are searched in their own index
+        self.assertIn(item, db.search('FR ' + item.name, tables=[Gw2Item], limit=200, lang='fr'))
+        self.assertEquals(db.search('FR', lang='en'), list())
+        self.assertEquals(db.search('FR', lang='de'), list())
+
+        with self.assertRaises(ValueError):
+            db.search(item.name, tables=[Gw2Recipe])
+
+    def test_no_index(self):
+        db = Gw2Db(lang='en')
+        db.http = self.http
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertFalse(has_index(db.session, 'en'))
+        self.assertEquals(db.search(db.session.query(Gw2Item).first().name), list())
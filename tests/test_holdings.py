@@ -0,0 +1,80 @@
+from gw2db import Gw2Db, Gw2Character
+from gw2db.auths.accounts import _Gw2AccountBank, _Gw2AccountHolding, _Gw2AccountInventory, _Gw2AccountVault
+from gw2db.auths.characters import _Gw2CharacterEquipment, _Gw2CharacterInventory
+from gw2db.common import Param
+from gw2db.holdings import LOCATIONS, refresh
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestHoldings(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        corpus = Synthesizer(scale=0.002, keys=2).make()
+        self.keys = corpus.keys
+        self.db = Gw2Db(lang='en')
+        self.db.http = CorpusHttp(corpus)
+        self.db.session.add_all([Param(name='KEY_%s' % k, value=k) for k in corpus.keys])
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+
+    def expected(self):
+        """Sum the locations tables - key=(api key, item id), value={location: count}"""
+        s = self.db.session
+        names = dict(s.query(Gw2Character.name, Gw2Character.api_key))
+        rows = [('bank', k, i, c) for k, i, c in s.query(_Gw2AccountBank.api_key, _Gw2AccountBank.id,
+                                                         _Gw2AccountBank.count)]
+        rows += [('materials', k, i, c) for k, i, c in s.query(_Gw2AccountVault.api_key, _Gw2AccountVault.id,
+                                                              _Gw2AccountVault.count)]
+        rows += [('shared', k, i, c) for k, i, c in s.query(_Gw2AccountInventory.api_key, _Gw2AccountInventory.id,
+                                                           _Gw2AccountInventory.count)]
+        rows += [('characters', names[n], i, c) for n, i, c in s.query(_Gw2CharacterInventory.char_id,
+                                                                       _Gw2CharacterInventory.id,
+                                                                       _Gw2CharacterInventory.count)]
+        rows += [('equipped', names[n], i, 1) for n, i in s.query(_Gw2CharacterEquipment.char_id,
+                                                                 _Gw2CharacterEquipment.id)]
+        found = dict()
+        for loc, key, item_id, count in rows:
+            locs = found.setdefault((key, item_id), dict())
+            locs[loc] = locs.get(loc, 0) + count
+        return found
+
+    def test_holdings(self):
+        expected = self.expected()
+        self.assertTrue(len(expected) > 0)
+        stored = self.db.session.query(_Gw2AccountHolding).all()
+        self.assertEquals(len(stored), len(expected))
+        for h in stored:
+            locs = expected[(h.api_key, h.item_id)]
+            self.assertEquals([getattr(h, x) for x in LOCATIONS], [locs.get(x, 0) for x in LOCATIONS])
+            self.assertEquals(h.count, sum(locs.values()))
+            self.assertEquals(self.db.owned(h.api_key, h.item_id), h.count)
+        self.assertEquals(self.db.owned(self.keys[0], -1), 0)
+
+        key = self.keys[0]
+        found = self.db.holdings(key)
+        self.assertEquals([x[0].item_id for x in found], sorted(i for k, i in expected if k == key))
+        self.assertTrue(all(item is not None and item.id == h.item_id for h, item in found))
+        some = [x[0].item_id for x in found[:2]]
+        self.assertEquals([x[0].item_id for x in self.db.holdings(key, some + [-1])], some)
+        self.assertEquals(self.db.holdings('unknown'), list())
+
+    def test_refresh(self):
+        key = self.keys[0]
+        other = self.db.session.query(_Gw2AccountHolding).filter(_Gw2AccountHolding.api_key != key).count()
+        self.db.session.query(_Gw2AccountBank).filter(_Gw2AccountBank.api_key == key).delete()
+        self.db.session.query(_Gw2AccountVault).filter(_Gw2AccountVault.api_key == key).delete()
+
+        # only the given account is computed again
+        count = refresh(self.db.session, [key])
+        self.db.session.commit()
+        self.assertEquals(count, len([k for k, i in self.expected() if k == key]))
+        self.assertEquals(self.db.session.query(_Gw2AccountHolding).count(), count + other)
+        self.assertEquals(self.db.session.query(_Gw2AccountHolding).filter(
+            _Gw2AccountHolding.api_key == key, (_Gw2AccountHolding.bank + _Gw2AccountHolding.materials) > 0).count(),
+            0)
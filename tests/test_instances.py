@@ -0,0 +1,104 @@
+import os
+import threading
+
+from sqlalchemy.pool import NullPool
+
+from gw2db import Gw2Db, Gw2Item
+from gw2db.common import Base, Param
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestInstances(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.paths = {x: os.path.join(self.tmp, 'gw2_%s.db' % x) for x in ['en', 'fr', 'de', 'es']}
+        self.dbs = {x: Gw2Db(path=p, lang=x) for x, p in self.paths.items()}
+
+    def test_instances(self):
+        self.assertIs(Gw2Db(path=self.paths['en']), self.dbs['en'])
+        self.assertIsNot(self.dbs['en'], self.dbs['fr'])
+        self.assertIsNone(Base.metadata.bind)
+        for x, db in self.dbs.items():
+            self.assertTrue(os.path.isfile(self.paths[x]))
+            self.assertEquals(db.lang, x)
+
+        # datas and sessions are separated
+        self.dbs['en'].session.add(Param(name='KEY_test', value='test'))
+        self.dbs['en'].session.commit()
+        self.dbs['fr']._close_db()
+        self.assertEquals(self.dbs['en'].session.query(Param).count(), 2)
+        self.assertEquals(self.dbs['de'].session.query(Param).count(), 1)
+
+    def test_opened(self):
+        db = self.dbs['en']
+        engine, events = db._engine, []
+        db.running_status += events.append
+        self.assertIs(Gw2Db(path=self.paths['en'], lang='fr'), db)
+        self.assertIs(db._engine, engine)
+        self.assertEquals(len(db.running_status), 1)
+        self.assertEquals(db.lang, 'en')
+
+        # the path found in the positional arguments
+        self.assertIs(Gw2Db(False, 5, False, False, None, self.paths['fr']), self.dbs['fr'])
+
+    def test_concurrent_instances(self):
+        path = os.path.join(self.tmp, 'gw2_other.db')
+        found = list()
+        threads = [threading.Thread(target=lambda: found.append(Gw2Db(path=path, lang='en'))) for _ in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEquals(len(found), 8)
+        self.assertTrue(all(x is found[0] for x in found))
+        self.assertEquals(found[0].session.query(Param).count(), 1)
+
+    def test_failed_init(self):
+        # a missing file can't be opened read-only: the instance isn't kept
+        path = os.path.join(self.tmp, 'gw2_missing.db')
+        self.assertRaises(OSError, Gw2Db, path=path, readonly=True)
+        self.assertNotIn(path, Gw2Db._instances)
+        db = Gw2Db(path=path, lang='en')
+        self.assertFalse(db._readonly)
+        self.assertIs(Gw2Db._instances[path], db)
+
+    def test_engine_options(self):
+        # an opened instance is not initialized again
+        self.dbs['en']._close_db()
+        db = Gw2Db(path=self.paths['en'], engine_options={'poolclass': NullPool})
+        self.assertIsInstance(db._engine.pool, NullPool)
+        self.assertEquals(db.session.query(Param).count(), 1)
+
+    def test_concurrent_upgrades(self):
+        results = dict()
+
+        def upgrade(x):
+            db = self.dbs[x]
+            db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0, lang=x).make())
+            results[x] = db.upgrade(True)
+
+        ths = [threading.Thread(target=upgrade, args=(x,)) for x in self.dbs]
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+
+        self.assertEquals(results, {x: 1 for x in self.dbs})
+        for x, db in self.dbs.items():
+            self.assertEquals(db.session.query(Gw2Item).count(), 120)
+            self.assertEquals(db.lang, x)
+
+    def test_upgrade_error(self):
+        db = self.dbs['en']
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        db.http.corpus.payloads.pop('items?lang=en')
+        self.assertEquals(db.upgrade(True), -1)
+
+        # the backed file is restored, out of the current directory
+        self.assertFalse(os.path.isfile(self.paths['en'] + '.back'))
+        self.assertEquals(db.session.query(Param).count(), 1)
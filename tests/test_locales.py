@@ -0,0 +1,95 @@
+import copy
+
+from sqlalchemy import select
+
+from gw2db import Gw2Db, Gw2Item
+from gw2db.profs.masteries import _Gw2MasteryLevel
+from gw2db.common import Base, Gw2Translation, translation_key
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase, translate
+
+
+class TestLocales(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        corpus = Synthesizer(scale=0.002, keys=0).make()
+        for k, v in list(corpus.payloads.items()):
+            if k.endswith('lang=en'):
+                for x in ['fr', 'de']:
+                    corpus.payloads[k[:-2] + x] = translate(copy.deepcopy(v), x)
+        self.http = CorpusHttp(corpus)
+
+    def test_locales(self):
+        db = Gw2Db(lang='en', locales=['fr', 'de'])
+        db.http = self.http
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertEquals(db.locales, ['fr', 'de'])
+
+        # locale-independent columns are stored once
+        self.assertEquals(db.session.query(Gw2Item).count(), 120)
+        item = db.session.query(Gw2Item).first()
+        self.assertEquals(db.translate(item, 'name'), item.name)
+        self.assertEquals(db.translate(item, 'name', 'en'), item.name)
+        self.assertEquals(db.translate(item, 'name', 'fr'), 'FR ' + item.name)
+        self.assertEquals(db.translate(item, 'name', 'de'), 'DE ' + item.name)
+        self.assertEquals(db.translate(item, 'name', 'es'), item.name)
+        self.assertEquals(db.translate(item, 'rarity', 'fr'), item.rarity)
+
+        names = db.translations(Gw2Item, 'name', 'fr')
+        self.assertEquals(len(names), 120)
+        self.assertEquals(names[translation_key([item.id])], 'FR ' + item.name)
+
+        # only the changed strings are stored, each one matches its row - subobjects rows included
+        columns = {x[0] for x in db.session.query(Gw2Translation.column).distinct()}
+        self.assertTrue({'name', 'description'} <= columns)
+        self.assertEquals([x for x in columns if 'name' not in x and 'descr' not in x], list())
+        for tr in db.session.query(Gw2Translation).all():
+            table = Base.metadata.tables[tr.tablename]
+            rows = {translation_key([x[c] for c in table.primary_key.columns]): x
+                    for x in db.session.execute(select([table])).fetchall()}
+            self.assertEquals(tr.value, '%s %s' % (tr.lang.upper(), rows[tr.row][tr.column]))
+
+        # the languages are kept by next upgrades
+        name = item.name
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertEquals(db.translate(db.session.query(Gw2Item).first(), 'name', 'fr'), 'FR ' + name)
+
+    def test_other_rows(self):
+        # a mastery with a level more than in french: its rows can't be paired, it's not translated
+        mastery = self.http.corpus.payloads['masteries?lang=en'][0]
+        mastery['levels'].insert(0, dict(mastery['levels'][0], name='First'))
+        db = Gw2Db(lang='en', locales=['fr'])
+        db.http = self.http
+        self.assertEquals(db.upgrade(True), 1)
+
+        self.assertEquals(db.session.query(_Gw2MasteryLevel).filter(_Gw2MasteryLevel.mastery_id == mastery['id'])
+                          .count(), 2)
+        self.assertEquals(db.session.query(Gw2Translation).filter(
+            Gw2Translation.tablename.in_(['gw2_pro_mastery', _Gw2MasteryLevel.__tablename__])).count(), 0)
+        # the other objects are
+        self.assertEquals(len(db.translations(Gw2Item, 'name', 'fr')), 120)
+
+    def test_no_locales(self):
+        db = Gw2Db(lang='en')
+        db.http = self.http
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertEquals(db.locales, list())
+        self.assertEquals(db.session.query(Gw2Translation).count(), 0)
+
+    def test_unknown_locale(self):
+        db = Gw2Db(lang='en')
+        with self.assertRaises(ValueError):
+            db.locales = ['fr', 'xx']
+        self.assertEquals(db.locales, list())
+
+    def test_locale_error(self):
+        db = Gw2Db(lang='en', locales=['fr'])
+        db.http = self.http
+        self.http.corpus.payloads.pop('items?lang=fr')
+        self.assertEquals(db.upgrade(True), -1)
+        self.assertEquals(db.session.query(Gw2Translation).count(), 0)
@@ -0,0 +1,50 @@
+import sys
+import tracemalloc
+
+from gw2db import Gw2Db, Gw2Item, Gw2Skill
+from gw2db.memprof import MemoryProfiler, estimate_size
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestMemoryProfiler(DbTestCase):
+
+    def test_estimate_size(self):
+        row = {'id': 1, 'name': 'Mighty Sword'}
+        self.assertGreater(estimate_size(row), sys.getsizeof(row))
+        # shared objects are counted once
+        self.assertLess(estimate_size([row, row]), 2 * estimate_size(row))
+
+    def test_samples(self):
+        prof = MemoryProfiler(top=3)
+        prof.start()
+        mapped = {Gw2Item: [dict(id=i, name='item %d' % i) for i in range(0, 1000)],
+                  Gw2Skill: [dict(id=1, name='skill')]}
+        s = prof.sample('mapped', 'Gw2Item', mapped)
+        prof.stop()
+
+        self.assertEquals([x.stage for x in prof.samples], ['started', 'mapped', 'ended'])
+        self.assertEquals(s.rows, {'Gw2Item': 1000, 'Gw2Skill': 1})
+        self.assertGreater(s.tables['Gw2Item'], s.tables['Gw2Skill'])
+        self.assertEquals(s.mapped_bytes, sum(s.tables.values()))
+        self.assertGreater(s.traced_peak, 0)
+        self.assertLessEqual(len(s.top), 3)
+        self.assertIsNotNone(prof.peak)
+
+    def test_upgrade_error(self):
+        db = Gw2Db(lang='en')
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        db.memory_profile = True
+
+        def failing(sample):
+            if sample.stage == 'mapped':
+                raise RuntimeError('failing consumer')
+        db.memory_status += failing
+
+        # the upgrade fails, the allocations are not traced anymore
+        self.assertEquals(db.upgrade(True), -1)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEquals(db.last_memory.samples[-1].stage, 'ended')
@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+from gw2db.metrics import PageMetrics, EndpointMetrics, UpgradeMetrics
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.root = EndpointMetrics('Gw2Account')
+        self.child = EndpointMetrics('Gw2Guild')
+        self.root.children = [self.child]
+
+        for i in range(0, 3):
+            page = PageMetrics({'page': i, 'page_size': 200, 'access_token': 'secret'}, 2 - i)
+            page.requests = 2 if i == 0 else 1
+            page.retries = 1 if i == 0 else 0
+            page.bytes = 100
+            page.add_rows('Gw2Account', 200)
+            page.add_rows('_Gw2AccountBank', 10)
+            self.root.add_page(page)
+
+        page = PageMetrics({'access_token': 'secret'})
+        page.requests = 1
+        page.bytes = 50
+        page.add_rows('Gw2Guild')
+        self.child.add_page(page)
+
+        self.root.add_size(1, 0.5)
+        self.root.add_insert('Gw2Account', 600, 1.)
+        self.root.add_insert('Gw2Account', 10, 1.)
+
+    def test_page(self):
+        page = self.root.pages[0]
+        self.assertNotIn('access_token', page.args)
+        self.assertEquals(page.args['page'], 0)
+        self.assertEquals(page.as_dict()['rows'], {'Gw2Account': 200, '_Gw2AccountBank': 10})
+
+    def test_endpoint(self):
+        self.assertEquals(self.root.requests, 5)
+        self.assertEquals(self.root.retries, 1)
+        self.assertEquals(self.root.bytes, 300)
+        self.assertEquals(self.root.max_queue_depth, 2)
+        self.assertEquals(self.root.rows, {'Gw2Account': 600, '_Gw2AccountBank': 30})
+        self.assertEquals(self.root.inserted, {'Gw2Account': 610})
+        self.assertEquals([x.table_name for x in self.root.walk()], ['Gw2Account', 'Gw2Guild'])
+
+    def test_summary(self):
+        summary = UpgradeMetrics()
+        summary.add(self.root)
+        summary.stop()
+
+        tot = summary.totals()
+        self.assertEquals(tot['requests'], 6)
+        self.assertEquals(tot['bytes'], 350)
+        self.assertEquals(tot['rows'], 631)
+        self.assertEquals(tot['inserted'], 610)
+        self.assertGreaterEqual(summary.duration, 0)
+        self.assertIn('Gw2Guild', str(summary))
+        self.assertEquals(len(summary.as_dict()['endpoints']['Gw2Account']['children']), 1)
@@ -0,0 +1,71 @@
+import os
+
+from sqlalchemy.engine import create_engine
+
+from gw2db import Gw2Db
+from gw2db.common import Param
+from gw2db.gw2db import PRAGMA_PROFILES
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestPragmas(DbTestCase):
+
+    def _pragma(self, session, name):
+        return session.execute('PRAGMA ' + name).scalar()
+
+    def test_profiles(self):
+        for name in ('default', 'bulk_load', 'serving'):
+            self.assertIn(name, PRAGMA_PROFILES)
+        self.assertIn(('query_only', '1'), PRAGMA_PROFILES['serving'])
+        self.assertIn(('synchronous', 'OFF'), PRAGMA_PROFILES['bulk_load'])
+
+    def test_scoped_listener(self):
+        db = Gw2Db()
+        self.assertEquals(self._pragma(db.session, 'cache_size'), -16000)
+        self.assertEquals(self._pragma(db.session, 'journal_mode'), 'memory')
+
+        # other engines of the process keep SQLite defaults
+        engine = create_engine('sqlite:///' + os.path.join(self.tmp, 'other.db'))
+        self.assertEquals(engine.execute('PRAGMA journal_mode').scalar(), 'delete')
+        engine.dispose()
+
+    def test_serving_readers(self):
+        db = Gw2Db(serving=True, pool_size=2)
+        self.assertEquals(self._pragma(db.reader, 'query_only'), 1)
+        self.assertEquals(self._pragma(db.reader, 'mmap_size'), 268435456)
+        self.assertEquals(self._pragma(db.session, 'query_only'), 0)
+        db.release_reader()
+
+    def test_upgrade_switch(self):
+        db = Gw2Db(serving=True, pool_size=2)
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        db.session.add(Param(name='lang', value='en'))
+        db.session.commit()
+
+        during = list()
+        db.running_status += lambda s, n: during.append(self._pragma(db.session, 'synchronous'))
+        self.assertEquals(db.upgrade(True), 1)
+
+        # downloading, then success
+        self.assertEquals(during[1:], [0, 0])
+        self.assertEquals(self._pragma(db.session, 'synchronous'), 2)
+        self.assertEquals(self._pragma(db.session, 'locking_mode'), 'normal')
+        self.assertEquals(self._pragma(db.session, 'journal_mode'), 'wal')
+
+    def test_upgrade_file(self):
+        db = Gw2Db()
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        db.session.add(Param(name='lang', value='en'))
+        db.session.commit()
+        self.assertEquals(db.upgrade(True), 1)
+
+        # the new file was created with bulk loading pages, the lock is released
+        self.assertEquals(self._pragma(db.session, 'page_size'), 8192)
+        self.assertEquals(self._pragma(db.session, 'locking_mode'), 'normal')
+        engine = create_engine('sqlite:///gw2.db', connect_args={'timeout': 0.1})
+        self.assertEquals(engine.execute('SELECT count(*) FROM app_params').scalar(), 2)
+        engine.dispose()
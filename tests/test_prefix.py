@@ -0,0 +1,82 @@
+import copy
+
+from gw2db import Gw2Db, Gw2Item, Gw2Skill
+from gw2db.prefix import PrefixIndex, default_rank, normalize
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase, translate
+
+
+class TestPrefix(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        corpus = Synthesizer(scale=0.002, keys=0).make()
+        for k, v in list(corpus.payloads.items()):
+            if k.endswith('lang=en'):
+                corpus.payloads[k[:-2] + 'fr'] = translate(copy.deepcopy(v), 'fr')
+        self.db = Gw2Db(lang='en', locales=['fr'])
+        self.db.http = CorpusHttp(corpus)
+        self.assertEquals(self.db.upgrade(True), 1)
+
+    def test_normalize(self):
+        self.assertEquals(normalize('  Épée   du Ciel '), 'epee du ciel')
+
+    def test_complete(self):
+        index = PrefixIndex(self.db)
+        self.assertFalse(index.built)
+
+        item = self.db.session.query(Gw2Item).filter(Gw2Item.name != None).first()
+        word = normalize(item.name).split(' ')[-1]
+        found = index.complete(word[:2], k=1000)
+        self.assertTrue(index.built)
+        self.assertIn((item.id, item.name), [(x.id, x.name) for x in found if x.kind == 'Gw2Item'])
+        for x in found:
+            self.assertTrue(any(y.startswith(word[:2]) for y in normalize(x.name).split(' ')))
+        self.assertEquals(found, sorted(found, key=default_rank))
+        self.assertEquals(index.complete(word[:2], k=3), found[:3])
+
+        # several words, the last one being a prefix
+        found = index.complete(item.name[:-1], k=1000)
+        self.assertIn(item.id, [x.id for x in found if x.kind == 'Gw2Item'])
+
+        found = index.complete(word[:1], k=1000, tables=[Gw2Skill])
+        self.assertTrue(len(found) > 0)
+        self.assertTrue(all(x.kind == 'Gw2Skill' for x in found))
+        self.assertEquals(index.complete(' '), list())
+
+        # no db access once built
+        self.db._close_db()
+        self.assertEquals(len(index.complete(word[:1], k=5)), 5)
+
+    def test_rank(self):
+        index = PrefixIndex(self.db, tables=[Gw2Item], rank=lambda x: x.name)
+        found = index.complete('a', k=1000)
+        self.assertEquals([x.name for x in found], sorted(x.name for x in found))
+
+    def test_lang(self):
+        index = PrefixIndex(self.db, tables=[Gw2Item], lang='fr')
+        found = index.complete('fr', k=1000)
+        self.assertEquals(len(found), self.db.session.query(Gw2Item).filter(Gw2Item.name != None).count())
+        self.assertTrue(all(x.name.startswith('FR ') for x in found))
+
+    def test_invalidate(self):
+        index = PrefixIndex(self.db)
+        index.complete('a')
+        self.assertTrue(index.built)
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertFalse(index.built)
+        index.complete('a')
+        self.assertTrue(index.built)
+
+        # a failed upgrade keeps the index
+        self.db.http.corpus.payloads.pop('items?lang=en')
+        self.assertEquals(self.db.upgrade(True), -1)
+        self.assertTrue(index.built)
+
+        index.close()
+        self.assertFalse(index.built)
+        self.assertEquals(len(self.db.running_status), 0)
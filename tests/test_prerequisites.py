@@ -0,0 +1,78 @@
+from gw2db import Gw2Db
+from gw2db.auths.accounts import _Gw2AccountAchievement
+from gw2db.miscs.achievements import _Gw2AchievementClosure, _Gw2AchievementRequires
+from gw2db.prerequisites import PrerequisiteGraph, closure
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+# 4 needs 2 and 3, both needing 1 - 5 needs 4 - 6 and 7 need each other
+PAIRS = [(2, 1), (3, 1), (4, 2), (4, 3), (5, 4), (6, 7), (7, 6)]
+
+
+class TestPrerequisites(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db(lang='en')
+
+    def test_closure(self):
+        found = closure(PAIRS)
+        self.assertEquals(found[5], {4: 1, 2: 2, 3: 2, 1: 3})
+        self.assertEquals(found[4], {2: 1, 3: 1, 1: 2})
+        self.assertEquals(found[2], {1: 1})
+        self.assertNotIn(1, found)
+        # one edge of the cycle is dropped
+        self.assertIn((found.get(6), found.get(7)), (({7: 1}, None), (None, {6: 1})))
+
+    def test_graph(self):
+        self.db.session.add_all([_Gw2AchievementRequires(ach_id=a, req_id=r) for a, r in PAIRS])
+        self.db.session.add_all([_Gw2AccountAchievement(id=x, api_key='KEY', done=x != 3) for x in (1, 2, 3)])
+        self.db.session.commit()
+
+        graph = PrerequisiteGraph(self.db)
+        self.assertEquals(graph.prerequisites(5), [1, 2, 3, 4])
+        self.assertEquals(graph.prerequisites(4), [1, 2, 3])
+        self.assertEquals(graph.prerequisites(1), list())
+        self.assertTrue(graph.requires(5, 1))
+        self.assertFalse(graph.requires(1, 5))
+
+        order = graph.order()
+        for a, r in PAIRS[:5]:
+            self.assertTrue(order.index(r) < order.index(a))
+        self.assertEquals(graph.order([5, 1, 99, 4]), [1, 99, 4, 5])
+
+        self.assertEquals(graph.unlockable_from([1]), [2, 3])
+        self.assertEquals(graph.unlockable_from([1, 2]), [3])
+        self.assertEquals(graph.unlockable_from([1, 2, 3]), [4])
+        self.assertEquals(graph.unlockable('KEY'), [3])
+        self.assertEquals(graph.unlockable('other'), list())
+
+    def test_upgrade(self):
+        self.db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        self.assertEquals(self.db.upgrade(True), 1)
+        pairs = self.db.session.query(_Gw2AchievementRequires.ach_id, _Gw2AchievementRequires.req_id).all()
+        self.assertTrue(len(pairs) > 0)
+
+        # the stored closure is the computed one
+        stored = dict()
+        for a, r, d in self.db.session.query(_Gw2AchievementClosure.ach_id, _Gw2AchievementClosure.req_id,
+                                             _Gw2AchievementClosure.depth):
+            stored.setdefault(a, dict())[r] = d
+        self.assertEquals(stored, closure(pairs))
+        metrics = self.db.last_metrics.endpoints['Gw2Achievement']
+        self.assertEquals(metrics.inserted['_Gw2AchievementClosure'], sum(len(x) for x in stored.values()))
+
+        # the graph is the same when read from the relation
+        graph = PrerequisiteGraph(self.db)
+        read = graph._get()
+        self.db.session.query(_Gw2AchievementClosure).delete()
+        self.db.session.commit()
+        graph.invalidate()
+        self.assertEquals(graph._get(), read)
+        for a, r in pairs:
+            # or the prerequisite closes a cycle
+            self.assertTrue(graph.requires(a, r) or graph.requires(r, a) or a == r)
+        graph.close()
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+import os
+import shutil
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+from gw2db import Gw2Db
+from gw2db.common import Param
+
+from tests.support import DbTestCase
+
+
+class TestReadonly(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db = Gw2Db()
+        db.session.add(Param(name='KEY_test', value='test'))
+        db.session.commit()
+        db._close_db()
+
+    def test_snapshot(self):
+        db = Gw2Db(readonly=True)
+        self.assertEquals(db.session.query(Param).count(), 1)
+        self.assertEquals(db.session.execute('PRAGMA query_only').scalar(), 1)
+        self.assertEquals(db.session.execute('PRAGMA mmap_size').scalar(), 268435456)
+        self.assertIs(db.reader, db.session)
+
+    def test_writer(self):
+        # another process writes the file in place: it's not immutable
+        db = Gw2Db(readonly=True)
+        self.assertNotIn('immutable', str(db._engine.url))
+        self.assertEquals(db.session.query(Param).count(), 1)
+        db.session.rollback()
+        with sqlite3.connect('gw2.db') as conn:
+            conn.execute("INSERT INTO app_params (name, value) VALUES ('KEY_other', 'other')")
+        conn.close()
+        self.assertEquals(db.session.query(Param).count(), 2)
+
+    def test_immutable(self):
+        # only swapped by sidecar upgrades
+        db = Gw2Db(readonly=True, sidecar=True)
+        self.assertIn('immutable=1', str(db._engine.url))
+        self.assertEquals(db.session.query(Param).count(), 1)
+
+    def test_no_locale(self):
+        db = Gw2Db(readonly=True)
+        with patch('locale.getdefaultlocale', return_value=(None, None)):
+            self.assertEquals(db.lang, 'en')
+
+    def test_no_write(self):
+        db = Gw2Db(readonly=True)
+
+        # the found language is not stored
+        self.assertIn(db.lang, ['fr', 'de', 'en', 'es'])
+        self.assertEquals(db.session.query(Param).count(), 1)
+        self.assertEquals(db.upgrade(True), -1)
+
+        db.session.add(Param(name='lang', value='en'))
+        with self.assertRaises(OperationalError):
+            db.session.commit()
+        db.session.rollback()
+
+    def test_missing_file(self):
+        os.remove('gw2.db')
+        with self.assertRaises(OSError):
+            Gw2Db(readonly=True)
+        self.assertFalse(os.path.isfile('gw2.db'))
+
+    def test_refresh(self):
+        db = Gw2Db(readonly=True)
+        self.assertFalse(db.refresh())
+
+        shutil.copy('gw2.db', 'other.db')
+        os.replace('other.db', 'gw2.db')
+        self.assertTrue(db.refresh())
+        self.assertEquals(db.session.query(Param).count(), 1)
+
+    def test_positional_args(self):
+        db = Gw2Db(False, 2)
+        self.assertIs(db, Gw2Db())
@@ -0,0 +1,76 @@
+from unittest import skipIf
+
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect
+
+from gw2db import Gw2Db
+from gw2db import registry
+from gw2db.common import Base
+
+from tests.support import DbTestCase
+
+# run by a lazy interpreter: prints the imported families after each step
+LAZY_SCRIPT = """
+import sys
+import gw2db
+print(sorted(m for m in sys.modules if m.startswith('gw2db.')))
+db = gw2db.Gw2Db(families=['items.skins'])
+print(sorted(gw2db.registry.loaded()), [x.__name__ for x in gw2db.Gw2Db.__endpoints__])
+print(db.session.query(gw2db.Gw2Skin).count())
+from gw2db.profs import Gw2Trait
+print(sorted(gw2db.registry.loaded()))
+"""
+
+
+class TestRegistry(DbTestCase):
+
+    def test_families(self):
+        Gw2Db()
+        self.assertEquals(registry.loaded(), set(registry.FAMILIES))
+        for family, classes in registry.FAMILIES.items():
+            module = sys.modules['gw2db.' + family]
+            for name in classes:
+                self.assertEquals(getattr(module, name).__module__, module.__name__)
+
+    def test_depends(self):
+        Gw2Db()
+        families = dict()
+        for cls in Base._decl_class_registry.values():
+            if isinstance(cls, type):
+                for table in inspect(cls).tables:
+                    families[table.name] = cls.__module__[len('gw2db.'):]
+
+        # the tables of a family only refer to the tables of its closure
+        for cls in Base._decl_class_registry.values():
+            if not isinstance(cls, type):
+                continue
+            family = cls.__module__[len('gw2db.'):]
+            if family not in registry.FAMILIES:
+                continue
+            found = registry.closure([family])
+            for table in inspect(cls).tables:
+                for fk in table.foreign_keys:
+                    self.assertIn(families[fk.column.table.name], found, cls.__name__)
+            for rel in inspect(cls).relationships:
+                self.assertIn(rel.mapper.class_.__module__[len('gw2db.'):], found, cls.__name__)
+
+    def test_closure(self):
+        self.assertEquals(registry.closure(['items.skins']), {'items.skins'})
+        self.assertEquals(registry.closure(['miscs.titles']),
+                          registry.closure(['miscs.achievements']))
+        with self.assertRaises(KeyError):
+            registry.closure(['items.unknown'])
+
+    @skipIf(sys.version_info < (3, 7), 'lazy attributes need module __getattr__ (PEP 562)')
+    def test_lazy(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(registry.__file__)))
+        env = dict(os.environ, GW2DB_LAZY='1', PYTHONPATH=root)
+        out = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', LAZY_SCRIPT], env=env)
+        lines = out.decode('utf-8').splitlines()
+        self.assertEquals(lines[0], "['gw2db.registry']")
+        self.assertEquals(lines[1], "['items.skins'] ['Gw2Skin']")
+        self.assertEquals(lines[2], '0')
+        self.assertEquals(lines[3], str(sorted({'items.skins'} | registry.closure(['profs.traits']))))
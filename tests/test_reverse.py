@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+import os
+
+from gw2db import Gw2Db
+from gw2db.items.recipes import _Gw2RecipeIngredient
+from gw2db.miscs.achievements import _Gw2ABItem, _Gw2ARItem
+from gw2db.reverse import ReverseIndex
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestReverse(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db(lang='en')
+        self.db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        self.assertEquals(self.db.upgrade(True), 1)
+
+    def expected(self, id_col, row_col):
+        found = dict()
+        for item_id, row in self.db.session.query(id_col, row_col):
+            found.setdefault(item_id, set()).add(row)
+        return {k: sorted(v) for k, v in found.items()}
+
+    def test_used_in(self):
+        expected = self.expected(_Gw2RecipeIngredient.item_id, _Gw2RecipeIngredient.recipe_id)
+        self.assertTrue(len(expected) > 0)
+        for item_id, recipes in expected.items():
+            self.assertEquals(self.db.used_in(item_id), recipes)
+        self.assertEquals(self.db.used_in(-1), list())
+
+    def test_rewarded_by(self):
+        expected = self.expected(_Gw2ARItem.item_id, _Gw2ARItem.ach_id)
+        self.assertTrue(len(expected) > 0)
+        for item_id, achievements in expected.items():
+            self.assertEquals(self.db.rewarded_by(item_id), achievements)
+        self.assertEquals(self.db.rewarded_by(-1), list())
+
+        expected = self.expected(_Gw2ABItem.item_id, _Gw2ABItem.ach_id)
+        self.assertTrue(len(expected) > 0)
+        for item_id, achievements in expected.items():
+            self.assertEquals(self.db.reverse.collected_by(item_id), achievements)
+
+    def test_eager(self):
+        index = self.db.reverse
+        self.assertIs(self.db.reverse, index)
+        self.assertFalse(index.built)
+        self.db.used_in(0)
+        self.assertTrue(index.built)
+
+        # built again at the end of the upgrade, before any use
+        datas = index._datas
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertTrue(index.built)
+        self.assertIsNot(index._datas, datas)
+
+        lazy = ReverseIndex(self.db, eager=False)
+        lazy.used_in(0)
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertFalse(lazy.built)
+        lazy.close()
+
+    def test_serving(self):
+        db = Gw2Db(path='serving.db', lang='en', serving=True, pool_size=2)
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        self.assertEquals(db.upgrade(True), 1)
+        db.used_in(0)
+        # this thread reads a snapshot of the first datas
+        db.reader.query(_Gw2RecipeIngredient.item_id).first()
+
+        # other datas: the index is built from them, not from the snapshot of this thread
+        db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0, seed=1).make())
+        self.assertEquals(db.upgrade(True), 1)
+        self.assertTrue(db.reverse.built)
+        expected = dict()
+        for item_id, recipe_id in db.session.query(_Gw2RecipeIngredient.item_id, _Gw2RecipeIngredient.recipe_id):
+            expected.setdefault(item_id, set()).add(recipe_id)
+        self.assertTrue(len(expected) > 0)
+        self.assertEquals({k: db.used_in(k) for k in expected}, {k: sorted(v) for k, v in expected.items()})
+
+    def test_eager_error(self):
+        # a failed rebuild doesn't undo the upgrade: the index is built at the next use
+        self.db.used_in(0)
+        with patch.object(ReverseIndex, '_build', side_effect=ValueError('broken')):
+            self.assertEquals(self.db.upgrade(True), 1)
+        self.assertTrue(os.path.isfile('gw2.db'))
+        self.assertFalse(os.path.isfile('gw2.db.back'))
+        self.assertFalse(self.db.reverse.built)
+        self.assertEquals(self.db.used_in(-1), list())
+        self.assertTrue(self.db.reverse.built)
@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+from gw2db import Gw2Db
+from gw2db.common import Base, Param
+from gw2db.gw2db import _schema_fingerprint
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestSchema(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db()
+
+    def _version(self):
+        return self.db.session.execute('PRAGMA user_version').scalar()
+
+    def test_stamp(self):
+        fingerprint = _schema_fingerprint(Base.metadata)
+        self.assertGreater(fingerprint, 0)
+        self.assertEquals(self._version(), fingerprint)
+
+        # an up to date db is opened without DDL
+        self.db._close_db()
+        with patch.object(Base.metadata, 'create_all') as create_all:
+            self.db = Gw2Db()
+            self.assertEquals(create_all.call_count, 0)
+
+    def test_changed(self):
+        self.db.session.execute('DROP TABLE gw2_item_skin')
+        self.db.session.execute('PRAGMA user_version = 1')
+        self.db.session.commit()
+        self.db._close_db()
+
+        self.db = Gw2Db()
+        self.assertEquals(self._version(), _schema_fingerprint(Base.metadata))
+        self.assertEquals(self.db.session.execute('SELECT count(*) FROM gw2_item_skin').scalar(), 0)
+
+    def _columns(self, table):
+        return [x[1] for x in self.db.session.execute('PRAGMA table_info(%s)' % table)]
+
+    def _reopen(self, *statements):
+        for statement in statements:
+            self.db.session.execute(statement)
+        self.db.session.execute('PRAGMA user_version = 1')
+        self.db.session.commit()
+        self.db._close_db()
+        self.db = Gw2Db()
+
+    def test_added_column(self):
+        # a db made before the inventories counts
+        self.db.session.execute("INSERT INTO gw2_auth_character_inventory (pkid, char_id, id, count) "
+                                "VALUES (1, 'Hero', 42, 3)")
+        self._reopen('ALTER TABLE gw2_auth_character_inventory DROP COLUMN count')
+
+        self.assertEquals(self._version(), _schema_fingerprint(Base.metadata))
+        self.assertIn('count', self._columns('gw2_auth_character_inventory'))
+        # the rows are kept, with the default value
+        self.assertEquals(self.db.session.execute('SELECT id, count FROM gw2_auth_character_inventory').fetchall(),
+                          [(42, 1)])
+
+    def test_recreated(self):
+        self.db.session.add(Param(name='build', value='42'))
+        self.db.session.execute("INSERT INTO gw2_item_skin (id, name, type, rarity) "
+                                "VALUES (1, 'skin', 'Armor', 'Basic')")
+        # a mandatory column without default can't be added: the table is created again
+        self._reopen('ALTER TABLE gw2_item_skin DROP COLUMN name')
+
+        self.assertEquals(self._version(), _schema_fingerprint(Base.metadata))
+        self.assertIn('name', self._columns('gw2_item_skin'))
+        self.assertEquals(self.db.session.execute('SELECT count(*) FROM gw2_item_skin').scalar(), 0)
+        # so its datas are downloaded again by the next upgrade
+        self.assertIsNone(self.db.session.query(Param).filter(Param.name == 'build').first())
+
+    def test_kept_rows(self):
+        self.db.session.add_all([Param(name='build', value='42'), Param(name='KEY_test', value='test')])
+        self.db.session.execute("INSERT INTO gw2_auth_account_change (api_key, checked, kind, ref, old, new) "
+                                "VALUES ('test', '2020-01-01 00:00:00', 'wallet', '1', 1, 2)")
+        self.db.session.commit()
+        # tables with a mandatory column which is not declared anymore: created again, their rows copied
+        self._reopen('ALTER TABLE app_params ADD COLUMN extra INTEGER NOT NULL DEFAULT 1',
+                     'CREATE TABLE old_params AS SELECT * FROM app_params',
+                     'DROP TABLE app_params',
+                     'CREATE TABLE app_params (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, '
+                     'value VARCHAR NOT NULL, extra INTEGER NOT NULL)',
+                     'INSERT INTO app_params SELECT * FROM old_params',
+                     'DROP TABLE old_params',
+                     'ALTER TABLE gw2_auth_account_change ADD COLUMN extra INTEGER NOT NULL DEFAULT 1',
+                     'ALTER TABLE gw2_auth_account_change DROP COLUMN kind')
+
+        self.assertNotIn('extra', self._columns('app_params'))
+        params = {x.name: x.value for x in self.db.session.query(Param).all()}
+        self.assertEquals((params['KEY_test'], params['build']), ('test', '42'))
+        # the history rows missing a mandatory column are skipped
+        self.assertIn('kind', self._columns('gw2_auth_account_change'))
+        self.assertEquals(self.db.session.execute('SELECT count(*) FROM gw2_auth_account_change').scalar(), 0)
+
+    def test_refresh_old_db(self):
+        corpus = Synthesizer(scale=0.002, keys=1).make()
+        self.db._close_db()
+        self.db = Gw2Db(lang='en')
+        self.db.http = CorpusHttp(corpus)
+        self.db.session.add_all([Param(name='KEY_%s' % k, value=k) for k in corpus.keys])
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+
+        self._reopen('ALTER TABLE gw2_auth_character_inventory DROP COLUMN count')
+        self.db.http = CorpusHttp(corpus)
+        self.assertTrue(self.db.refresh_accounts() > 0)
+        self.assertGreater(self.db.session.execute('SELECT count(*) FROM gw2_auth_character_inventory').scalar(), 0)
+
+    def test_fingerprint(self):
+        fingerprint = _schema_fingerprint(Base.metadata)
+        self.assertEquals(_schema_fingerprint(Base.metadata), fingerprint)
+
+        table = Base.metadata.tables['gw2_item_skin']
+        with patch.object(table.c.name, 'nullable', not table.c.name.nullable):
+            self.assertNotEqual(_schema_fingerprint(Base.metadata), fingerprint)
@@ -0,0 +1,56 @@
+import threading
+
+from sqlalchemy.exc import OperationalError
+
+from gw2db import Gw2Db
+from gw2db.common import Param
+
+from tests.support import DbTestCase
+
+
+class TestServing(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db(serving=True, pool_size=2)
+        self.db.session.add(Param(name='lang', value='en'))
+        self.db.session.commit()
+
+    def test_wal_and_readonly(self):
+        self.assertEquals(self.db.session.execute('PRAGMA journal_mode').scalar(), 'wal')
+        self.assertEquals(self.db.reader.execute('PRAGMA journal_mode').scalar(), 'wal')
+
+        self.db.reader.add(Param(name='KEY_test', value='test'))
+        with self.assertRaises(OperationalError):
+            self.db.reader.commit()
+        self.db.release_reader()
+
+    def test_snapshot(self):
+        self.assertEquals(self.db.reader.query(Param).count(), 1)
+
+        self.db.session.add(Param(name='KEY_test', value='test'))
+        self.db.session.commit()
+
+        # the reader keeps its snapshot until it's released
+        self.assertEquals(self.db.reader.query(Param).count(), 1)
+        self.db.release_reader()
+        self.assertEquals(self.db.reader.query(Param).count(), 2)
+        self.db.release_reader()
+
+    def test_thread_sessions(self):
+        sessions = list()
+
+        def read():
+            sessions.append(self.db.reader)
+            sessions[-1].query(Param).count()
+            self.db.release_reader()
+
+        ths = [threading.Thread(target=read) for i in range(0, 2)]
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+
+        self.assertEquals(len(sessions), 2)
+        self.assertNotEqual(id(sessions[0]), id(sessions[1]))
+        self.assertNotEqual(id(sessions[0]), id(self.db.reader))
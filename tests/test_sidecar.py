@@ -0,0 +1,115 @@
+import os
+import shutil
+import sqlite3
+import threading
+
+from gw2db import Gw2Db, Gw2Character, Gw2Item
+from gw2db.common import Param
+
+from benchmarks.corpus import CorpusHttp
+from benchmarks.synth import Synthesizer
+
+from tests.support import DbTestCase
+
+
+class TestSidecar(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db = Gw2Db(serving=True, pool_size=2, sidecar=True)
+        self.db.http = CorpusHttp(Synthesizer(scale=0.002, keys=0).make())
+        self.db.session.add(Param(name='lang', value='en'))
+        self.db.session.commit()
+
+    def test_upgrade_swap(self):
+        versions = list()
+        self.db.swapped += lambda v: versions.append(v)
+
+        old = self.db.reader
+        self.assertEquals(old.query(Gw2Item).count(), 0)
+        ino = os.stat('gw2.db').st_ino
+
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertEquals(versions, [1])
+        self.assertNotEqual(os.stat('gw2.db').st_ino, ino)
+        self.assertFalse(os.path.isfile('gw2.db.new'))
+        self.assertEquals(self.db.session.execute('PRAGMA journal_mode').scalar(), 'memory')
+
+        # the opened session reads the previous file until it's released
+        self.assertEquals(old.query(Gw2Item).count(), 0)
+        self.db.release_reader()
+        self.assertEquals(self.db.reader.query(Gw2Item).count(), 120)
+        self.assertEquals(self.db.reader.query(Param).filter(Param.name == 'lang').one().value, 'en')
+        self.db.release_reader()
+
+    def test_upgrade_error(self):
+        self.db.http.corpus.payloads.pop('items?lang=en')
+        self.assertEquals(self.db.upgrade(True), -1)
+        self.assertFalse(os.path.isfile('gw2.db.new'))
+        self.assertEquals(self.db.session.query(Param).count(), 1)
+
+    def test_verify(self):
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertEquals(self.db._verify(self.db.session), [])
+
+        self.db.session.query(Gw2Item).filter(Gw2Item.type == 'Trophy').delete()
+        errors = self.db._verify(self.db.session)
+        self.assertEquals(len(errors), 1)
+        self.assertTrue(errors[0].startswith('gw2_item_item '))
+        self.db.session.rollback()
+
+    def test_accounts_emptied(self):
+        corpus = Synthesizer(scale=0.002, keys=1).make()
+        self.db.http = CorpusHttp(corpus)
+        self.db.session.add(Param(name='KEY_%s' % corpus.keys[0], value=corpus.keys[0]))
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertTrue(self.db.session.query(Gw2Character).count() > 0)
+
+        # the only key is removed: the accounts tables may become empty
+        self.db.session.query(Param).filter(Param.name == 'KEY_%s' % corpus.keys[0]).delete()
+        self.db.session.commit()
+        self.assertEquals(self.db.upgrade(True), 1)
+        self.assertEquals(self.db.session.query(Gw2Character).count(), 0)
+
+    def test_refresh(self):
+        self.assertFalse(self.db.refresh())
+        self.assertEquals(self.db.reader.query(Param).count(), 1)
+        self.db.release_reader()
+
+        # another process swaps the file
+        shutil.copy('gw2.db', 'other.db')
+        with sqlite3.connect('other.db') as conn:
+            conn.execute("INSERT INTO app_params (name, value) VALUES ('KEY_test', 'test')")
+        conn.close()
+        os.replace('other.db', 'gw2.db')
+
+        self.assertTrue(self.db.refresh())
+        self.assertEquals(self.db.session.query(Param).count(), 2)
+        self.assertEquals(self.db.reader.query(Param).count(), 2)
+        self.db.release_reader()
+
+        # swapped again, found by a reader thread: the main session, which this thread uses, is kept until its next
+        # access
+        shutil.copy('gw2.db', 'other.db')
+        with sqlite3.connect('other.db') as conn:
+            conn.execute("INSERT INTO app_params (name, value) VALUES ('KEY_other', 'other')")
+        conn.close()
+        os.replace('other.db', 'gw2.db')
+
+        main = self.db._session
+        counts = list()
+
+        def read():
+            counts.append(self.db.reader.query(Param).count())
+            self.db.release_reader()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        self.assertEquals(counts, [3])
+        self.assertIs(self.db._session, main)
+        self.assertEquals(main.query(Param).count(), 2)
+        main.rollback()
+        self.assertEquals(self.db.session.query(Param).count(), 3)
+        self.assertIsNot(self.db._session, main)
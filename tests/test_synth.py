@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from gw2db import Gw2Db
+from gw2db.common import EPType
+
+from benchmarks.synth import SIZES, Synthesizer
+
+
+class TestSynthesizer(TestCase):
+
+    def setUp(self):
+        self.synth = Synthesizer(scale=0.002, keys=2, characters=3)
+        self.corpus = self.synth.make()
+
+    def test_seed(self):
+        # the same seed gives the same corpus, another one another corpus
+        self.assertEquals(Synthesizer(scale=0.002, keys=2, characters=3).make().payloads, self.corpus.payloads)
+        self.assertNotEqual(Synthesizer(scale=0.002, keys=2, characters=3, seed=1).make().payloads,
+                            self.corpus.payloads)
+
+    def test_sizes(self):
+        self.assertEquals(self.synth.size('items'), int(round(SIZES['items'] * 0.002)))
+        self.assertEquals(self.synth.size('unknown'), 1)
+        self.assertEquals(len(self.corpus.get('items', lang='en')), self.synth.size('items'))
+
+        # each endpoint is answered
+        for table in Gw2Db.__endpoints__:
+            info = table.__table__.info
+            if (info['ep_type'] & (EPType.auth | EPType.child)) == 0:
+                self.assertIsNotNone(self.corpus.get(info['endpoint'], **(dict(lang='en') if info['locale'] else {})),
+                                     info['endpoint'])
+
+    def test_accounts(self):
+        self.assertEquals(self.corpus.keys, ['key0', 'key1'])
+        items = {x['id'] for x in self.corpus.get('items', lang='en')}
+        for key in self.corpus.keys:
+            token = self.corpus.get('tokeninfo', access_token=key)
+            self.assertEquals(sorted(token['permissions']), sorted(self.synth.rights))
+            characters = self.corpus.get('characters', access_token=key)
+            self.assertEquals(len(characters), 3)
+
+            # the foreign keys refer to generated objects
+            bank = [x for x in self.corpus.get('account/bank', access_token=key) if x is not None]
+            self.assertTrue(len(bank) > 0)
+            self.assertTrue(all(x['id'] in items for x in bank))
+            self.assertTrue(all(x['id'] in items for c in characters for x in c['equipment']))
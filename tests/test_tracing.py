@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+import json
+import os
+import tempfile
+
+from gw2db.tracing import Tracer, ChromeTraceExporter, CallbackExporter
+
+
+class TestTracing(TestCase):
+
+    def test_disabled(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        with tracer.span('download', 'net', 'Gw2Item') as span:
+            self.assertFalse(hasattr(span, 'start'))
+        tracer.flush()
+
+    def test_callback(self):
+        spans = list()
+        tracer = Tracer(CallbackExporter(spans.append))
+        with tracer.span('Gw2Item', 'map', 'Gw2Item'):
+            with tracer.span('_Gw2InfixUpgrade', 'map', 'Gw2Item'):
+                pass
+
+        self.assertEquals([x.name for x in spans], ['_Gw2InfixUpgrade', 'Gw2Item'])
+        self.assertTrue(all(x.endpoint == 'Gw2Item' for x in spans))
+        self.assertLessEqual(spans[1].start, spans[0].start)
+        self.assertGreaterEqual(spans[1].end, spans[0].end)
+
+        try:
+            with tracer.span('decode', 'decode', 'Gw2Item'):
+                raise ValueError('bad json')
+        except ValueError:
+            pass
+        self.assertEquals(spans[-1].args['error'], 'bad json')
+
+    def test_chrome(self):
+        path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        tracer = Tracer(ChromeTraceExporter(path))
+        with tracer.span('download', 'net', 'Gw2Skill', url='skills'):
+            pass
+        tracer.flush()
+
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEquals([x['ph'] for x in events], ['M', 'X'])
+        self.assertEquals(events[1]['args'], {'endpoint': 'Gw2Skill', 'url': 'skills'})
+        self.assertEquals(events[0]['tid'], events[1]['tid'])